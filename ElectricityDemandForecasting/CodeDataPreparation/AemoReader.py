@@ -0,0 +1,93 @@
+##
+# @file AemoReader.py
+# @brief Fast typed reader for AEMO PRICE_AND_DEMAND monthly CSV files.
+#
+# AEMO files have a fixed schema (REGION, SETTLEMENTDATE, TOTALDEMAND, RRP, PERIODTYPE)
+# and a fixed timestamp format, so nothing has to be inferred while parsing. The reader
+# uses the multi-threaded pyarrow CSV parser with explicit column types and timestamp
+# format when pyarrow is installed, and the pandas C parser with the same explicit
+# schema otherwise. Several files are parsed in parallel on a process pool.
+##
+
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+## @brief Column order of the AEMO price-and-demand files.
+AEMO_COLUMNS = ['REGION', 'SETTLEMENTDATE', 'TOTALDEMAND', 'RRP', 'PERIODTYPE']
+
+## @brief Pandas dtypes of the non-date columns.
+AEMO_DTYPES = {'REGION': 'category', 'TOTALDEMAND': 'float64', 'RRP': 'float64', 'PERIODTYPE': 'category'}
+
+## @brief Timestamp format of SETTLEMENTDATE, e.g. "2024/10/01 00:05:00".
+DATE_FORMAT = "%Y/%m/%d %H:%M:%S"
+
+
+##
+# @brief Reads one AEMO CSV file with an explicit schema.
+#
+# @param path Path of the CSV file.
+# @param usecols Optional subset of AEMO_COLUMNS to read.
+# @return DataFrame with a datetime64 'SETTLEMENTDATE' column, float columns and
+#         categorical region / period type.
+def read_aemo_csv(path, usecols=None):
+    usecols = list(usecols or AEMO_COLUMNS)
+    if pa is not None:
+        try:
+            column_types = {'SETTLEMENTDATE': pa.timestamp('ns'), 'TOTALDEMAND': pa.float64(),
+                            'RRP': pa.float64(), 'REGION': pa.dictionary(pa.int32(), pa.string()),
+                            'PERIODTYPE': pa.dictionary(pa.int32(), pa.string())}
+            table = pa_csv.read_csv(
+                path,
+                convert_options=pa_csv.ConvertOptions(
+                    column_types={name: column_types[name] for name in usecols},
+                    include_columns=usecols,
+                    timestamp_parsers=[DATE_FORMAT]))
+            return table.to_pandas()
+        except (pa.ArrowInvalid, pa.ArrowTypeError, KeyError):
+            # Malformed rows: use the tolerant pandas path, which turns bad dates into NaT
+            print(f"Warning: Fast parser rejected {path}, using the tolerant parser.")
+
+    df = pd.read_csv(path, usecols=usecols,
+                     dtype={name: dtype for name, dtype in AEMO_DTYPES.items() if name in usecols})
+    if 'SETTLEMENTDATE' in df.columns:
+        df['SETTLEMENTDATE'] = pd.to_datetime(df['SETTLEMENTDATE'], format=DATE_FORMAT, errors='coerce')
+    return df[[name for name in AEMO_COLUMNS if name in df.columns]]
+
+
+##
+# @brief Reads several AEMO CSV files, in parallel when there is more than one.
+#
+# @param paths List of file paths.
+# @param reader Module-level callable taking a path (defaults to read_aemo_csv).
+# @param workers Optional number of processes (defaults to min(files, CPU cores)).
+# @return Dictionary mapping each successfully read path to its DataFrame.
+def read_aemo_files(paths, reader=read_aemo_csv, workers=None):
+    paths = list(paths)
+    workers = workers or min(len(paths), os.cpu_count() or 1)
+    results = {}
+    if workers <= 1 or len(paths) <= 1:
+        for path in paths:
+            try:
+                results[path] = reader(path)
+            except Exception:
+                print(f"Warning: Failed to read {path}. Skipping.")
+                traceback.print_exc()
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {path: pool.submit(reader, path) for path in paths}
+        for path, future in futures.items():
+            try:
+                results[path] = future.result()
+            except Exception:
+                print(f"Warning: Failed to read {path}. Skipping.")
+                traceback.print_exc()
+    return results
@@ -0,0 +1,93 @@
+##
+# @file CsvExport.py
+# @brief CSV exports of the pipeline datasets: written synchronously, in the background, or not at all.
+#
+# The pipeline stages hand their DataFrames to each other in memory and the columnar
+# DataStore is the source of truth, so the CSV files in FiltredDataSet and CSVs are only
+# exports for people and other tools. CSV_EXPORT selects how they are written:
+# - sync:  before the stage returns (default)
+# - async: by a background thread while the next stages run; wait_for_exports() blocks
+#          until every export is on disk (the pipeline calls it before it ends)
+# - off:   not written
+#
+# A file is written under a temporary name and renamed, so readers never see a
+# partial export.
+##
+
+import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from General.regions import ENV_PATH
+
+## @brief Export modes accepted in CSV_EXPORT.
+EXPORT_MODES = ('sync', 'async', 'off')
+
+## @brief Background writer (one thread, created on first use) and its pending exports.
+_EXPORTS = {'executor': None, 'pending': []}
+_LOCK = threading.Lock()
+
+
+##
+# @brief Returns the configured export mode (CSV_EXPORT).
+# @return One of EXPORT_MODES; unknown values fall back to "sync".
+def get_export_mode():
+    load_dotenv(ENV_PATH)
+    mode = os.getenv('CSV_EXPORT', 'sync').strip().lower()
+    if mode not in EXPORT_MODES:
+        print(f"Warning: Unknown CSV_EXPORT '{mode}', expected one of {EXPORT_MODES}; using 'sync'.")
+        return 'sync'
+    return mode
+
+
+##
+# @brief Writes a DataFrame to a CSV file through a temporary file.
+def _write_csv(df, path, kwargs):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    df.to_csv(path + ".tmp", **kwargs)
+    os.replace(path + ".tmp", path)
+    print(f"CSV export saved to: {path}")
+
+
+##
+# @brief Exports a DataFrame to CSV in the configured mode.
+#
+# In async mode the frame is captured as a copy-on-write snapshot, so the caller may
+# keep using (and even modify) it while the export is written.
+#
+# @param df DataFrame to export.
+# @param path Path of the CSV file (relative paths are resolved immediately).
+# @param mode Export mode; defaults to get_export_mode().
+# @param kwargs Options passed to DataFrame.to_csv().
+# @return Absolute path of the export, or None when exports are off.
+def export_csv(df, path, mode=None, **kwargs):
+    mode = mode or get_export_mode()
+    if mode == 'off':
+        return None
+    path = os.path.abspath(path)
+    if mode == 'sync':
+        _write_csv(df, path, kwargs)
+        return path
+    with _LOCK:
+        if _EXPORTS['executor'] is None:
+            _EXPORTS['executor'] = ThreadPoolExecutor(max_workers=1, thread_name_prefix="csv-export")
+        _EXPORTS['pending'].append((path, _EXPORTS['executor'].submit(_write_csv, df.copy(deep=False), path, kwargs)))
+    return path
+
+
+##
+# @brief Blocks until all background exports are written.
+# @return List of the paths that could not be written.
+def wait_for_exports():
+    with _LOCK:
+        pending, _EXPORTS['pending'] = _EXPORTS['pending'], []
+    failed = []
+    for path, future in pending:
+        try:
+            future.result()
+        except Exception:
+            print(f"ERROR: CSV export to {path} failed.")
+            traceback.print_exc()
+            failed.append(path)
+    return failed
@@ -4,8 +4,12 @@
 #
 # This script searches for CSV files that match a specific pattern, loads them,
 # merges them into one DataFrame, converts timestamps, and saves the result to disk.
+# Only raw files that are new or changed since the last run are parsed again.
 #
-# The combined dataset is saved to the "FiltredDataset" folder for further analysis.
+# The combined dataset is saved to the columnar DataStore (partitioned by region and
+# month) for further analysis, with a CSV export of one file per month in the
+# "FiltredDataSet" folder (synchronous, in the background or off, see CsvExport).
+# Only the months that changed are stored, exported and returned.
 #
 # @author Fedor
 # @date 2025-04-20
@@ -15,65 +19,205 @@ import pandas as pd
 import glob
 import os
 import traceback
+import json
+from CodeDataPreparation import DataStore
+from CodeDataPreparation.DownloadManifest import file_checksum
+from CodeDataPreparation.AemoReader import read_aemo_csv, read_aemo_files
+from CodeDataPreparation.DataCompact import is_compact_mode, compact_frame
+from CodeDataPreparation.CsvExport import export_csv, get_export_mode
+from General.layout import OUTPUT_FOLDER, combined_folder, raw_pattern
+
+##
+# @brief Returns the path of one month of the combined 5-minute CSV export of a region.
+# @param region Region code, e.g., "NSW1".
+# @param month Month as "YYYY-MM".
+# @return Relative path of the monthly CSV file.
+def combined_path(region="NSW1", month="2024-12"):
+    return os.path.join(combined_folder(region), f"PRICE_AND_DEMAND_{month.replace('-', '')}_ALL_{region}.csv")
+
+##
+# @brief Exports months of the combined dataset, one CSV file per month.
+# @param df Combined rows of the months (layout of load_combined()).
+# @param region Region code.
+# @param months Months to export; their files are replaced, or removed when the month has no rows.
+def export_months(df, region, months):
+    indexed = df.index.name == 'SETTLEMENTDATE'
+    keys = DataStore.month_keys(df.index if indexed else df['SETTLEMENTDATE'])
+    for month in sorted(months):
+        rows = df[keys == month]
+        if len(rows):
+            export_csv(rows, combined_path(region, month), index=indexed)
+        elif os.path.exists(combined_path(region, month)):
+            os.remove(combined_path(region, month))
+
+## @brief Name of the per-region ingest manifest kept inside the combined store.
+INGEST_MANIFEST = "_ingested.json"
+
+##
+# @brief Loads the ingest manifest of a region (raw file name -> mtime, size, hash, months).
+# @param region Region code.
+# @return Dictionary, empty when nothing was ingested yet.
+def load_ingest_manifest(region):
+    path = os.path.join(DataStore.region_folder("combined", region), INGEST_MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+##
+# @brief Writes the ingest manifest of a region atomically.
+# @param region Region code.
+# @param manifest Dictionary returned by load_ingest_manifest() and updated by the caller.
+def save_ingest_manifest(region, manifest):
+    folder = DataStore.region_folder("combined", region)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, INGEST_MANIFEST)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+##
+# @brief Tells whether a raw file differs from its ingest manifest entry.
+#
+# Matching mtime and size are trusted without reading the file. Otherwise the
+# checksum decides, so a file that was only touched is not parsed again.
+#
+# @param file Path of the raw CSV file.
+# @param entry Manifest entry of the file, or None.
+# @return True if the file must be (re)ingested.
+def file_changed(file, entry):
+    if not entry:
+        return True
+    stat = os.stat(file)
+    if stat.st_mtime_ns == entry.get('mtime_ns') and stat.st_size == entry.get('size'):
+        return False
+    if stat.st_size == entry.get('size') and file_checksum(file) == entry.get('sha256'):
+        entry['mtime_ns'] = stat.st_mtime_ns
+        return False
+    return True
+
+##
+# @brief Loads one raw monthly file with the typed AEMO reader.
+# @param file Path of the raw CSV file.
+# @return DataFrame with a datetime 'SETTLEMENTDATE' column.
+def load_month_file(file):
+    print(f"Loading file: {file}")
+    df = read_aemo_csv(file)
+    if df['SETTLEMENTDATE'].isnull().any():
+        print(f"Warning: Null values detected in 'SETTLEMENTDATE' of {file} after conversion.")
+    return df
+
+##
+# @brief Reads a region's combined dataset back from the store in the configured layout.
+#
+# In compact mode (COMPACT_MEMORY=1) the frame keeps its datetime index and float32
+# values; otherwise SETTLEMENTDATE is returned as a regular column.
+#
+# @param region Region code.
+# @param months Optional list of "YYYY-MM" partitions to read (default: the whole history).
+# @return DataFrame with the combined 5-minute rows.
+def load_combined(region, months=None):
+    df = DataStore.read_dataset("combined", region, months=months)
+    return compact_frame(df) if is_compact_mode() else df.reset_index()
 
 ##
 # @brief Combines electricity demand and price data from multiple monthly CSV files.
 #
 # This function performs the following steps:
-# - Searches for all CSV files matching a specific naming pattern.
-# - Loads and concatenates them into a single Pandas DataFrame.
-# - Converts the 'SETTLEMENTDATE' column to datetime format.
-# - Saves the combined dataset to a new CSV file.
+# - Searches for the raw monthly CSV files matching raw_pattern() (DOWNLOAD_FOLDER, COMBINE_MONTHS).
+# - Detects which files are new or modified since the last run (mtime, size, SHA-256).
+# - Loads only those files (plus the neighbours sharing a month partition with them)
+#   with the typed AEMO reader, in parallel processes.
+# - Replaces the affected month partitions of the columnar store.
+# - Exports the affected months to their monthly CSV files (see CsvExport).
+#
+# The work therefore grows with the number of changed months, not with the history:
+# neither the stored history nor the CSV export of unchanged months is read or written.
+# Consumers of the whole history read it from the store (load_combined(), or month by
+# month with StreamResample.iter_store_chunks()).
 #
-# @return Pandas DataFrame containing the combined dataset, or None if an error occurs.
+# @param region Region code whose monthly files are combined, e.g., "NSW1".
+# @return Pandas DataFrame with the rows of the replaced months only (empty when nothing
+#         changed; compact layout when COMPACT_MEMORY=1), or None if an error occurs.
 ##
-def combine_data():
+def combine_data(region="NSW1"):
     try:
         print("Step 1: Locating input CSV files...")
-        input_pattern = "DataSetOrigin/PRICE_AND_DEMAND_2024*_NSW1.csv"
+        input_pattern = raw_pattern(region)
         csv_files = sorted(glob.glob(input_pattern))
 
         if not csv_files:
             raise FileNotFoundError(f"No files matched pattern: {input_pattern}")
 
-        print(f"Found {len(csv_files)} CSV files to combine.")
+        print(f"Found {len(csv_files)} CSV files.")
 
-        df_list = []
-        for file in csv_files:
-            try:
-                print(f"Loading file: {file}")
-                df = pd.read_csv(file)
-                df_list.append(df)
-            except Exception as e:
-                print(f"Warning: Failed to read {file}. Skipping.")
-                traceback.print_exc()
+        manifest = load_ingest_manifest(region)
+        stored_months = DataStore.list_months("combined", region)
+        if not stored_months:
+            manifest = {}
+        names = {os.path.basename(file): file for file in csv_files}
+        changed = [file for file in csv_files if file_changed(file, manifest.get(os.path.basename(file)))]
+        removed = [name for name in manifest if name not in names]
 
-        if not df_list:
-            raise ValueError("No valid CSV files could be loaded.")
+        if not changed and not removed:
+            print("Step 2: No new or modified monthly files, combined dataset is up to date.")
+            save_ingest_manifest(region, manifest)
+            # Only months whose CSV export is missing are read back and exported
+            missing = [month for month in stored_months if not os.path.exists(combined_path(region, month))]
+            if missing and get_export_mode() != 'off':
+                export_months(load_combined(region, missing), region, missing)
+            return load_combined(region, [])
+
+        print(f"Step 2: Ingesting {len(changed)} new or modified file(s), {len(removed)} removed...")
+        loaded = {os.path.basename(file): df for file, df in read_aemo_files(changed, load_month_file).items()}
 
-        print("Step 2: Concatenating data...")
-        combined_df = pd.concat(df_list, ignore_index=True)
+        if not loaded and not removed:
+            raise ValueError("No valid CSV files could be loaded.")
 
-        if 'SETTLEMENTDATE' not in combined_df.columns:
-            raise KeyError("Missing required column 'SETTLEMENTDATE' in combined data.")
+        # A raw file can spill into the next month partition (the 00:00 interval of the 1st),
+        # so every partition touched by a changed file is rebuilt from all files that feed it.
+        affected = set() if manifest else set(stored_months)
+        for name, df in loaded.items():
+            affected.update(DataStore.month_keys(df['SETTLEMENTDATE'].dropna()))
+        for name in list(loaded) + removed:
+            affected.update(manifest.get(name, {}).get('months', []))
+        neighbours = [names[name] for name, entry in manifest.items()
+                      if name in names and name not in loaded and affected.intersection(entry.get('months', []))]
+        loaded.update({os.path.basename(file): df for file, df in read_aemo_files(neighbours, load_month_file).items()})
 
-        print("Step 3: Converting 'SETTLEMENTDATE' to datetime...")
-        combined_df['SETTLEMENTDATE'] = pd.to_datetime(combined_df['SETTLEMENTDATE'], errors='coerce')
+        print("Step 3: Replacing affected month partitions in the columnar store...")
+        parts = pd.concat(list(loaded.values()), ignore_index=True) if loaded else pd.DataFrame()
+        if not parts.empty:
+            parts = parts.dropna(subset=['SETTLEMENTDATE'])
+            parts = parts[DataStore.month_keys(parts['SETTLEMENTDATE']).isin(affected)]
+            parts = parts.sort_values('SETTLEMENTDATE', kind='stable')
+        written = DataStore.write_dataset(parts, "combined", region) if not parts.empty else []
+        DataStore.delete_months("combined", region, affected - set(written))
+        print(f"Updated months: {', '.join(sorted(affected))}")
 
-        if combined_df['SETTLEMENTDATE'].isnull().any():
-            print("Warning: Null values detected in 'SETTLEMENTDATE' after conversion.")
+        for name in removed:
+            manifest.pop(name, None)
+        for name, df in loaded.items():
+            stat = os.stat(names[name])
+            manifest[name] = {
+                'mtime_ns': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'sha256': file_checksum(names[name]),
+                'months': sorted(set(DataStore.month_keys(df['SETTLEMENTDATE'].dropna()))),
+            }
+        save_ingest_manifest(region, manifest)
 
-        output_folder = "FiltredDataset"
-        output_file = os.path.join(output_folder, "PRICE_AND_DEMAND_2024_ALL_NSW1.csv")
+        combined_df = load_combined(region, written)
 
-        print("Step 4: Saving combined dataset to output CSV...")
-        os.makedirs(output_folder, exist_ok=True)
-        combined_df.to_csv(output_file, index=False)
-        print(f"Combined dataset successfully saved to: {output_file}")
+        print("Step 4: Exporting the updated months to CSV...")
+        export_months(combined_df, region, affected)
 
         return combined_df
 
     except Exception as e:
-        print("Error occurred during data combination.")
+        print(f"Error occurred during data combination for {region}.")
         traceback.print_exc()
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,66 @@
+##
+# @file DataCompact.py
+# @brief Opt-in compact in-memory representation of the 5-minute history.
+#
+# In compact mode (COMPACT_MEMORY=1 in .env) the combined DataFrame is held with:
+# - a DatetimeIndex instead of a SETTLEMENTDATE column
+# - categorical REGION and PERIODTYPE columns
+# - float32 TOTALDEMAND and RRP columns
+#
+# Precision check: AEMO publishes demand and price with two decimals. float32 has a
+# 24-bit mantissa, so for magnitudes below 32768 (demand and the market price cap are
+# both below that) neighbouring float32 values are at most 2^-9 ~ 0.002 apart and the
+# rounding error is at most ~0.001, well inside half a cent (0.005). compact_frame()
+# verifies this on the actual data and keeps float64 for any column whose round-trip
+# error exceeds the tolerance.
+##
+
+import os
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from General.regions import ENV_PATH
+
+## @brief Largest accepted absolute error of the float32 down-cast (half of 0.01).
+FLOAT32_TOLERANCE = 0.005
+
+## @brief Columns that are down-cast to float32 in compact mode.
+FLOAT_COLUMNS = ('TOTALDEMAND', 'RRP')
+
+## @brief Columns that are stored as categoricals in compact mode.
+CATEGORY_COLUMNS = ('REGION', 'PERIODTYPE')
+
+
+##
+# @brief Tells whether compact mode is enabled through COMPACT_MEMORY.
+# @return True if COMPACT_MEMORY is set to 1/true/yes.
+def is_compact_mode():
+    load_dotenv(ENV_PATH)
+    return os.getenv('COMPACT_MEMORY', '0').strip().lower() in ('1', 'true', 'yes')
+
+
+##
+# @brief Converts a combined 5-minute DataFrame to the compact representation.
+#
+# @param df DataFrame with a SETTLEMENTDATE column or a DatetimeIndex.
+# @param tolerance Largest accepted absolute error of the float32 down-cast.
+# @return Compact DataFrame indexed by SETTLEMENTDATE.
+def compact_frame(df, tolerance=FLOAT32_TOLERANCE):
+    if 'SETTLEMENTDATE' in df.columns:
+        df = df.set_index(pd.DatetimeIndex(df['SETTLEMENTDATE'], name='SETTLEMENTDATE'))
+        df = df.drop(columns='SETTLEMENTDATE')
+    columns = {}
+    for name in df.columns:
+        column = df[name]
+        if name in CATEGORY_COLUMNS and not isinstance(column.dtype, pd.CategoricalDtype):
+            column = column.astype('category')
+        elif name in FLOAT_COLUMNS and column.dtype != np.float32:
+            downcast = column.astype(np.float32)
+            error = np.nanmax(np.abs(downcast.to_numpy(np.float64) - column.to_numpy(np.float64)),
+                              initial=0.0)
+            if error <= tolerance:
+                column = downcast
+            else:
+                print(f"Warning: float32 error {error:.4g} on '{name}' exceeds {tolerance}; keeping float64.")
+        columns[name] = column
+    return pd.DataFrame(columns, index=df.index)
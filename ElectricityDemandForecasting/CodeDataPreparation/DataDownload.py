@@ -14,37 +14,150 @@ import os
 import requests
 import logging
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
+from CodeDataPreparation.DownloadManifest import DownloadManifest
+from General.regions import get_regions
+
+## @brief Default number of concurrent month downloads when DOWNLOAD_WORKERS is not set.
+DEFAULT_WORKERS = 4
+
+## @brief Connect and read timeouts (seconds) applied to every request.
+REQUEST_TIMEOUT = (10, 120)
+
+## @brief Default number of attempts per file when DOWNLOAD_RETRIES is not set.
+DEFAULT_RETRIES = 3
+
+## @brief Suffix of in-progress downloads; they never match the "*.csv" input patterns.
+PART_SUFFIX = ".part"
+
+
+##
+# @brief Raised when a transfer ends before the size announced by the server.
+class IncompleteDownloadError(requests.exceptions.RequestException):
+    pass
+
+##
+# @brief Creates a keep-alive HTTP session shared by all download workers.
+#
+# The connection pool is sized to the worker count so every thread can reuse an
+# open TCP/TLS connection instead of performing a fresh handshake per month.
+#
+# @param workers Number of threads that will share the session.
+# @return A configured requests.Session.
+def create_session(workers):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, workers))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"User-Agent": "Mozilla/5.0"})
+    return session
+
+##
+# @brief Downloads a URL to a local file atomically, resuming partial transfers.
+#
+# Data is streamed into "<file_path>.part". If a partial file already exists the
+# transfer resumes with an HTTP Range request (guarded by If-Range when a validator
+# is known). The received size is checked against Content-Length / Content-Range and
+# only a complete file is renamed onto the final path, so readers never see a
+# truncated CSV. On failure the partial file is kept for the next attempt.
+#
+# @param session requests.Session used for the transfer.
+# @param url URL to download.
+# @param file_path Final destination path.
+# @param headers Optional extra request headers (e.g. conditional headers).
+# @param if_range Optional ETag or Last-Modified value of the partial file's source.
+# @param on_response Optional callback receiving the response headers before data is written.
+# @return Tuple (response, bytes_received); response.status_code is 304 if nothing was written.
+def resumable_download(session, url, file_path, headers=None, if_range=None, on_response=None):
+    part_path = file_path + PART_SUFFIX
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = dict(headers or {})
+    if offset:
+        headers['Range'] = f"bytes={offset}-"
+        if if_range:
+            headers['If-Range'] = if_range
+
+    with session.get(url, stream=True, timeout=REQUEST_TIMEOUT, headers=headers) as r:
+        if r.status_code == 304:
+            return r, 0
+        if r.status_code == 416:
+            # The partial file no longer matches the remote one; start over next attempt
+            os.remove(part_path)
+            raise IncompleteDownloadError(f"Range not satisfiable for {url}, discarded partial file")
+        r.raise_for_status()
+
+        if r.status_code == 206:
+            content_range = r.headers.get('Content-Range', '')
+            start, _, total = content_range.replace('bytes ', '').partition('/')
+            if not start.startswith(f"{offset}-"):
+                os.remove(part_path)
+                raise IncompleteDownloadError(f"Unexpected Content-Range '{content_range}' for {url}")
+            expected = int(total) if total.isdigit() else None
+            mode = 'ab'
+        else:
+            length = r.headers.get('Content-Length')
+            expected = int(length) if length and length.isdigit() else None
+            offset, mode = 0, 'wb'
+
+        if on_response:
+            on_response(r.headers)
+        received = 0
+        with open(part_path, mode) as f:
+            for chunk in r.iter_content(chunk_size=8192):
+                if chunk:
+                    f.write(chunk)
+                    received += len(chunk)
+
+    size = offset + received
+    if expected is not None and size != expected:
+        raise IncompleteDownloadError(f"Received {size} of {expected} bytes for {url}")
+    os.replace(part_path, file_path)
+    return r, received
 
 ##
 # @brief Downloads energy price and demand CSV files from a remote AEMO server.
 #
 # Uses environment variables to determine the region, date range, and URL path.
 # Automatically logs download status and stores files locally in a defined folder.
+# A download manifest lets closed months be skipped and open months be revalidated
+# with a conditional request instead of a full transfer.
 #
 # Expected environment variables in `.env`:
 # - REGION: e.g., "NSW1"
+# - REGIONS: Optional comma-separated list, e.g., "NSW1,QLD1,VIC1"; overrides REGION
 # - START_MONTH: e.g., "202301"
 # - END_MONTH: Optional; defaults to START_MONTH
 # - MODE: "H" (hourly by month range) or "D" (daily by single file)
 # - BASE_URL: Base URL for downloading AEMO CSV files
 # - LOG_FOLDER: Optional log output directory
 # - DOWNLOAD_FOLDER: Optional local folder to store downloads
-def download_energy_data():
+# - DOWNLOAD_WORKERS: Optional number of concurrent downloads (default 4)
+# - DOWNLOAD_RETRIES: Optional number of resumed attempts per file (default 3)
+#
+# Months of all regions share one worker pool and one connection pool.
+#
+# @param regions Optional list of region codes; defaults to REGIONS / REGION from `.env`.
+# @return List of local file paths for the requested months that are present and up to date.
+def download_energy_data(regions=None):
     # --- Load environment variables from .env file ---
     load_dotenv()
 
-    region = os.getenv('REGION')
+    regions = regions or get_regions()
     start_month = os.getenv('START_MONTH')
     end_month = os.getenv('END_MONTH', start_month)
     mode = os.getenv('MODE', 'H').upper()
     base_url = os.getenv('BASE_URL')
+    workers = int(os.getenv('DOWNLOAD_WORKERS', DEFAULT_WORKERS))
+    retries = max(1, int(os.getenv('DOWNLOAD_RETRIES', DEFAULT_RETRIES)))
 
-    if not region or not start_month or not base_url:
+    if not regions or not start_month or not base_url:
         print("ERROR: Missing required environment variables.")
-        return
+        return []
 
     log_folder = os.getenv('LOG_FOLDER', './logs/')
     download_folder = os.getenv('DOWNLOAD_FOLDER', './DataSetOrigin')
@@ -62,24 +175,57 @@ def download_energy_data():
         logger.addHandler(file_handler)
         logger.addHandler(console_handler)
 
+    session = create_session(workers)
+    manifest = DownloadManifest(download_folder)
+
     ##
-    # @brief Downloads a specific month of CSV data.
+    # @brief Downloads a specific month of CSV data through the shared session.
+    #
+    # Closed months already in the manifest are skipped without any request; other
+    # known months are revalidated with If-None-Match / If-Modified-Since.
+    #
+    # @param region Region code, e.g., "NSW1"
     # @param year_month A string in YYYYMM format, e.g., "202401"
-    def download_file(year_month):
+    # @return Tuple (file_path, bytes, seconds), or None if the download failed.
+    def download_file(region, year_month):
         filename = f"PRICE_AND_DEMAND_{year_month}_{region}.csv"
         file_path = os.path.join(download_folder, filename)
         url = f"{base_url}{filename}"
 
-        try:
-            with requests.get(url, stream=True, headers={"User-Agent": "Mozilla/5.0"}) as r:
-                r.raise_for_status()
-                with open(file_path, 'wb') as f:
-                    for chunk in r.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-            logger.info(f"Downloaded: {filename}")
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Failed to download {year_month}: {e}")
+        entry = manifest.valid_entry(filename)
+        if entry and entry.get('closed'):
+            logger.info(f"Up to date (closed month): {filename}")
+            return file_path, 0, 0.0
+
+        headers = DownloadManifest.conditional_headers(entry)
+        started = time.perf_counter()
+        size = 0
+        for attempt in range(1, retries + 1):
+            try:
+                # Partial transfers resume where the previous attempt (or run) stopped
+                r, received = resumable_download(
+                    session, url, file_path, headers,
+                    if_range=manifest.partial_validator(filename),
+                    on_response=lambda response_headers: manifest.record_partial(filename, response_headers))
+                size += received
+                if r.status_code == 304 and entry:
+                    if os.path.exists(file_path + PART_SUFFIX):
+                        os.remove(file_path + PART_SUFFIX)
+                    manifest.touch(filename, year_month)
+                    logger.info(f"Not modified: {filename}")
+                    return file_path, 0, time.perf_counter() - started
+                manifest.record(filename, year_month, r.headers)
+                break
+            except requests.exceptions.RequestException as e:
+                if attempt == retries:
+                    logger.error(f"Failed to download {region} {year_month}: {e}")
+                    return None
+                logger.warning(f"Retrying {filename} (attempt {attempt + 1}/{retries}): {e}")
+
+        elapsed = time.perf_counter() - started
+        rate = size / (1024 ** 2) / elapsed if elapsed > 0 else 0.0
+        logger.info(f"Downloaded: {filename} ({size / 1024:.1f} KB in {elapsed:.2f}s, {rate:.2f} MB/s)")
+        return file_path, size, elapsed
 
     ##
     # @brief Generates a list of months between a start and end month.
@@ -95,9 +241,27 @@ def download_energy_data():
 
     # Perform downloads based on mode
     if mode == "H":
-        for ym in month_range(start_month, end_month):
-            download_file(ym)
+        months = list(month_range(start_month, end_month))
     elif mode == "D":
-        download_file(start_month)
+        months = [start_month]
     else:
-        logger.error("Invalid mode in config. Use 'H' or 'D'.")
\ No newline at end of file
+        logger.error("Invalid mode in config. Use 'H' or 'D'.")
+        return []
+
+    # Months and regions are independent, so they are fetched concurrently over the pooled session
+    jobs = [(region, ym) for region in regions for ym in months]
+    started = time.perf_counter()
+    with session, ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = [res for res in pool.map(lambda job: download_file(*job), jobs) if res]
+    wall = time.perf_counter() - started
+    manifest.save()
+
+    total_bytes = sum(size for _, size, _ in results)
+    transferred = sum(1 for _, size, _ in results if size)
+    busy = sum(seconds for _, _, seconds in results)
+    rate = total_bytes / (1024 ** 2) / wall if wall > 0 else 0.0
+    logger.info(f"{len(results)}/{len(jobs)} files up to date ({transferred} transferred), "
+                f"{total_bytes / (1024 ** 2):.2f} MB "
+                f"in {wall:.2f}s ({rate:.2f} MB/s aggregate, {workers} workers, "
+                f"concurrency {busy / wall if wall > 0 else 0.0:.1f}x)")
+    return [path for path, _, _ in results]
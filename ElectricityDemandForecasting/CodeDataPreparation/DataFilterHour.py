@@ -4,7 +4,7 @@
 #
 # This script takes a DataFrame with timestamped electricity data,
 # resamples it to an hourly frequency, and exports it to a CSV file
-# for further forecasting or analysis.
+# for further forecasting or analysis (see CsvExport for CSV_EXPORT).
 #
 # Includes structured error handling and informative console output.
 #
@@ -13,45 +13,133 @@
 ##
 
 import pandas as pd
-import matplotlib.pyplot as plt
 import traceback
 import os
+from contextlib import nullcontext
+from General.layout import hourly_path
+from CodeDataPreparation.CsvExport import export_csv, get_export_mode
+from CodeDataPreparation import DataStore
+from CodeDataPreparation.FastResample import grid_resample_mean
+from CodeDataPreparation.StreamResample import iter_store_chunks, iter_file_chunks, stream_resample_mean
 
 ##
 # @brief Resamples electricity data to an hourly frequency.
 #
 # This function takes a Pandas DataFrame with minute-level or irregular time intervals,
-# sets the 'SETTLEMENTDATE' column as the index, and computes the hourly mean
-# of 'TOTALDEMAND' and 'RRP' values. The resulting dataset is saved as a CSV file.
+# uses the 'SETTLEMENTDATE' column as the index (without modifying the input), and computes the hourly mean
+# of 'TOTALDEMAND' and 'RRP' values. The frame holds the months replaced by the combine
+# stage: their hourly partitions are written to the columnar store, the hours of the
+# other combined months are read back from the hourly store (never from the 5-minute
+# store), and the full hourly history is exported as a CSV file and returned for the
+# forecast stage. Hourly months that left the combined dataset are deleted.
 #
-# @param df The input Pandas DataFrame containing electricity data with a 'SETTLEMENTDATE' column.
-# @return A new DataFrame with hourly resampled data, or None if an error occurs.
+# @param df The input Pandas DataFrame containing electricity data with a 'SETTLEMENTDATE' column
+#           or, in compact mode, a datetime index.
+# @param region Region code used to name the output file, e.g., "NSW1".
+# @return A new DataFrame with the full hourly history, or None if an error occurs.
 ##
-def filter_data_by_hour(df):
+def filter_data_by_hour(df, region="NSW1"):
     try:
         print("Step 1: Validating input data...")
-        required_columns = {'SETTLEMENTDATE', 'TOTALDEMAND', 'RRP'}
+        required_columns = {'TOTALDEMAND', 'RRP'}
         if not required_columns.issubset(df.columns):
             raise ValueError(f"Missing required columns: {required_columns - set(df.columns)}")
 
-        print("Step 2: Converting 'SETTLEMENTDATE' to datetime format...")
-        df['SETTLEMENTDATE'] = pd.to_datetime(df['SETTLEMENTDATE'], errors='coerce')
-        if df['SETTLEMENTDATE'].isnull().any():
-            print("Warning: Null values detected in 'SETTLEMENTDATE' after conversion.")
+        if 'SETTLEMENTDATE' in df.columns:
+            print("Step 2: Converting 'SETTLEMENTDATE' to datetime format...")
+            # Work on a re-indexed view so the caller's DataFrame is left untouched
+            df = df.assign(SETTLEMENTDATE=pd.to_datetime(df['SETTLEMENTDATE'], errors='coerce'))
+            if df['SETTLEMENTDATE'].isnull().any():
+                print("Warning: Null values detected in 'SETTLEMENTDATE' after conversion.")
+            df = df.set_index('SETTLEMENTDATE')
+        elif not isinstance(df.index, pd.DatetimeIndex):
+            raise ValueError("Missing required column 'SETTLEMENTDATE' or datetime index.")
+        else:
+            print("Step 2: Using the existing datetime index (compact layout)...")
 
-        print("Step 3: Setting datetime index and resampling to hourly frequency...")
-        df.set_index('SETTLEMENTDATE', inplace=True)
-        hourly_df = df[['TOTALDEMAND', 'RRP']].resample('H').mean()
+        print("Step 3: Resampling to hourly frequency...")
+        # Complete hours of the 5-minute grid are averaged by a NumPy reshape; only hours
+        # with gaps or duplicates use the generic resampler. Means are kept in float64.
+        hourly_df = grid_resample_mean(df, 'h', ['TOTALDEMAND', 'RRP'])
+        # Resampling fills the months between the replaced ones; those keep their stored hours
+        months = set(DataStore.month_keys(df.index[df.index.notna()]))
+        hourly_df = hourly_df[DataStore.month_keys(hourly_df.index).isin(months)]
 
-        print("Step 4: Saving resampled data to CSV file...")
-        output_path = "FiltredDataset/PRICE_AND_DEMAND_2024_HOURLY_NSW1.csv"
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        hourly_df.to_csv(output_path)
-        print(f"Resampled data successfully saved to: {output_path}")
+        print("Step 4: Writing resampled data to the columnar store...")
+        DataStore.write_dataset(hourly_df, "hourly", region)
+        stored = set(DataStore.list_months("hourly", region)) - months
+        combined = set(DataStore.list_months("combined", region))
+        DataStore.delete_months("hourly", region, stored - combined)
+        kept = sorted(stored & combined)
+        if kept:
+            hourly_df = pd.concat([DataStore.read_dataset("hourly", region, months=kept), hourly_df]).sort_index()
+
+        print("Step 5: Exporting resampled data to CSV file...")
+        export_csv(hourly_df, hourly_path(region))
 
         return hourly_df
 
     except Exception as e:
-        print("Error occurred during hourly data resampling.")
+        print(f"Error occurred during hourly data resampling for {region}.")
+        traceback.print_exc()
+        return None
+
+##
+# @brief Resamples a region's history to hourly frequency in bounded memory.
+#
+# The 5-minute history is streamed one month at a time from the columnar store (or
+# from the given raw monthly files), and the hourly means are written to the store
+# and appended to the CSV export month by month (unless CSV_EXPORT=off). Peak memory is
+# one month of 5-minute rows plus one month of hourly rows, independent of the length
+# of the history.
+#
+# @param region Region code, e.g., "NSW1".
+# @param paths Optional raw monthly CSV files to read instead of the combined store.
+# @return Number of hourly rows written, or None if an error occurs.
+##
+def filter_data_by_hour_streaming(region="NSW1", paths=None):
+    try:
+        print("Step 1: Streaming 5-minute data month by month...")
+        chunks = iter_file_chunks(paths) if paths is not None else iter_store_chunks(region)
+
+        output_path = hourly_path(region)
+        tmp_path = output_path + ".tmp"
+        # The months are appended as they complete, so the export is always written inline
+        export = get_export_mode() != 'off'
+        if export:
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        written, rows, pending = [], 0, None
+
+        print("Step 2: Resampling and writing completed months...")
+        with (open(tmp_path, 'w', newline='') if export else nullcontext()) as csv_file:
+            for block in stream_resample_mean(chunks, 'h'):
+                pending = block if pending is None else pd.concat([pending, block])
+                # Every month before the month of the newest hour is complete
+                months = DataStore.month_keys(pending.index)
+                done = months < months[-1]
+                if done.any():
+                    written += DataStore.write_dataset(pending[done], "hourly", region)
+                    if export:
+                        pending[done].to_csv(csv_file, header=rows == 0)
+                    rows += int(done.sum())
+                    pending = pending[~done]
+            if pending is not None and len(pending):
+                written += DataStore.write_dataset(pending, "hourly", region)
+                if export:
+                    pending.to_csv(csv_file, header=rows == 0)
+                rows += len(pending)
+
+        if not rows:
+            if export:
+                os.remove(tmp_path)
+            raise ValueError(f"No 5-minute data found for region {region}.")
+        if export:
+            os.replace(tmp_path, output_path)
+        DataStore.delete_months("hourly", region, set(DataStore.list_months("hourly", region)) - set(written))
+        print(f"Resampled {rows} hours successfully saved to: {output_path if export else 'the columnar store'}")
+        return rows
+
+    except Exception as e:
+        print(f"Error occurred during streaming hourly resampling for {region}.")
         traceback.print_exc()
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,270 @@
+##
+# @file DataRollup.py
+# @brief Multi-resolution rollups of the 5-minute history, persisted in the columnar store.
+#
+# One pass over the 5-minute rows (one month partition at a time) produces 30-minute
+# aggregates. Every coarser resolution is then built from the previous one instead of
+# from the raw rows:
+#
+#   5min -> 30min -> h -> D -> W
+#                         D -> MS
+#
+# Sums, interval counts, minima and maxima combine exactly across levels, so every
+# level carries them and the means are derived at the end. The peak timestamp of a
+# bucket is the peak timestamp of its highest sub-bucket (the earliest one on ties).
+# Buckets are labelled like pandas resample: by their start, except for weeks, which
+# end on Sunday and are labelled by that day.
+#
+# Each resolution is stored as the dataset "rollup_<resolution>" with the columns:
+# - TOTALDEMAND_MEAN, TOTALDEMAND_MIN, TOTALDEMAND_MAX (MW)
+# - TOTALDEMAND_PEAK: timestamp of the maximum 5-minute demand
+# - ENERGY_MWH: energy of the bucket (sum of 5-minute demand x 5/60 h)
+# - RRP_MEAN, RRP_MIN, RRP_MAX ($/MWh)
+# - INTERVALS: number of 5-minute demand values in the bucket
+# - RRP_INTERVALS: number of 5-minute price values in the bucket
+#
+# The stored columns still determine the partial aggregates (sum = mean x count), so
+# when the combine stage replaced only some months, the 30-minute, hourly and daily
+# rollups of those months are recomputed from the handed-over rows and the weeks and
+# months are rolled up again from the stored days; no other 5-minute rows are read.
+#
+# Consumers call coarsest_resolution() with the step of their view and read_rollup(),
+# so daily and monthly views never open 5-minute rows.
+##
+
+import traceback
+import pandas as pd
+from CodeDataPreparation import DataStore
+from General.layout import rollup_dataset
+from CodeDataPreparation.StreamResample import iter_store_chunks, iter_frame_chunks
+
+## @brief Stored resolutions and the finer resolution each one is built from.
+RESOLUTIONS = {'30min': None, 'h': '30min', 'D': 'h', 'W': 'D', 'MS': 'D'}
+
+## @brief Resolutions whose buckets never cross a month boundary; they are stored per month.
+MONTH_ALIGNED = ('30min', 'h', 'D')
+
+## @brief Length of one AEMO dispatch interval in hours.
+INTERVAL_HOURS = 5 / 60
+
+## @brief Calendar steps that are answered by a calendar resolution.
+CALENDAR_STEPS = {'W': 'W', 'W-SUN': 'W', 'MS': 'MS', 'QS': 'MS', 'YS': 'MS'}
+
+
+##
+# @brief Turns 5-minute rows into single-interval partial aggregates.
+def _partials(df):
+    demand, price = df['TOTALDEMAND'].astype('float64'), df['RRP'].astype('float64')
+    return pd.DataFrame({
+        'TOTALDEMAND_SUM': demand.fillna(0.0),
+        'TOTALDEMAND_COUNT': demand.notna().astype('int64'),
+        'TOTALDEMAND_MIN': demand,
+        'TOTALDEMAND_MAX': demand,
+        'TOTALDEMAND_PEAK': pd.Series(df.index, index=df.index).where(demand.notna()),
+        'RRP_SUM': price.fillna(0.0),
+        'RRP_COUNT': price.notna().astype('int64'),
+        'RRP_MIN': price,
+        'RRP_MAX': price,
+    }, index=df.index)
+
+
+##
+# @brief Combines partial aggregates into coarser buckets.
+def _roll_up(partials, freq):
+    grouped = partials.resample(freq)
+    rolled = grouped.agg({'TOTALDEMAND_SUM': 'sum', 'TOTALDEMAND_COUNT': 'sum',
+                          'TOTALDEMAND_MIN': 'min', 'TOTALDEMAND_MAX': 'max',
+                          'RRP_SUM': 'sum', 'RRP_COUNT': 'sum', 'RRP_MIN': 'min', 'RRP_MAX': 'max'})
+    # The peak of a bucket is the earliest peak among its sub-buckets holding the maximum
+    is_peak = partials['TOTALDEMAND_MAX'] == grouped['TOTALDEMAND_MAX'].transform('max')
+    rolled['TOTALDEMAND_PEAK'] = partials['TOTALDEMAND_PEAK'].where(is_peak).resample(freq).min()
+    return rolled[partials.columns]
+
+
+##
+# @brief Converts partial aggregates into the stored rollup columns.
+def _finalize(partials):
+    demand_count = partials['TOTALDEMAND_COUNT']
+    price_count = partials['RRP_COUNT']
+    return pd.DataFrame({
+        'TOTALDEMAND_MEAN': partials['TOTALDEMAND_SUM'] / demand_count.where(demand_count > 0),
+        'TOTALDEMAND_MIN': partials['TOTALDEMAND_MIN'],
+        'TOTALDEMAND_MAX': partials['TOTALDEMAND_MAX'],
+        'TOTALDEMAND_PEAK': partials['TOTALDEMAND_PEAK'],
+        'ENERGY_MWH': partials['TOTALDEMAND_SUM'] * INTERVAL_HOURS,
+        'RRP_MEAN': partials['RRP_SUM'] / price_count.where(price_count > 0),
+        'RRP_MIN': partials['RRP_MIN'],
+        'RRP_MAX': partials['RRP_MAX'],
+        'INTERVALS': demand_count,
+        'RRP_INTERVALS': price_count,
+    }, index=partials.index)
+
+
+##
+# @brief Converts stored rollup columns back into partial aggregates (inverse of _finalize()).
+def _unfinalize(rollup):
+    demand_count = rollup['INTERVALS'].astype('int64')
+    price_count = rollup['RRP_INTERVALS'].astype('int64')
+    return pd.DataFrame({
+        'TOTALDEMAND_SUM': (rollup['TOTALDEMAND_MEAN'] * demand_count).fillna(0.0),
+        'TOTALDEMAND_COUNT': demand_count,
+        'TOTALDEMAND_MIN': rollup['TOTALDEMAND_MIN'],
+        'TOTALDEMAND_MAX': rollup['TOTALDEMAND_MAX'],
+        'TOTALDEMAND_PEAK': rollup['TOTALDEMAND_PEAK'],
+        'RRP_SUM': (rollup['RRP_MEAN'] * price_count).fillna(0.0),
+        'RRP_COUNT': price_count,
+        'RRP_MIN': rollup['RRP_MIN'],
+        'RRP_MAX': rollup['RRP_MAX'],
+    }, index=rollup.index)
+
+
+##
+# @brief Computes every rollup resolution from a stream of 5-minute chunks.
+#
+# Chunks must not split a 30-minute bucket; month partitions of the store never do.
+#
+# @param chunks Iterable of DataFrames with TOTALDEMAND and RRP and a DatetimeIndex, in time order.
+# @return Dictionary mapping each resolution to its rollup DataFrame.
+def compute_rollups(chunks):
+    parts = [_roll_up(_partials(chunk), '30min') for chunk in chunks if not chunk.empty]
+    if not parts:
+        return {}
+    # The 30-minute partials of all months are concatenated and re-binned, which also
+    # inserts the empty buckets between partitions and merges any bucket split by a chunk.
+    levels = {'30min': _roll_up(pd.concat(parts), '30min')}
+    for resolution, source in RESOLUTIONS.items():
+        if source is not None:
+            levels[resolution] = _roll_up(levels[source], resolution)
+    return {resolution: _finalize(partials) for resolution, partials in levels.items()}
+
+
+##
+# @brief Recomputes the rollups of replaced months and rolls the weeks and months up again.
+#
+# The month-aligned resolutions of the replaced months are computed from their 5-minute
+# chunks and written over their partitions; the days of the other months are read back
+# from the store, so the weeks and months are rebuilt without any other 5-minute rows.
+# Rollup partitions of months that left the combined dataset are deleted.
+#
+# @param region Region code.
+# @param chunks 5-minute chunks of the replaced months, one per month, in time order.
+# @param months Replaced months ("YYYY-MM").
+# @return Dictionary mapping each resolution to the recomputed rollup rows (the replaced
+#         months, and all weeks and months); None if the stored days lack RRP_INTERVALS
+#         (written by an older version), so that a full rebuild is needed.
+def update_rollups(region, chunks, months):
+    combined = set(DataStore.list_months("combined", region))
+    daily = rollup_dataset('D')
+    kept = [month for month in DataStore.list_months(daily, region) if month in combined and month not in months]
+    days = DataStore.read_dataset(daily, region, months=kept) if kept else None
+    if days is not None and 'RRP_INTERVALS' not in days.columns:
+        return None
+
+    levels = {}
+    parts = [_roll_up(_partials(chunk), '30min') for chunk in chunks if not chunk.empty]
+    if parts:
+        levels['30min'] = _roll_up(pd.concat(parts), '30min')
+        for resolution in MONTH_ALIGNED[1:]:
+            levels[resolution] = _roll_up(levels[RESOLUTIONS[resolution]], resolution)
+        # Re-binning inserts empty buckets for the months in between; those keep their stored rollups
+        for resolution in MONTH_ALIGNED:
+            levels[resolution] = levels[resolution][DataStore.month_keys(levels[resolution].index).isin(months)]
+    all_days = [_unfinalize(days)] if days is not None else []
+    if 'D' in levels:
+        all_days.append(levels['D'])
+    if not all_days:
+        return {}
+    all_days = pd.concat(all_days).sort_index()
+    for resolution in RESOLUTIONS:
+        if resolution not in MONTH_ALIGNED:
+            levels[resolution] = _roll_up(all_days, resolution)
+
+    rollups = {resolution: _finalize(partials) for resolution, partials in levels.items()}
+    for resolution in RESOLUTIONS:
+        dataset = rollup_dataset(resolution)
+        if resolution in MONTH_ALIGNED:
+            if resolution in rollups:
+                DataStore.write_dataset(rollups[resolution], dataset, region)
+            DataStore.delete_months(dataset, region, set(DataStore.list_months(dataset, region)) - combined)
+        else:
+            DataStore.write_dataset(rollups[resolution], dataset, region, replace=True)
+    return rollups
+
+
+##
+# @brief Builds and stores all rollups of a region from its combined 5-minute history.
+#
+# The combine stage hands over the months it replaced: only their rollups are
+# recomputed, from the frame in memory one month at a time (for a float32 compact frame,
+# whose values are rounded, from their store partitions), and the weeks and months are
+# rolled up again from the stored days (see update_rollups()). Without a frame (the
+# combine stage was skipped, or streamed), every rollup is rebuilt from the store one
+# month at a time.
+#
+# @param region Region code, e.g., "NSW1".
+# @param df Optional combined DataFrame returned by combine_data().
+# @return Dictionary mapping each resolution to its rollup DataFrame (after an update,
+#         only the recomputed rows), or None if an error occurs.
+def build_rollups(region="NSW1", df=None):
+    try:
+        print(f"Building rollups for {region}...")
+        rollups = None
+        if isinstance(df, pd.DataFrame):
+            times = df[DataStore.TIME_COLUMN] if DataStore.TIME_COLUMN in df.columns else df.index
+            months = sorted(set(DataStore.month_keys(times.dropna())))
+            in_memory = all(column in df.columns and df[column].dtype == 'float64' for column in ('TOTALDEMAND', 'RRP'))
+            chunks = (iter_frame_chunks(df) if in_memory
+                      else iter_store_chunks(region, columns=['TOTALDEMAND', 'RRP'], months=months)) if months else []
+            rollups = update_rollups(region, chunks, months)
+            if rollups is not None:
+                print(f"Rollups updated for {len(months)} replaced month(s).")
+        if rollups is None:
+            rollups = compute_rollups(iter_store_chunks(region, columns=['TOTALDEMAND', 'RRP']))
+            for resolution, rollup in rollups.items():
+                DataStore.write_dataset(rollup, rollup_dataset(resolution), region, replace=True)
+        if not rollups:
+            raise ValueError(f"No combined data found for region {region}.")
+        print(f"Rollups stored for {region}: {', '.join(rollups)}")
+        return rollups
+
+    except Exception as e:
+        print(f"Error occurred while building rollups for {region}.")
+        traceback.print_exc()
+        return None
+
+
+##
+# @brief Returns the length of a fixed step such as "h", "2h" or "30min".
+def _step_length(step):
+    return pd.Timedelta(step if step[0].isdigit() else f"1{step}")
+
+
+##
+# @brief Returns the coarsest stored resolution whose buckets nest into a view's step.
+#
+# @param step Step of the view, e.g. "2h", "D", "W" or "MS".
+# @return One of RESOLUTIONS, e.g. "h" for "2h".
+# @throws ValueError If the step is finer than 30 minutes or not aligned to it.
+def coarsest_resolution(step):
+    if step in CALENDAR_STEPS:
+        return CALENDAR_STEPS[step]
+    step = _step_length(step)
+    for resolution in ('D', 'h', '30min'):
+        if step % _step_length(resolution) == pd.Timedelta(0):
+            return resolution
+    raise ValueError(f"Step {step} is not a multiple of 30 minutes; use the 5-minute data.")
+
+
+##
+# @brief Reads a stored rollup, choosing the coarsest resolution that answers the view.
+#
+# @param region Region code.
+# @param step Step of the view (see coarsest_resolution()).
+# @param columns Optional list of rollup columns to read.
+# @param months Optional list of "YYYY-MM" partitions to read.
+# @param start Optional inclusive lower bound of the time range.
+# @param end Optional exclusive upper bound of the time range.
+# @return DataFrame indexed by bucket label.
+def read_rollup(region, step='D', columns=None, months=None, start=None, end=None):
+    return DataStore.read_dataset(rollup_dataset(coarsest_resolution(step)), region, columns=columns,
+                                  months=months, start=start, end=end)
@@ -0,0 +1,159 @@
+##
+# @file DataStore.py
+# @brief Columnar on-disk store for the combined and hourly electricity datasets.
+#
+# Datasets are stored as uncompressed Arrow IPC (Feather v2) files, partitioned by
+# region and month in a Hive-style layout:
+#
+#   DataStore/<dataset>/region=<REGION>/month=<YYYY-MM>/part-0.arrow
+#
+# Columns are stored with their final types (timestamp, float, dictionary-encoded
+# strings), so readers never re-parse text or infer dates. Reads use column projection
+# and partition pruning, and the files are memory-mapped instead of copied into RAM.
+##
+
+import os
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+from pyarrow import fs
+from General.layout import STORE_FOLDER, region_folder
+
+## @brief Name of the timestamp column that becomes the DataFrame index on read.
+TIME_COLUMN = "SETTLEMENTDATE"
+
+## @brief Partitioning scheme shared by every dataset in the store.
+PARTITIONING = ds.partitioning(pa.schema([("region", pa.string()), ("month", pa.string())]), flavor="hive")
+
+
+##
+# @brief Lists the months stored for a region of a dataset.
+# @param dataset Dataset name.
+# @param region Region code.
+# @param root Store root folder.
+# @return Sorted list of "YYYY-MM" strings.
+def list_months(dataset, region, root=STORE_FOLDER):
+    folder = region_folder(dataset, region, root)
+    if not os.path.isdir(folder):
+        return []
+    return sorted(name.split("=", 1)[1] for name in os.listdir(folder) if name.startswith("month="))
+
+
+##
+# @brief Returns the "YYYY-MM" partition key of every timestamp.
+# @param times Series or index of timestamps.
+# @return pandas Index of strings aligned with the input.
+def month_keys(times):
+    return pd.Index(pd.DatetimeIndex(times).strftime("%Y-%m"))
+
+
+##
+# @brief Converts a DataFrame partition into a typed Arrow table.
+#
+# The datetime index (or SETTLEMENTDATE column) becomes a timestamp column and
+# string columns are dictionary-encoded.
+def _to_table(df):
+    if TIME_COLUMN not in df.columns:
+        df = df.rename_axis(TIME_COLUMN).reset_index()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            table = table.set_column(i, field.name, table.column(i).dictionary_encode())
+    return table.replace_schema_metadata(None)
+
+
+##
+# @brief Writes a region's data into the store, one file per month.
+#
+# Every month present in the DataFrame replaces the stored partition atomically.
+# With replace=True, months that are no longer present are removed as well.
+#
+# @param df DataFrame with a datetime index or a SETTLEMENTDATE column.
+# @param dataset Dataset name, e.g. "combined" or "hourly".
+# @param region Region code, e.g. "NSW1".
+# @param replace Whether the data replaces the whole region instead of single months.
+# @param root Store root folder.
+# @return List of months written, as "YYYY-MM" strings.
+def write_dataset(df, dataset, region, replace=False, root=STORE_FOLDER):
+    times = df[TIME_COLUMN] if TIME_COLUMN in df.columns else df.index
+    folder = region_folder(dataset, region, root)
+    written = []
+    for month, part in df.groupby(month_keys(times).values, sort=True):
+        month_folder = os.path.join(folder, f"month={month}")
+        os.makedirs(month_folder, exist_ok=True)
+        path = os.path.join(month_folder, "part-0.arrow")
+        feather.write_feather(_to_table(part), path + ".tmp", compression="uncompressed")
+        os.replace(path + ".tmp", path)
+        written.append(month)
+
+    if replace:
+        for month in set(list_months(dataset, region, root)) - set(written):
+            shutil.rmtree(os.path.join(folder, f"month={month}"))
+    return written
+
+
+##
+# @brief Deletes single months of a region from the store.
+# @param dataset Dataset name.
+# @param region Region code.
+# @param months Iterable of "YYYY-MM" strings.
+# @param root Store root folder.
+def delete_months(dataset, region, months, root=STORE_FOLDER):
+    for month in months:
+        month_folder = os.path.join(region_folder(dataset, region, root), f"month={month}")
+        if os.path.isdir(month_folder):
+            shutil.rmtree(month_folder)
+
+
+##
+# @brief Reads data from the store into a DataFrame indexed by SETTLEMENTDATE.
+#
+# Only the partitions of the requested regions and months are opened, only the
+# requested columns are read, and files are memory-mapped.
+#
+# @param dataset Dataset name, e.g. "combined" or "hourly".
+# @param regions Region code or list of region codes.
+# @param columns Optional list of columns to read (the time column is always read).
+# @param months Optional list of "YYYY-MM" partitions to read.
+# @param start Optional inclusive lower bound of the time range.
+# @param end Optional exclusive upper bound of the time range.
+# @param root Store root folder.
+# @return DataFrame sorted by its datetime index.
+# @throws FileNotFoundError If the dataset has no data for the requested regions.
+def read_dataset(dataset, regions, columns=None, months=None, start=None, end=None, root=STORE_FOLDER):
+    regions = [regions] if isinstance(regions, str) else list(regions)
+    first = pd.Timestamp(start).strftime("%Y-%m") if start is not None else None
+    last = pd.Timestamp(end).strftime("%Y-%m") if end is not None else None
+
+    # Partition pruning: only the files of matching regions and months are opened
+    paths = []
+    for region in regions:
+        for month in list_months(dataset, region, root):
+            if months is not None and month not in months:
+                continue
+            if (first and month < first) or (last and month > last):
+                continue
+            paths.append(os.path.join(region_folder(dataset, region, root), f"month={month}", "part-0.arrow"))
+    if not paths:
+        if not any(os.path.isdir(region_folder(dataset, region, root)) for region in regions):
+            raise FileNotFoundError(f"No '{dataset}' data in {root} for regions {regions}")
+        return pd.DataFrame(index=pd.DatetimeIndex([], name=TIME_COLUMN), columns=columns or [])
+
+    dataset_obj = ds.dataset(paths, format="ipc", partitioning=PARTITIONING,
+                             partition_base_dir=os.path.join(root, dataset),
+                             filesystem=fs.LocalFileSystem(use_mmap=True))
+
+    expression = None
+    if start is not None:
+        expression = ds.field(TIME_COLUMN) >= pd.Timestamp(start)
+    if end is not None:
+        upper = ds.field(TIME_COLUMN) < pd.Timestamp(end)
+        expression = upper if expression is None else expression & upper
+
+    file_columns = [name for name in dataset_obj.schema.names if name not in ("region", "month")]
+    selected = file_columns if columns is None else [TIME_COLUMN] + [c for c in columns if c != TIME_COLUMN]
+    table = dataset_obj.to_table(columns=selected, filter=expression)
+    df = table.to_pandas()
+    return df.set_index(TIME_COLUMN).sort_index()
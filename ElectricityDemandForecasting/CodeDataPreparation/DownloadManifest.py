@@ -0,0 +1,153 @@
+##
+# @file DownloadManifest.py
+# @brief Local manifest of downloaded AEMO files used for incremental re-downloads.
+#
+# The manifest is a JSON file stored next to the downloaded CSVs (local state, ignored
+# by git). For every file it records the size, SHA-256 checksum, ETag and Last-Modified
+# header returned by the server, and whether the month was already closed when it was
+# fetched.
+#
+# Closed historical months cannot change, so once they are recorded as closed they are
+# skipped entirely. Open months (the current month, or a month that was fetched while
+# it was still open) are revalidated with a conditional request.
+##
+
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+
+## @brief File name of the manifest inside the download folder.
+MANIFEST_NAME = "download_manifest.json"
+
+
+##
+# @brief Computes the SHA-256 checksum of a file.
+# @param path Path to the file.
+# @return Hex digest string.
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+##
+# @brief Tells whether a month is closed, i.e. the following month has already started.
+# @param year_month Month in YYYYMM format.
+# @param now Optional reference datetime (defaults to the current time).
+# @return True if the month can no longer receive new intervals.
+def is_closed_month(year_month, now=None):
+    now = now or datetime.now()
+    return year_month < now.strftime("%Y%m")
+
+
+##
+# @class DownloadManifest
+# @brief Thread-safe view of the download manifest for one download folder.
+class DownloadManifest:
+    def __init__(self, folder):
+        self.path = os.path.join(folder, MANIFEST_NAME)
+        self.folder = folder
+        self._lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                # A corrupt manifest only costs a full re-download, never wrong data
+                self.entries = {}
+
+    ##
+    # @brief Returns the manifest entry for a file if the local copy still matches it.
+    # @param filename Name of the CSV file inside the download folder.
+    # @return The entry dictionary, or None if missing or out of sync with the disk.
+    def valid_entry(self, filename):
+        with self._lock:
+            entry = self.entries.get(filename)
+        file_path = os.path.join(self.folder, filename)
+        if not entry or not os.path.exists(file_path):
+            return None
+        if os.path.getsize(file_path) != entry.get('size'):
+            return None
+        return entry
+
+    ##
+    # @brief Builds conditional request headers from a previous download.
+    # @param entry Manifest entry returned by valid_entry().
+    # @return Dictionary with If-None-Match / If-Modified-Since when known.
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    ##
+    # @brief Records a freshly downloaded file.
+    # @param filename Name of the CSV file inside the download folder.
+    # @param year_month Month of the file in YYYYMM format.
+    # @param headers Response headers of the download.
+    def record(self, filename, year_month, headers):
+        file_path = os.path.join(self.folder, filename)
+        entry = {
+            'month': year_month,
+            'size': os.path.getsize(file_path),
+            'sha256': file_checksum(file_path),
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'closed': is_closed_month(year_month),
+            'checked_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        with self._lock:
+            # Replacing the entry also drops the validator of the finished partial file
+            self.entries[filename] = entry
+
+    ##
+    # @brief Remembers the validator of a transfer in progress so it can be resumed safely.
+    #
+    # The manifest is saved immediately, so the validator survives a killed process.
+    #
+    # @param filename Name of the CSV file inside the download folder.
+    # @param headers Response headers of the transfer that created the partial file.
+    def record_partial(self, filename, headers):
+        validator = headers.get('ETag') or headers.get('Last-Modified')
+        with self._lock:
+            entry = self.entries.setdefault(filename, {})
+            if entry.get('partial') == validator:
+                return
+            entry['partial'] = validator
+        self.save()
+
+    ##
+    # @brief Returns the validator recorded for a partial download, if any.
+    # @param filename Name of the CSV file inside the download folder.
+    # @return ETag or Last-Modified string, or None.
+    def partial_validator(self, filename):
+        with self._lock:
+            return self.entries.get(filename, {}).get('partial')
+
+    ##
+    # @brief Marks a file as revalidated after a 304 Not Modified response.
+    # @param filename Name of the CSV file inside the download folder.
+    # @param year_month Month of the file in YYYYMM format.
+    def touch(self, filename, year_month):
+        with self._lock:
+            entry = self.entries[filename]
+            entry.pop('partial', None)
+            entry['closed'] = is_closed_month(year_month)
+            entry['checked_at'] = datetime.now().isoformat(timespec='seconds')
+
+    ##
+    # @brief Writes the manifest atomically to disk.
+    def save(self):
+        with self._lock:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,123 @@
+##
+# @file FastResample.py
+# @brief Vectorized reshape-based resampler for the regular 5-minute AEMO grid.
+#
+# AEMO dispatch data arrives on a regular 5-minute grid, so a complete hour is exactly
+# 12 consecutive rows (6 for half an hour, 288 for a day). Instead of the generic
+# pandas resample/groupby machinery, complete buckets are averaged by reshaping each
+# NumPy value array to (n_buckets, k) without copying and summing along the rows.
+#
+# Only buckets with gaps, duplicates (any row count other than k) or NaN values go
+# through a generic NaN-skipping bincount mean, so the result matches
+# df.resample(freq).mean() up to floating-point summation order.
+#
+# Test/BenchmarkResample.py compares both resamplers on multi-year data.
+#
+##
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+## @brief Spacing of the AEMO dispatch grid.
+GRID = pd.Timedelta(minutes=5)
+
+## @brief Number of nanoseconds in one day; bucket sizes must divide it.
+DAY_NS = pd.Timedelta(days=1).value
+
+## @brief Above this many runs of complete buckets, a single gather replaces the per-run reshapes.
+MAX_RUNS = 256
+
+
+##
+# @brief Computes bucket means of a 5-minute series, identical to df.resample(freq).mean().
+#
+# @param df DataFrame with a DatetimeIndex.
+# @param freq Fixed bucket size that divides a day, e.g. "30min", "h" or "D".
+# @param columns Columns to average.
+# @return DataFrame of float64 means indexed by the left edge of each bucket.
+def grid_resample_mean(df, freq='h', columns=('TOTALDEMAND', 'RRP')):
+    columns = list(columns)
+    index = df.index
+    try:
+        # Fixed-size offsets only; "h" or "D" are not parsed by pd.Timedelta
+        step_ns = to_offset(freq).nanos
+    except ValueError:
+        step_ns = 0
+    if (not isinstance(index, pd.DatetimeIndex) or index.tz is not None or len(index) == 0
+            or step_ns <= 0 or DAY_NS % step_ns or step_ns % GRID.value or not index.is_monotonic_increasing):
+        return generic_resample_mean(df, freq, columns)
+
+    # Work in the index's own resolution to avoid converting the timestamps
+    per_unit = pd.Timedelta(1, unit=index.unit).value
+    step, grid = step_ns // per_unit, GRID.value // per_unit
+    k = step // grid
+    stamps = index.asi8
+    relative = stamps // step
+    first = relative[0]
+    relative -= first
+    n_buckets = int(relative[-1]) + 1
+
+    arrays = [df[name].to_numpy(dtype=np.float64) for name in columns]
+
+    # Because the index is sorted, the rows of each non-empty bucket form one contiguous
+    # block of the value arrays, starting where the bucket number changes
+    starts = np.concatenate(([0], np.flatnonzero(relative[1:] != relative[:-1]) + 1))
+    counts = np.diff(np.append(starts, len(relative)))
+    buckets = relative[starts]
+
+    # A bucket is complete when it holds exactly k rows without NaN values
+    is_clean = counts == k
+    for values in arrays:
+        nan_rows = np.flatnonzero(np.isnan(values))
+        if len(nan_rows):
+            is_clean[np.searchsorted(starts, nan_rows, side='right') - 1] = False
+    clean = np.flatnonzero(is_clean)
+
+    result = np.full((len(columns), n_buckets), np.nan)
+    if len(clean):
+        # Split the complete buckets into runs of consecutive buckets; each run is one
+        # contiguous block of rows that is reshaped to (buckets, k) without copying and
+        # averaged by a matrix-vector product.
+        weights = np.full(k, 1.0 / k)
+        breaks = np.flatnonzero(np.diff(buckets[clean]) != 1) + 1
+        run_starts = np.concatenate(([0], breaks))
+        run_ends = np.concatenate((breaks, [len(clean)]))
+        if len(run_starts) <= MAX_RUNS:
+            for lo, hi in zip(run_starts, run_ends):
+                bucket, row = buckets[clean[lo]], starts[clean[lo]]
+                for result_row, values in zip(result, arrays):
+                    block = values[row:row + (hi - lo) * k].reshape(hi - lo, k)
+                    np.matmul(block, weights, out=result_row[bucket:bucket + hi - lo])
+        else:
+            rows = starts[clean][:, None] + np.arange(k)
+            for result_row, values in zip(result, arrays):
+                result_row[buckets[clean]] = values[rows] @ weights
+
+    dirty = np.flatnonzero(~is_clean)
+    if len(dirty):
+        # NaN-skipping mean restricted to the rows of incomplete, duplicated or NaN buckets
+        sizes = counts[dirty]
+        labels = np.repeat(np.arange(len(dirty)), sizes)
+        rows = np.repeat(starts[dirty] - np.concatenate(([0], np.cumsum(sizes)[:-1])), sizes) + np.arange(len(labels))
+        for result_row, values in zip(result, arrays):
+            picked = values[rows]
+            valid = ~np.isnan(picked)
+            sums = np.bincount(labels[valid], weights=picked[valid], minlength=len(dirty))
+            numbers = np.bincount(labels[valid], minlength=len(dirty))
+            with np.errstate(invalid='ignore'):
+                result_row[buckets[dirty]] = sums / numbers
+
+    bucket_index = pd.date_range(pd.Timestamp(int(first * step_ns), unit='ns'), periods=n_buckets,
+                                 freq=freq, name=index.name, unit=index.unit)
+    return pd.DataFrame(result.T, index=bucket_index, columns=columns)
+
+
+##
+# @brief Generic pandas resampler used for irregular data and as the reference.
+# @param df DataFrame with a DatetimeIndex.
+# @param freq Resampling frequency.
+# @param columns Columns to average.
+# @return DataFrame of float64 means.
+def generic_resample_mean(df, freq='h', columns=('TOTALDEMAND', 'RRP')):
+    return df.resample(freq)[list(columns)].mean().astype('float64')
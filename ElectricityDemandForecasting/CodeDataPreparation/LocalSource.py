@@ -0,0 +1,155 @@
+##
+# @file LocalSource.py
+# @brief Local stand-in for the AEMO portal that publishes recorded data as if it were live.
+#
+# The scheduler (python MainStart.py --daemon) polls the AEMO portal for new 5-minute
+# intervals. To exercise it without the network, this module replays recorded monthly
+# files over HTTP on localhost:
+#
+# - the recorded history is shifted forward by whole weeks (so weekdays are kept), such
+#   that it starts lead_days to lead_days + 7 days before the source was started;
+# - an interval is only published once the clock has passed its SETTLEMENTDATE, so a
+#   new interval appears every 5 minutes until the recording is used up;
+# - the files are served under the AEMO names of the shifted months, with an ETag per
+#   content, 304 replies to If-None-Match and Range requests, like the portal.
+#
+# Run with: python -m CodeDataPreparation.LocalSource [--folder DataSetOrigin] [--port 8766]
+# then point BASE_URL at the printed address. Use a DOWNLOAD_FOLDER other than the
+# recorded folder, so the replayed months are not mixed with the recording.
+##
+
+import os
+import re
+import glob
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pandas as pd
+from CodeDataPreparation.AemoReader import AEMO_COLUMNS, DATE_FORMAT
+
+## @brief Default port of the stand-in source.
+DEFAULT_PORT = 8766
+
+## @brief Days of history published when the source starts (at least).
+DEFAULT_LEAD_DAYS = 28
+
+## @brief Name of an AEMO monthly file, e.g. PRICE_AND_DEMAND_202410_NSW1.csv.
+FILE_NAME = re.compile(r"PRICE_AND_DEMAND_(\d{6})_(\w+)\.csv$")
+
+## @brief Length of one dispatch interval; a file of month M ends with M+1/01 00:00.
+INTERVAL = pd.Timedelta(minutes=5)
+
+
+##
+# @class ReplaySource
+# @brief Recorded AEMO intervals, shifted to the present and released by a clock.
+class ReplaySource:
+    ##
+    # @param folder Folder with the recorded monthly AEMO files.
+    # @param lead_days Days of history already published at start.
+    # @param clock Callable returning the current time as a naive datetime (market time).
+    def __init__(self, folder="DataSetOrigin", lead_days=DEFAULT_LEAD_DAYS, clock=datetime.now):
+        self.clock = clock
+        files = sorted(path for path in glob.glob(os.path.join(folder, "PRICE_AND_DEMAND_*.csv"))
+                       if FILE_NAME.search(os.path.basename(path)))
+        if not files:
+            raise FileNotFoundError(f"No recorded AEMO files in {folder}.")
+        df = pd.concat([pd.read_csv(path, usecols=AEMO_COLUMNS) for path in files], ignore_index=True)
+        df['SETTLEMENTDATE'] = pd.to_datetime(df['SETTLEMENTDATE'], format=DATE_FORMAT)
+        df = df.drop_duplicates(['REGION', 'SETTLEMENTDATE']).sort_values('SETTLEMENTDATE', kind='stable')
+
+        # Whole weeks keep the weekday (and time of day) of every interval
+        week = pd.Timedelta(days=7)
+        start = pd.Timestamp(clock()) - pd.Timedelta(days=lead_days)
+        self.offset = ((start - df['SETTLEMENTDATE'].min()) // week) * week
+        df['SETTLEMENTDATE'] += self.offset
+        months = (df['SETTLEMENTDATE'] - INTERVAL).dt.strftime("%Y%m")
+        self.months = {key: frame.reset_index(drop=True) for key, frame in df.groupby([months, df['REGION']])}
+        self.end = df['SETTLEMENTDATE'].max()
+        self._bodies = {}
+        self._lock = threading.Lock()
+        print(f"Replaying {len(df)} intervals shifted by {self.offset.days} days, "
+              f"up to {self.end:%Y/%m/%d %H:%M}.")
+
+    ##
+    # @brief Returns the published content of a monthly file.
+    # @param filename AEMO file name, e.g. PRICE_AND_DEMAND_202410_NSW1.csv.
+    # @return CSV bytes, or None if the month has no published interval yet.
+    def month_file(self, filename):
+        match = FILE_NAME.search(filename)
+        frame = self.months.get(match.groups()) if match else None
+        if frame is None:
+            return None
+        rows = int(frame['SETTLEMENTDATE'].searchsorted(pd.Timestamp(self.clock()), side='right'))
+        if not rows:
+            return None
+        with self._lock:
+            cached = self._bodies.get(filename)
+            if cached is None or cached[0] != rows:
+                body = frame.iloc[:rows].to_csv(index=False, date_format=DATE_FORMAT, float_format="%.2f").encode()
+                cached = self._bodies[filename] = (rows, body)
+        return cached[1]
+
+
+##
+# @class SourceHandler
+# @brief HTTP handler serving the files of the server's ReplaySource.
+class SourceHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = self.server.source.month_file(self.path.rsplit('/', 1)[-1])
+        if body is None:
+            self.send_error(404)
+            return
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        status, start = 200, 0
+        byte_range = self.headers.get('Range')
+        if byte_range and self.headers.get('If-Range') in (None, etag):
+            start = int(byte_range.split('=')[1].split('-')[0])
+            status = 206 if start < len(body) else 200
+            start = start if status == 206 else 0
+        self.send_response(status)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body) - start))
+        if status == 206:
+            self.send_header('Content-Range', f"bytes {start}-{len(body) - 1}/{len(body)}")
+        self.end_headers()
+        self.wfile.write(body[start:])
+
+
+##
+# @brief Creates the HTTP server of a stand-in source (not started).
+# @param source ReplaySource to serve.
+# @param host Interface to bind.
+# @param port Port to bind (0 picks a free port).
+# @return ThreadingHTTPServer; its base URL is http://host:port/.
+def create_source_server(source, host="127.0.0.1", port=DEFAULT_PORT):
+    server = ThreadingHTTPServer((host, port), SourceHandler)
+    server.daemon_threads = True
+    server.source = source
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the AEMO price and demand files.")
+    parser.add_argument('--folder', default="DataSetOrigin", help="folder with the recorded monthly files")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--lead-days', type=int, default=DEFAULT_LEAD_DAYS,
+                        help="days of history published at start")
+    args = parser.parse_args()
+    server = create_source_server(ReplaySource(args.folder, args.lead_days), port=args.port)
+    print(f"Stand-in source listening; set BASE_URL=http://127.0.0.1:{server.server_address[1]}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stand-in source stopped.")
+    finally:
+        server.server_close()
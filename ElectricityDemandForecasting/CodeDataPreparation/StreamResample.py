@@ -0,0 +1,113 @@
+##
+# @file StreamResample.py
+# @brief Chunked streaming resampler for 5-minute histories of any length.
+#
+# The history is read one chunk at a time in time order, either one month partition
+# of the columnar store, one raw monthly AEMO file, or one month of a frame that is
+# already in memory. Every chunk is resampled with the reshape resampler, except for
+# the rows of its last (possibly incomplete) bucket: they are carried over and prepended
+# to the next chunk. An AEMO monthly file ends with the 00:00 interval of the next
+# month, so the first hour of every month is completed by the following file.
+#
+# Only one chunk plus one bucket of rows is held at a time, so the peak memory does not
+# grow with the number of years processed. The concatenated output is identical to
+# resampling the whole history at once.
+##
+
+import os
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from General.regions import ENV_PATH
+from CodeDataPreparation import DataStore
+from CodeDataPreparation.AemoReader import read_aemo_csv
+from CodeDataPreparation.FastResample import grid_resample_mean
+
+## @brief Value columns averaged by the streaming resampler.
+VALUE_COLUMNS = ['TOTALDEMAND', 'RRP']
+
+
+##
+# @brief Tells whether streaming mode is enabled through STREAM_RESAMPLE.
+# @return True if STREAM_RESAMPLE is set to 1/true/yes.
+def is_streaming_mode():
+    load_dotenv(ENV_PATH)
+    return os.getenv('STREAM_RESAMPLE', '0').strip().lower() in ('1', 'true', 'yes')
+
+
+##
+# @brief Yields the month partitions of a stored dataset in time order.
+# @param region Region code.
+# @param dataset Dataset name (defaults to the combined 5-minute history).
+# @param columns Columns to read.
+# @param root Store root folder.
+# @param months Optional list of "YYYY-MM" partitions to read (default: all).
+# @return Generator of DataFrames indexed by SETTLEMENTDATE, one per month.
+def iter_store_chunks(region, dataset="combined", columns=VALUE_COLUMNS, root=DataStore.STORE_FOLDER, months=None):
+    for month in DataStore.list_months(dataset, region, root):
+        if months is not None and month not in months:
+            continue
+        yield DataStore.read_dataset(dataset, region, columns=columns, months=[month], root=root)
+
+
+##
+# @brief Yields the months of an in-memory 5-minute frame, like iter_store_chunks().
+# @param df Combined DataFrame with a SETTLEMENTDATE column or a datetime index.
+# @param columns Columns to keep.
+# @return Generator of DataFrames indexed by SETTLEMENTDATE, one per month.
+def iter_frame_chunks(df, columns=VALUE_COLUMNS):
+    if DataStore.TIME_COLUMN in df.columns:
+        df = df.dropna(subset=[DataStore.TIME_COLUMN]).set_index(DataStore.TIME_COLUMN)
+    df = df[list(columns)].sort_index(kind='stable')
+    # Month numbers instead of "YYYY-MM" strings: formatting every timestamp costs more than the rollup
+    months = np.asarray(df.index.year * 12 + df.index.month)
+    bounds = [0, *(np.flatnonzero(np.diff(months)) + 1), len(months)]
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        yield df.iloc[start:stop]
+
+
+##
+# @brief Yields raw monthly AEMO files one at a time, in file name (YYYYMM) order.
+# @param paths Paths of the monthly CSV files.
+# @param columns Columns to read.
+# @return Generator of DataFrames indexed by SETTLEMENTDATE, one per file.
+def iter_file_chunks(paths, columns=VALUE_COLUMNS):
+    for path in sorted(paths, key=os.path.basename):
+        df = read_aemo_csv(path, usecols=['SETTLEMENTDATE'] + list(columns))
+        yield df.dropna(subset=['SETTLEMENTDATE']).set_index('SETTLEMENTDATE').sort_index(kind='stable')
+
+
+##
+# @brief Resamples a stream of time-ordered chunks, yielding bucket means incrementally.
+#
+# @param chunks Iterable of DataFrames with a sorted DatetimeIndex, in time order.
+# @param freq Fixed bucket size, e.g. "h".
+# @param columns Columns to average.
+# @return Generator of float64 DataFrames covering consecutive, non-overlapping bucket ranges.
+# @throws ValueError If a chunk starts before a bucket that was already emitted.
+def stream_resample_mean(chunks, freq='h', columns=VALUE_COLUMNS):
+    columns = list(columns)
+    carry = None
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        chunk = chunk[columns]
+        if carry is not None:
+            if chunk.index[0] < carry.index[0].floor(freq):
+                raise ValueError(f"Chunk starting at {chunk.index[0]} is out of time order.")
+            chunk = pd.concat([carry, chunk])
+            if not chunk.index.is_monotonic_increasing:
+                chunk = chunk.sort_index(kind='stable')
+
+        # The last bucket may continue in the next chunk, so its rows are held back
+        last_bucket = chunk.index[-1].floor(freq)
+        split = chunk.index.searchsorted(last_bucket, side='left')
+        carry = chunk.iloc[split:]
+        if split:
+            done = grid_resample_mean(chunk.iloc[:split], freq, columns)
+            # Empty buckets up to the carried bucket, as a full resample would produce
+            yield done.reindex(pd.date_range(done.index[0], last_bucket, freq=freq, inclusive='left',
+                                              name=done.index.name, unit=done.index.unit))
+
+    if carry is not None and len(carry):
+        yield grid_resample_mean(carry, freq, columns)
@@ -1,41 +1,65 @@
 
-import pandas as pd
-import matplotlib.pyplot as plt
 import os
+from CodeDataPreparation.CsvExport import export_csv
+from General.batch import is_headless, output_path
 
 
-def plot_december_demand():
-    # Step 1: Load dataset
-    print("Loading dataset...")
-    df = pd.read_csv("FiltredDataSet/PRICE_AND_DEMAND_2024_ALL_NSW1.csv")
+# Output files of the December view (the pipeline checks them to skip an up-to-date plot)
+def december_plot_path(region="NSW1"):
+    return output_path(f"CodeDataVisualisation/DECEMBER_DEMAND_2024_{region}.png")
+
+
+def december_csv_path(region="NSW1"):
+    return output_path(f"CSVs/DECEMBER_DEMAND_2024_{region}.csv")
 
-    # Step 2: Convert 'SETTLEMENTDATE' to datetime and set as index
-    print("Processing datetime...")
-    df['SETTLEMENTDATE'] = pd.to_datetime(df['SETTLEMENTDATE'])
-    df.set_index('SETTLEMENTDATE', inplace=True)
 
-    # Step 3: Filter data for December
+def plot_december_demand(region="NSW1", rollup=None):
+    import matplotlib.pyplot as plt  # only loaded when the view is drawn
+    from CodeDataPreparation import DataStore
+    from CodeDataPreparation.DataRollup import read_rollup, rollup_dataset, coarsest_resolution
+
+    columns = ['TOTALDEMAND_MEAN', 'TOTALDEMAND_MIN', 'TOTALDEMAND_MAX', 'RRP_MEAN']
+    # Step 1: Locate the December partitions of the half-hourly rollup (a month-long view
+    # does not need the 5-minute rows)
+    print("Loading dataset...")
+    dataset = rollup_dataset(coarsest_resolution('30min'))
+    december_months = [m for m in DataStore.list_months(dataset, region) if m.endswith("-12")]
+
     print("Filtering December data...")
-    december_data = df[df.index.month == 12]
+    # The rollup stage hands over only the months it recomputed; it is used when it holds every December
+    if rollup is not None and set(december_months) <= set(DataStore.month_keys(rollup.index)):
+        # Step 2: Filter the half-hourly rollup handed over in memory
+        december_data = rollup.loc[rollup.index.month == 12, columns]
+    else:
+        # Step 2: Read only December partitions and the columns needed, already typed and indexed
+        december_data = read_rollup(region, '30min', months=december_months, columns=columns)
 
-    # Step 4: Plotting
+    # Step 3: Plotting
     print("Plotting December demand...")
     plt.figure(figsize=(15, 5))
-    plt.plot(december_data.index, december_data['TOTALDEMAND'],
-             marker='o', linestyle='-', color='lightgreen', linewidth=1)
-    plt.title('Total Demand for December')
+    plt.fill_between(december_data.index, december_data['TOTALDEMAND_MIN'], december_data['TOTALDEMAND_MAX'],
+                     color='lightgreen', alpha=0.4, label='5-minute range')
+    plt.plot(december_data.index, december_data['TOTALDEMAND_MEAN'],
+             linestyle='-', color='green', linewidth=1, label='30-minute mean')
+    plt.legend()
+    plt.title(f'Total Demand for December ({region})')
     plt.xlabel('Date and Time')
     plt.ylabel('Total Demand (MW)')
     plt.grid(True)
     plt.xticks(rotation=45)
     plt.tight_layout()
-    plt.show()
+    plot_path = december_plot_path(region)
+    os.makedirs(os.path.dirname(plot_path), exist_ok=True)
+    plt.savefig(plot_path)
+    print(f"Plot saved to: {plot_path}")
+    # Headless runs only write the file; the window would block until closed
+    if not is_headless():
+        plt.show()
+    plt.close()
 
-    # Step 5: Save December data to CSV
-    output_path = "CSVs/DECEMBER_DEMAND_2024.csv"
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    december_data.to_csv(output_path)
-    print(f"✅ December data saved to: {output_path}")
+    # Step 4: Save December data to CSV
+    export_csv(december_data, december_csv_path(region))
+    return plot_path
 
 
 # Call the function
@@ -0,0 +1,177 @@
+##
+# @file ForecastBundle.py
+# @brief Forecast of the longest horizon, computed once per fitted model and sliced per request.
+#
+# The GUI offers 1-4 weeks or 1-12 months and the forecast service accepts any horizon up
+# to 12 months. In precompute mode (FORECAST_PRECOMPUTE=1), the mean, the 95% interval,
+# the simulated path and (with FORECAST_SIMULATIONS > 0) the quantile bands are computed
+# once for MAX_HORIZON hours. Every shorter horizon is a prefix of these arrays and is
+# returned as NumPy/pandas views, without running the state space model again.
+#
+# The bundle is saved per region in ModelCache/, keyed by the model parameters, the
+# training data and the simulation settings, so a later run with another horizon only
+# loads it. A region keeps only its latest bundle.
+#
+# Peak exceedance probabilities of a shorter horizon are computed from the stored
+# simulated daily peaks of the days the horizon covers completely.
+##
+
+import os
+import json
+import glob
+import hashlib
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from General.regions import ENV_PATH
+from CodeTimeForecast.ModelCache import CACHE_FOLDER, series_fingerprint
+from CodeTimeForecast.FourierTerms import horizon_index
+from CodeTimeForecast.RegionModel import horizon_exog
+from CodeTimeForecast.ForecastSimulation import get_simulation_settings, simulate_bands, exceedance
+
+## @brief Longest horizon in hours (12 months of 30 days, the GUI maximum).
+MAX_HORIZON = 12 * 30 * 24
+
+## @brief Hourly columns of every bundle; quantile bands follow when simulated.
+BASE_COLUMNS = ('mean', 'lower', 'upper', 'simulated')
+
+
+##
+# @brief Tells whether forecasts are sliced from a precomputed bundle (FORECAST_PRECOMPUTE).
+# @return True if FORECAST_PRECOMPUTE is set to 1/true/yes.
+def is_precompute_mode():
+    load_dotenv(ENV_PATH)
+    return os.getenv('FORECAST_PRECOMPUTE', '0').strip().lower() in ('1', 'true', 'yes')
+
+
+##
+# @class ForecastBundle
+# @brief Hourly forecast arrays of the longest horizon with zero-copy slicing.
+class ForecastBundle:
+    ##
+    # @param index DatetimeIndex of the forecast hours.
+    # @param values Array (hours, columns) of the hourly forecast values.
+    # @param columns Names of the value columns (BASE_COLUMNS, then band names like "P10").
+    # @param daily_peaks Optional array (days, paths) of simulated daily peaks.
+    # @param thresholds Peak demand thresholds of the exceedance probabilities.
+    def __init__(self, index, values, columns, daily_peaks=None, thresholds=()):
+        self.index = pd.DatetimeIndex(index)
+        self.values = values
+        self.columns = list(columns)
+        self.daily_peaks = daily_peaks
+        self.thresholds = list(thresholds)
+
+    @property
+    def steps(self):
+        return len(self.index)
+
+    ##
+    # @brief Returns the forecast of the first steps hours as views of the bundle arrays.
+    # @param steps Horizon in hours (at most the bundle length).
+    # @return Dictionary with 'mean', 'lower', 'upper' and 'simulated' Series, 'bands'
+    #         (DataFrame or None), and 'simulation' (the simulate_bands() tables or None).
+    def slice(self, steps):
+        if not 1 <= steps <= self.steps:
+            raise ValueError(f"Horizon {steps} h is outside the precomputed 1-{self.steps} h.")
+        index = self.index[:steps]
+        view = {name: pd.Series(self.values[:steps, i], index=index, name=name, copy=False)
+                for i, name in enumerate(BASE_COLUMNS)}
+        band_names = self.columns[len(BASE_COLUMNS):]
+        view['bands'] = pd.DataFrame(self.values[:steps, len(BASE_COLUMNS):], index=index, columns=band_names,
+                                     copy=False) if band_names else None
+        view['simulation'] = None
+        if view['bands'] is not None and self.daily_peaks is not None:
+            days = self.index.normalize().unique()
+            last_day = index[-1].normalize()
+            # Days covered completely (the first day starts at the first forecast hour); at least one
+            count = int(np.searchsorted(days, last_day))
+            if steps == self.steps or self.index[steps].normalize() != last_day:
+                count += 1
+            count = max(count, 1)
+            view['simulation'] = dict(exceedance(self.daily_peaks[:count], days[:count], self.thresholds),
+                                      bands=view['bands'])
+        return view
+
+    ##
+    # @brief Saves the bundle to a .npz file.
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        meta = {'start': self.index[0].isoformat(), 'columns': self.columns, 'thresholds': self.thresholds}
+        arrays = {'values': self.values, 'meta': np.array(json.dumps(meta))}
+        if self.daily_peaks is not None:
+            arrays['daily_peaks'] = self.daily_peaks
+        with open(path + ".tmp", 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(path + ".tmp", path)
+
+    ##
+    # @brief Loads a bundle saved by save().
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            values = data['values']
+            daily_peaks = data['daily_peaks'] if 'daily_peaks' in data else None
+        index = pd.date_range(meta['start'], periods=len(values), freq='h')
+        return cls(index, values, meta['columns'], daily_peaks, meta['thresholds'])
+
+
+##
+# @brief Computes the bundle of a fitted model.
+#
+# @param results Fitted or filtered state space results.
+# @param series Training series (for the horizon index and the default threshold).
+# @param harmonics Fourier harmonics of the model (empty outside DHR mode).
+# @param steps Horizon in hours.
+# @param settings Simulation settings (defaults to get_simulation_settings()).
+# @return ForecastBundle.
+def build_bundle(results, series, harmonics=None, steps=MAX_HORIZON, settings=None):
+    settings = settings or get_simulation_settings()
+    exog = horizon_exog(series.index, steps, harmonics)
+    frame = results.get_forecast(steps=steps, exog=exog).summary_frame(alpha=0.05)
+    simulated = np.asarray(results.simulate(nsimulations=steps, anchor='end', exog=exog), dtype=np.float64)
+    columns = list(BASE_COLUMNS)
+    blocks = [frame[['mean', 'mean_ci_lower', 'mean_ci_upper']].to_numpy(), simulated.reshape(steps, 1)]
+    daily_peaks, thresholds = None, []
+    if settings['paths'] > 0:
+        thresholds = settings['thresholds'] or [round(float(series.max()))]
+        simulation = simulate_bands(results, steps, settings['paths'], settings['quantiles'], thresholds,
+                                    exog=exog, memory_mb=settings['memory_mb'])
+        columns += list(simulation['bands'].columns)
+        blocks.append(simulation['bands'].to_numpy())
+        daily_peaks = simulation['daily_peaks']
+    return ForecastBundle(horizon_index(series.index, steps), np.hstack(blocks), columns, daily_peaks, thresholds)
+
+
+##
+# @brief Returns the key of the bundle of a fitted model.
+def bundle_key(results, series, harmonics, steps, settings):
+    spec = {'params': [float(v) for v in np.asarray(results.params)], 'series': series_fingerprint(series),
+            'harmonics': {str(k): v for k, v in (harmonics or {}).items()}, 'steps': steps, 'settings': settings}
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+
+##
+# @brief Loads the saved bundle of a fitted model, or computes and saves it.
+#
+# @param results Fitted or filtered state space results.
+# @param series Training series.
+# @param region Region code.
+# @param harmonics Fourier harmonics of the model.
+# @param steps Horizon in hours.
+# @param folder Folder of the saved bundles.
+# @return ForecastBundle.
+def load_or_build_bundle(results, series, region, harmonics=None, steps=MAX_HORIZON, folder=CACHE_FOLDER):
+    settings = get_simulation_settings()
+    path = os.path.join(folder, f"bundle_{region}_{bundle_key(results, series, harmonics, steps, settings)[:16]}.npz")
+    if os.path.exists(path):
+        try:
+            return ForecastBundle.load(path)
+        except (OSError, ValueError, KeyError):
+            pass
+    print(f"Precomputing the {steps} h forecast bundle of {region}...")
+    bundle = build_bundle(results, series, harmonics, steps, settings)
+    for old in glob.glob(os.path.join(folder, f"bundle_{region}_*.npz")):
+        os.remove(old)
+    bundle.save(path)
+    return bundle
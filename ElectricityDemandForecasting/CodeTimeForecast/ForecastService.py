@@ -0,0 +1,243 @@
+##
+# @file ForecastService.py
+# @brief Long-running local HTTP service answering forecast requests from in-memory models.
+#
+# The service keeps the fitted model of every requested region in memory, so a forecast
+# needs neither a new process, nor reading the data, nor a fit. Endpoints:
+#
+#   GET /forecast?region=NSW1&horizon=168   JSON forecast (mean and 95% interval per hour,
+#                                           plus the quantile bands in precompute mode)
+#   GET /health                             loaded regions and cache statistics
+#
+# Forecast responses are kept in an LRU cache of serialized JSON bodies keyed by region
+# and horizon (FORECAST_CACHE_SIZE entries), so a repeated horizon is answered without
+# touching the model. Before each request, a cheap stamp of the region's hourly store
+# files and saved order is compared with the stamp of the loaded model; when the data
+# or the order changed, the model is rebuilt (fit, cache hit or incremental update) and
+# the cached forecasts of the region are dropped.
+#
+# Run with: python -m CodeTimeForecast.ForecastService [port]
+# Only the standard library HTTP server is used; it binds to 127.0.0.1 by default.
+##
+
+import os
+import json
+import time
+import threading
+import traceback
+import pandas as pd
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dotenv import load_dotenv
+from General.regions import ENV_PATH, NEM_REGIONS
+from CodeTimeForecast.RegionModel import read_hourly_series, fit_region_model, horizon_exog, model_stamp
+from CodeTimeForecast.ForecastBundle import MAX_HORIZON, is_precompute_mode, load_or_build_bundle
+
+## @brief Default port of the service.
+DEFAULT_PORT = 8765
+
+## @brief Default number of cached forecast responses.
+DEFAULT_CACHE_SIZE = 64
+
+
+##
+# @brief Loads the hourly data of a region and builds its model.
+# @param region Region code.
+# @return Dictionary with the model 'results', the Fourier 'harmonics', the training 'index'
+#         and, in precompute mode, the forecast 'bundle' of the longest horizon.
+def load_region_model(region):
+    series = read_hourly_series(region)
+    results, harmonics = fit_region_model(series, region)
+    bundle = load_or_build_bundle(results, series, region, harmonics) if is_precompute_mode() else None
+    return {'results': results, 'harmonics': harmonics, 'index': series.index, 'bundle': bundle}
+
+
+##
+# @class ForecastService
+# @brief In-memory models per region and an LRU cache of forecast responses.
+class ForecastService:
+    ##
+    # @brief Creates the service.
+    # @param loader Callable region -> model dictionary (see load_region_model()).
+    # @param stamp Callable region -> value that changes when the model has to be rebuilt.
+    # @param cache_size Number of cached responses (defaults to FORECAST_CACHE_SIZE).
+    def __init__(self, loader=load_region_model, stamp=model_stamp, cache_size=None):
+        load_dotenv(ENV_PATH)
+        self.loader = loader
+        self.stamp = stamp
+        self.cache_size = int(cache_size or os.getenv('FORECAST_CACHE_SIZE', DEFAULT_CACHE_SIZE))
+        self.models = {}
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.region_locks = {}
+
+    ##
+    # @brief Returns the current model of a region, loading or rebuilding it when needed.
+    def model(self, region):
+        with self.lock:
+            region_lock = self.region_locks.setdefault(region, threading.Lock())
+        # One load per region at a time; other regions are served meanwhile
+        with region_lock:
+            stamp = self.stamp(region)
+            entry = self.models.get(region)
+            if entry is None or entry['stamp'] != stamp:
+                started = time.perf_counter()
+                entry = dict(self.loader(region), stamp=stamp, loaded=time.strftime("%Y-%m-%dT%H:%M:%S"))
+                print(f"Forecast service: model of {region} {'re' if region in self.models else ''}loaded "
+                      f"in {time.perf_counter() - started:.1f} s.")
+                self.invalidate(region)
+                self.models[region] = entry
+            return entry
+
+    ##
+    # @brief Drops the cached forecasts of a region.
+    def invalidate(self, region):
+        with self.lock:
+            for key in [key for key in self.cache if key[0] == region]:
+                del self.cache[key]
+
+    ##
+    # @brief Returns the JSON forecast of a region.
+    # @param region Region code.
+    # @param horizon Forecast horizon in hours.
+    # @return Tuple (body bytes, cache hit flag).
+    def forecast(self, region, horizon):
+        entry = self.model(region)
+        key = (region, horizon, entry['stamp'])
+        with self.lock:
+            body = self.cache.get(key)
+            if body is not None:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return body, True
+            self.misses += 1
+
+        bundle = entry.get('bundle')
+        if bundle is not None and horizon <= bundle.steps:
+            # Precompute mode: a slice of the bundle, the model is not touched
+            view = bundle.slice(horizon)
+            frame = pd.DataFrame({'mean': view['mean'], 'mean_ci_lower': view['lower'],
+                                  'mean_ci_upper': view['upper']})
+            if view['bands'] is not None:
+                frame = frame.join(view['bands'])
+        else:
+            exog = horizon_exog(entry['index'], horizon, entry['harmonics'])
+            frame = entry['results'].get_forecast(steps=horizon, exog=exog).summary_frame(alpha=0.05)
+        columns = ['mean', 'mean_ci_lower', 'mean_ci_upper'] + [name for name in frame.columns if name.startswith('P')]
+        table = frame[columns].rename(columns={'mean_ci_lower': 'lower', 'mean_ci_upper': 'upper'}).round(3)
+        model = entry['results'].model
+        # nobs is the length of the hourly history: after an incremental update the
+        # results only cover the re-filtered tail (see ModelUpdate)
+        body = json.dumps({
+            'region': region,
+            'horizon': horizon,
+            'model': {'order': list(model.order), 'seasonal_order': list(model.seasonal_order),
+                      'nobs': len(entry['index']), 'last_observation': entry['index'][-1].isoformat(),
+                      'loaded': entry['loaded']},
+            'forecast': [{'datetime': stamp.isoformat(), **row} for stamp, row in zip(table.index,
+                                                                                      table.to_dict('records'))],
+        }).encode()
+        with self.lock:
+            self.cache[key] = body
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return body, False
+
+    ##
+    # @brief Returns the loaded regions and the cache statistics.
+    def status(self):
+        with self.lock:
+            return {'regions': {region: {'loaded': entry['loaded'], 'nobs': len(entry['index'])}
+                                for region, entry in self.models.items()},
+                    'cache': {'entries': len(self.cache), 'size': self.cache_size,
+                              'hits': self.hits, 'misses': self.misses}}
+
+
+##
+# @class ForecastHandler
+# @brief HTTP request handler of the forecast service (the service is server.service).
+class ForecastHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status, body, cache=None):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if cache is not None:
+            self.send_header('X-Forecast-Cache', 'hit' if cache else 'miss')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            if url.path == '/health':
+                self.send_json(200, self.server.service.status())
+                return
+            if url.path != '/forecast':
+                self.send_json(404, {'error': f"Unknown path {url.path}"})
+                return
+            region = query.get('region', 'NSW1').upper()
+            horizon = query.get('horizon', '168')
+            if region not in NEM_REGIONS:
+                self.send_json(400, {'error': f"Unknown region {region}; expected one of {list(NEM_REGIONS)}."})
+                return
+            if not horizon.isdigit() or not 1 <= int(horizon) <= MAX_HORIZON:
+                self.send_json(400, {'error': f"horizon must be an integer number of hours from 1 to {MAX_HORIZON}."})
+                return
+            body, hit = self.server.service.forecast(region, int(horizon))
+            self.send_json(200, body, cache=hit)
+        except FileNotFoundError as e:
+            self.send_json(404, {'error': str(e)})
+        except Exception as e:
+            traceback.print_exc()
+            self.send_json(500, {'error': str(e)})
+
+
+##
+# @brief Creates the HTTP server of a forecast service (not started).
+# @param service ForecastService to expose (a new one by default).
+# @param host Interface to bind.
+# @param port Port to bind (0 picks a free port).
+# @return ThreadingHTTPServer; call serve_forever() to run it.
+def create_server(service=None, host="127.0.0.1", port=DEFAULT_PORT):
+    server = ThreadingHTTPServer((host, port), ForecastHandler)
+    server.daemon_threads = True
+    server.service = service or ForecastService()
+    return server
+
+
+##
+# @brief Runs the forecast service until interrupted.
+# @param port Port to bind (defaults to FORECAST_SERVICE_PORT).
+# @param regions Regions whose models are loaded at startup.
+def serve(port=None, regions=()):
+    load_dotenv(ENV_PATH)
+    port = int(port or os.getenv('FORECAST_SERVICE_PORT', DEFAULT_PORT))
+    server = create_server(port=port)
+    for region in regions:
+        try:
+            server.service.model(region)
+        except Exception:
+            print(f"ERROR: Could not load the model of {region}.")
+            traceback.print_exc()
+    print(f"Forecast service listening on http://127.0.0.1:{server.server_address[1]}/forecast?region=NSW1&horizon=168")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Forecast service stopped.")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    import sys
+    from General.regions import get_regions
+    serve(sys.argv[1] if len(sys.argv) > 1 else None, get_regions())
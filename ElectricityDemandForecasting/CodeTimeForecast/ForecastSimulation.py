@@ -0,0 +1,134 @@
+##
+# @file ForecastSimulation.py
+# @brief Monte Carlo forecast paths reduced to quantile bands and peak exceedance probabilities.
+#
+# The fitted state space model simulates many future paths in one batched call
+# (results.simulate(..., repetitions=n)). The paths are reduced with NumPy array ops:
+# - quantile bands per forecast hour (P10/P50/P90 by default, FORECAST_QUANTILES)
+# - the probability that the daily peak demand exceeds given thresholds
+# - the probability that the peak over the whole horizon exceeds them
+#
+# Memory is bounded by SIMULATION_MEMORY_MB. Paths are simulated in batches and stored as
+# float32 in blocks of whole forecast days. When a block of all paths would not fit the
+# budget, each batch of paths is simulated again for the next block with the same random
+# seed, which reproduces the same paths. This trades time for memory on very long horizons.
+##
+
+import os
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from General.regions import ENV_PATH
+from CodeTimeForecast.FourierTerms import horizon_index
+
+## @brief Default number of simulated paths.
+DEFAULT_PATHS = 500
+
+## @brief Default quantiles of the forecast bands.
+DEFAULT_QUANTILES = (0.1, 0.5, 0.9)
+
+## @brief Default memory budget of the simulated paths in MB.
+DEFAULT_MEMORY_MB = 64
+
+
+##
+# @brief Reads the simulation settings from the project .env file.
+# @return Dictionary with 'paths' (0 = single path mode), 'quantiles', 'memory_mb' and
+#         'thresholds' (peak demand thresholds in MW, empty when not configured).
+def get_simulation_settings():
+    load_dotenv(ENV_PATH)
+    quantiles = os.getenv('FORECAST_QUANTILES')
+    thresholds = os.getenv('PEAK_THRESHOLDS_MW')
+    return {
+        'paths': int(os.getenv('FORECAST_SIMULATIONS', 0)),
+        'quantiles': tuple(float(q) for q in quantiles.split(',')) if quantiles else DEFAULT_QUANTILES,
+        'memory_mb': float(os.getenv('SIMULATION_MEMORY_MB', DEFAULT_MEMORY_MB)),
+        'thresholds': [float(t) for t in thresholds.split(',')] if thresholds else [],
+    }
+
+
+##
+# @brief Returns the column name of a quantile, e.g. "P10".
+def band_name(quantile):
+    return f"P{round(quantile * 100):g}"
+
+
+##
+# @brief Simulates one batch of paths and returns the requested rows as float32.
+def _simulate_batch(results, steps, repetitions, seed, rows, exog):
+    paths = results.simulate(nsimulations=steps, repetitions=repetitions, anchor='end', exog=exog,
+                             rng=np.random.default_rng(seed))
+    paths = np.asarray(paths, dtype=np.float64).reshape(steps, repetitions)
+    return paths[rows].astype(np.float32)
+
+
+##
+# @brief Simulates forecast paths and reduces them to quantile bands and peak exceedance.
+#
+# @param results Fitted or filtered statsmodels state space results.
+# @param steps Forecast horizon in hours.
+# @param repetitions Number of simulated paths.
+# @param quantiles Quantiles of the bands.
+# @param thresholds Peak demand thresholds in MW.
+# @param exog Optional exogenous regressors of the horizon (DHR mode).
+# @param memory_mb Memory budget of the stored paths.
+# @param seed Seed of the random number generator.
+# @return Dictionary with 'bands' (DataFrame, one column per quantile), 'daily_exceedance'
+#         (DataFrame, probability per day and threshold), 'peak_exceedance' (Series,
+#         probability per threshold over the whole horizon) and 'daily_peaks' (float32
+#         array of the peak of every day and path).
+def simulate_bands(results, steps, repetitions=DEFAULT_PATHS, quantiles=DEFAULT_QUANTILES, thresholds=(),
+                   exog=None, memory_mb=DEFAULT_MEMORY_MB, seed=0):
+    index = horizon_index(results.data.row_labels, steps)
+    thresholds = np.asarray(sorted(thresholds), dtype=np.float64)
+    budget = memory_mb * 1024 ** 2
+
+    # Paths are simulated in batches that fit half of the budget (float64 output and shocks)
+    batch = int(max(1, min(repetitions, budget // 2 // (steps * 16))))
+    batches = [(start, min(batch, repetitions - start)) for start in range(0, repetitions, batch)]
+
+    # Blocks of whole days whose float32 paths fit the other half of the budget
+    day_starts = np.flatnonzero(np.r_[True, index.normalize()[1:] != index.normalize()[:-1]])
+    day_ends = np.r_[day_starts[1:], steps]
+    rows_per_block = max(int(budget // 2 // (repetitions * 4)), 1)
+    blocks, first = [], 0
+    for day, end in enumerate(day_ends):
+        if end - day_starts[first] > rows_per_block and day > first:
+            blocks.append((first, day))
+            first = day
+    blocks.append((first, len(day_starts)))
+
+    bands = np.empty((steps, len(quantiles)))
+    daily_peaks = np.empty((len(day_starts), repetitions), dtype=np.float32)
+    for first_day, last_day in blocks:
+        rows = slice(day_starts[first_day], day_ends[last_day - 1])
+        paths = np.empty((rows.stop - rows.start, repetitions), dtype=np.float32)
+        for b, (start, size) in enumerate(batches):
+            paths[:, start:start + size] = _simulate_batch(results, steps, size, seed + b, rows, exog)
+        bands[rows] = np.quantile(paths, quantiles, axis=1).T
+        daily_peaks[first_day:last_day] = np.maximum.reduceat(paths, day_starts[first_day:last_day] - rows.start,
+                                                             axis=0)
+        del paths
+
+    result = exceedance(daily_peaks, index[day_starts].normalize(), thresholds)
+    result['bands'] = pd.DataFrame(bands, index=index, columns=[band_name(q) for q in quantiles])
+    result['daily_peaks'] = daily_peaks
+    return result
+
+
+##
+# @brief Reduces simulated daily peaks to exceedance probabilities.
+# @param daily_peaks Array (days, paths) of simulated daily peaks.
+# @param days DatetimeIndex of the days.
+# @param thresholds Peak demand thresholds in MW.
+# @return Dictionary with 'daily_exceedance' (DataFrame) and 'peak_exceedance' (Series).
+def exceedance(daily_peaks, days, thresholds):
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    names = [f">{t:g} MW" for t in thresholds]
+    # (days, paths, thresholds) comparison reduced over the paths axis
+    daily = (daily_peaks[:, :, None] > thresholds[None, None, :]).mean(axis=1)
+    horizon = (daily_peaks.max(axis=0)[:, None] > thresholds[None, :]).mean(axis=0)
+    return {
+        'daily_exceedance': pd.DataFrame(daily, index=days, columns=names),
+        'peak_exceedance': pd.Series(horizon, index=names, name='probability'),
+    }
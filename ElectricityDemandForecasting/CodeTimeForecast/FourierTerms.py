@@ -0,0 +1,98 @@
+##
+# @file FourierTerms.py
+# @brief Fourier-term regressors for dynamic harmonic regression (DHR) of hourly demand.
+#
+# Hourly demand has daily (24 h), weekly (168 h) and yearly (8766 h) cycles. A seasonal
+# ARIMA component with s=168 needs a state vector of more than 170 elements, which
+# makes every likelihood evaluation more than 20x slower than the s=24 model. In DHR mode
+# (MODEL_MODE=dhr) the daily cycle stays in the seasonal ARIMA part, and the longer
+# cycles are modelled by K sine/cosine pairs per period, passed as exogenous regressors:
+#
+#   sin(2 pi k t / period), cos(2 pi k t / period),  k = 1..K
+#
+# t is the absolute time in hours since the Unix epoch, so the terms of the training
+# data and of any forecast horizon line up without bookkeeping. Regression coefficients
+# are model parameters, not states, so the state dimension does not grow.
+#
+# The number of harmonics per period is configured with FOURIER_HARMONICS, e.g.
+# "168:4,8766:2". Periods longer than the training data cannot be estimated and are
+# skipped.
+##
+
+import os
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from General.regions import ENV_PATH
+
+## @brief Default harmonics per seasonal period in hours (weekly and yearly cycles).
+DEFAULT_HARMONICS = {168: 4, 8766: 2}
+
+## @brief Nanoseconds per hour.
+HOUR_NS = 3600 * 10 ** 9
+
+
+##
+# @brief Tells whether the dynamic harmonic regression mode is selected through MODEL_MODE.
+# @return True if MODEL_MODE is "dhr".
+def is_dhr_mode():
+    load_dotenv(ENV_PATH)
+    return os.getenv('MODEL_MODE', 'sarima').strip().lower() == 'dhr'
+
+
+##
+# @brief Parses a harmonics specification such as "168:4,8766:2".
+# @param value Specification string; defaults to FOURIER_HARMONICS, then DEFAULT_HARMONICS.
+# @return Dictionary mapping each period in hours to its number of harmonics.
+def get_harmonics(value=None):
+    load_dotenv(ENV_PATH)
+    value = value or os.getenv('FOURIER_HARMONICS')
+    if not value:
+        return dict(DEFAULT_HARMONICS)
+    harmonics = {}
+    for item in value.split(','):
+        if item.strip():
+            period, count = item.split(':')
+            harmonics[float(period) if '.' in period else int(period)] = int(count)
+    return harmonics
+
+
+##
+# @brief Drops periods that the training data is too short to estimate.
+# @param harmonics Dictionary of period -> harmonics.
+# @param nobs Number of hourly training observations.
+# @return Dictionary limited to periods up to nobs hours with at least one harmonic.
+def usable_harmonics(harmonics, nobs):
+    usable = {period: count for period, count in harmonics.items() if 0 < count and period <= nobs}
+    for period in set(harmonics) - set(usable):
+        print(f"Fourier period {period} h skipped: {nobs} hours of data are not enough.")
+    return usable
+
+
+##
+# @brief Builds the Fourier regressors for a set of timestamps.
+#
+# @param index DatetimeIndex of the rows (training data or forecast horizon).
+# @param harmonics Dictionary mapping each period in hours to its number of harmonics K.
+# @return DataFrame with columns sin_<period>_<k> and cos_<period>_<k>, aligned to the index.
+def fourier_terms(index, harmonics):
+    index = pd.DatetimeIndex(index)
+    hours = index.as_unit('ns').asi8 / HOUR_NS
+    blocks, names = [], []
+    for period, count in harmonics.items():
+        k = np.arange(1, count + 1)
+        # (rows, K) matrix of angles, computed in one broadcast per period
+        angles = (2 * np.pi / period) * np.outer(hours % period, k)
+        blocks += [np.sin(angles), np.cos(angles)]
+        names += [f"sin_{period}_{i}" for i in k] + [f"cos_{period}_{i}" for i in k]
+    values = np.hstack(blocks) if blocks else np.empty((len(index), 0))
+    return pd.DataFrame(values, index=index, columns=names)
+
+
+##
+# @brief Returns the hourly timestamps of a forecast horizon.
+# @param index DatetimeIndex of the training data.
+# @param steps Number of hours to forecast.
+# @return DatetimeIndex of the next steps hours.
+def horizon_index(index, steps):
+    return pd.date_range(index[-1] + pd.Timedelta(hours=1), periods=steps, freq='h')
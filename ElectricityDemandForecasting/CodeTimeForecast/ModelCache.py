@@ -0,0 +1,172 @@
+##
+# @file ModelCache.py
+# @brief Persistent on-disk cache of fitted SARIMA parameters.
+#
+# A fit is identified by a SHA-256 key over the training series (timestamps, values and
+# frequency), the model order, the seasonal order, the model and fit options and the
+# statsmodels version. If the hourly data and the model specification are unchanged,
+# the estimated parameters are loaded from the cache and the model is only filtered
+# with them, which skips the numerical optimisation of fit() entirely.
+#
+# Only the parameter vector is stored (a few hundred bytes per entry). Pickled
+# results of a seasonal model hold the filter output of every time step
+# (k_states^2 x nobs values), so they would be hundreds of MB.
+#
+# Entries are evicted when unused for MODEL_CACHE_MAX_AGE_DAYS, and the least
+# recently used entries are evicted while they exceed MODEL_CACHE_MAX_MB. Only the
+# entry files written by put() are evicted; the other state kept in the same folder
+# (order search results, best orders, warm-start vectors, filter states) is not.
+##
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+from importlib import metadata
+from dotenv import load_dotenv
+from General.regions import ENV_PATH
+from General.layout import CACHE_FOLDER
+
+## @brief Default maximum age of an entry in days.
+DEFAULT_MAX_AGE_DAYS = 30
+
+## @brief Default maximum total size of the cache entries in MB.
+DEFAULT_MAX_MB = 50
+
+## @brief File name of a cache entry: the SHA-256 key returned by cache_key().
+ENTRY_NAME = re.compile(r"[0-9a-f]{64}\.json$")
+
+
+##
+# @brief Computes a fingerprint of a time series (timestamps, values and frequency).
+# @param series pandas Series with a DatetimeIndex.
+# @return Hex digest string.
+def series_fingerprint(series):
+    digest = hashlib.sha256()
+    index = pd.DatetimeIndex(series.index)
+    digest.update(str(getattr(index, 'freqstr', None)).encode())
+    digest.update(index.as_unit('ns').asi8.tobytes())
+    # NaN payloads can differ bit-wise, so they are normalised before hashing
+    values = series.to_numpy(dtype=np.float64, copy=True)
+    values[np.isnan(values)] = np.nan
+    digest.update(values.tobytes())
+    return digest.hexdigest()
+
+
+##
+# @brief Returns a file-name friendly name of a model order, e.g. "2_0_2_2_0_2_24".
+# @param order Non-seasonal (p, d, q) order.
+# @param seasonal_order Seasonal (P, D, Q, s) order.
+# @return String usable in file names.
+def spec_name(order, seasonal_order):
+    return "_".join(str(v) for v in tuple(order) + tuple(seasonal_order))
+
+
+##
+# @brief Builds the cache key of a fit.
+# @param series Training series.
+# @param order Non-seasonal (p, d, q) order.
+# @param seasonal_order Seasonal (P, D, Q, s) order.
+# @param options Dictionary of model and fit options that influence the estimate.
+# @return Hex digest string.
+def cache_key(series, order, seasonal_order, options=None):
+    spec = {
+        'series': series_fingerprint(series),
+        'order': list(order),
+        'seasonal_order': list(seasonal_order),
+        'options': options or {},
+        'statsmodels': metadata.version('statsmodels'),
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True, default=str).encode()).hexdigest()
+
+
+##
+# @class ModelCache
+# @brief Folder of fitted parameter vectors with size and age based eviction.
+class ModelCache:
+    def __init__(self, folder=CACHE_FOLDER, max_age_days=None, max_mb=None):
+        load_dotenv(ENV_PATH)
+        self.folder = folder
+        self.max_age = 86400 * float(max_age_days if max_age_days is not None
+                                     else os.getenv('MODEL_CACHE_MAX_AGE_DAYS', DEFAULT_MAX_AGE_DAYS))
+        self.max_bytes = 1024 ** 2 * float(max_mb if max_mb is not None
+                                           else os.getenv('MODEL_CACHE_MAX_MB', DEFAULT_MAX_MB))
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.folder, f"{key}.json")
+
+    ##
+    # @brief Returns the cached entry of a key, or None on a miss.
+    # @param key Key returned by cache_key().
+    # @return Dictionary with 'params', 'param_names' and metadata, or None.
+    def get(self, key):
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                os.remove(path)
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # The modification time doubles as the last-used time for LRU eviction
+        os.utime(path)
+        return entry
+
+    ##
+    # @brief Stores the parameters of a fit and applies the eviction policy.
+    # @param key Key returned by cache_key().
+    # @param params pandas Series of estimated parameters.
+    # @param metadata Optional dictionary saved with the entry (e.g. fit time, region).
+    def put(self, key, params, metadata=None):
+        entry = dict(metadata or {})
+        entry.update({'param_names': list(params.index), 'params': [float(v) for v in params.values],
+                      'created': time.time()})
+        os.makedirs(self.folder, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, indent=2)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    ##
+    # @brief Removes expired entries, then the least recently used ones above the size limit.
+    #
+    # Only files named like cache entries are considered, so other files in the folder
+    # neither count towards the size limit nor get removed.
+    #
+    # @return Number of removed entries.
+    def evict(self):
+        with self._lock:
+            if not os.path.isdir(self.folder):
+                return 0
+            now = time.time()
+            entries = []
+            for name in os.listdir(self.folder):
+                if not ENTRY_NAME.match(name):
+                    continue
+                path = os.path.join(self.folder, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            removed = 0
+            total = sum(size for _, size, _ in entries)
+            for mtime, size, path in sorted(entries):
+                if now - mtime <= self.max_age and total <= self.max_bytes:
+                    continue
+                try:
+                    os.remove(path)
+                    removed += 1
+                    total -= size
+                except OSError:
+                    pass
+            return removed
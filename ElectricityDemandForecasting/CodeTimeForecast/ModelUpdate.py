@@ -0,0 +1,175 @@
+##
+# @file ModelUpdate.py
+# @brief Incremental SARIMA updates: filter newly appended hours with the fitted parameters.
+#
+# After a full fit, the parameters and the Kalman filter state of the last training hour
+# (predicted state vector and covariance before that hour is observed) are saved per
+# region and model order. When new hours arrive, a new SARIMAX model over only the last
+# training hour and the new hours is created, its state space is initialised with the
+# saved state (initialize_known) and it is filtered with the saved parameters. Since the
+# Kalman filter only carries the state forward, this gives the same forecast as filtering
+# the whole history with those parameters, in tens of milliseconds instead of a full
+# maximum-likelihood fit.
+#
+# The results of an update therefore cover only the re-filtered tail: their nobs,
+# log-likelihood and summary() describe those few hours, not the history. Callers that
+# report the training size use the length of the series instead.
+#
+# A full refit happens instead when:
+# - no state is saved yet, or the history before the saved state was revised (the last
+#   training hour itself may change, e.g. a partial hour of live data)
+# - MODEL_REFIT_HOURS of new data accumulated since the last full fit (schedule)
+# - the RMSE of the one-step-ahead errors on the new hours exceeds MODEL_DRIFT_RATIO
+#   times the RMSE observed on the last weeks of the full fit (drift check)
+##
+
+import os
+import json
+import time
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from General.regions import ENV_PATH
+from CodeTimeForecast.ModelCache import CACHE_FOLDER, series_fingerprint, spec_name
+from CodeTimeForecast.SarimaFit import SARIMA_ORDER, SEASONAL_ORDER, MODEL_OPTIONS, fit_sarima
+
+## @brief Default number of new hours after which the model is fully refitted.
+DEFAULT_REFIT_HOURS = 24 * 7
+
+## @brief Default ratio of new to baseline one-step RMSE that triggers a refit.
+DEFAULT_DRIFT_RATIO = 2.0
+
+## @brief Number of final training hours whose one-step errors form the drift baseline.
+BASELINE_HOURS = 24 * 28
+
+
+##
+# @brief Tells whether incremental update mode is enabled through MODEL_UPDATE.
+# @return True if MODEL_UPDATE is set to 1/true/yes.
+def is_update_mode():
+    load_dotenv(ENV_PATH)
+    return os.getenv('MODEL_UPDATE', '0').strip().lower() in ('1', 'true', 'yes')
+
+
+##
+# @brief Returns the path of the saved filter state of a region and model.
+# @param region Region code.
+# @param order Non-seasonal order.
+# @param seasonal_order Seasonal order.
+# @param folder Folder holding the state files.
+# @return Path of the .npz state file.
+def state_path(region, order=SARIMA_ORDER, seasonal_order=SEASONAL_ORDER, folder=CACHE_FOLDER):
+    return os.path.join(folder, f"state_{region}_{spec_name(order, seasonal_order)}.npz")
+
+
+##
+# @brief Loads a saved filter state.
+# @param path Path of the state file.
+# @return Dictionary of arrays and metadata, or None if missing or unreadable.
+def load_state(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            state = {name: data[name] for name in data.files}
+        state['meta'] = json.loads(str(state['meta']))
+        return state
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+##
+# @brief Saves the parameters and final filter state of a results object.
+# @param path Path of the state file.
+# @param results Filtered or fitted SARIMAX results ending at the last observed hour.
+# @param series Full series the results cover.
+# @param meta Metadata dictionary (fit bookkeeping carried across updates).
+def save_state(path, results, series, meta):
+    # The last hour is filtered again by the next update, so only the hours before it are
+    # fingerprinted: a live partial hour whose mean is revised does not force a refit
+    meta = dict(meta, trained_until=str(series.index[-1]), prefix=series_fingerprint(series.iloc[:-1]),
+                param_names=list(results.model.param_names))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp.npz"
+    # Column -1 predicts the first unobserved hour, column -2 the last observed one
+    np.savez(tmp_path, params=np.asarray(results.params, dtype=np.float64),
+             state=results.predicted_state[:, -2], state_cov=results.predicted_state_cov[:, :, -2],
+             meta=np.array(json.dumps(meta)))
+    os.replace(tmp_path, path)
+
+
+##
+# @brief Returns the root mean square of the finite one-step-ahead errors.
+def _rmse(errors):
+    errors = np.asarray(errors, dtype=np.float64)
+    errors = errors[np.isfinite(errors)]
+    return float(np.sqrt(np.mean(errors ** 2))) if len(errors) else float('nan')
+
+
+##
+# @brief Fully fits the model and saves its state.
+def _full_fit(series, path, order, seasonal_order, region, reason, cache, exog):
+    print(f"Full SARIMA fit for {region} ({reason}).")
+    results = fit_sarima(series, order, seasonal_order, cache=cache, region=region,
+                         folder=os.path.dirname(path) or ".", exog=exog)
+    # The first two seasons are skipped: the diffuse initialisation inflates their errors
+    baseline = _rmse(results.forecasts_error[0, 2 * seasonal_order[3]:][-BASELINE_HOURS:])
+    save_state(path, results, series, {'fitted_until': str(series.index[-1]), 'baseline_rmse': baseline,
+                                       'fitted_at': time.time()})
+    return results
+
+
+##
+# @brief Returns forecast-ready SARIMA results, updating the saved model incrementally when possible.
+#
+# @param series Hourly series with a DatetimeIndex (missing hours as NaN).
+# @param region Region code used to locate the saved state.
+# @param order Non-seasonal order.
+# @param seasonal_order Seasonal order.
+# @param folder Folder holding the state files.
+# @param cache Optional ModelCache passed to full fits.
+# @param exog Optional DataFrame of exogenous regressors aligned with the series.
+# @return Tuple (results, action) with action "update", "unchanged" or the reason of a full fit;
+#         after "update" and "unchanged" the results cover only the last training hour and the new hours.
+def update_sarima(series, region="NSW1", order=SARIMA_ORDER, seasonal_order=SEASONAL_ORDER,
+                  folder=CACHE_FOLDER, cache=None, exog=None):
+    load_dotenv(ENV_PATH)
+    refit_hours = int(os.getenv('MODEL_REFIT_HOURS', DEFAULT_REFIT_HOURS))
+    drift_ratio = float(os.getenv('MODEL_DRIFT_RATIO', DEFAULT_DRIFT_RATIO))
+    path = state_path(region, order, seasonal_order, folder)
+
+    state = load_state(path)
+    if state is None:
+        return _full_fit(series, path, order, seasonal_order, region, "no saved state", cache, exog), "initial fit"
+
+    meta = state['meta']
+    trained_until = pd.Timestamp(meta['trained_until'])
+    prefix = series.loc[:trained_until]
+    if len(prefix) == 0 or prefix.index[-1] != trained_until or series_fingerprint(prefix.iloc[:-1]) != meta['prefix']:
+        return _full_fit(series, path, order, seasonal_order, region, "history revised", cache, exog), "refit: revised"
+
+    # The last training hour is filtered again, so results exist even without new hours
+    new = series.loc[series.index >= trained_until]
+    if (new.index[-1] - pd.Timestamp(meta['fitted_until'])) / pd.Timedelta(hours=1) >= refit_hours:
+        return _full_fit(series, path, order, seasonal_order, region, "refit schedule", cache, exog), "refit: schedule"
+
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+    started = time.perf_counter()
+    new_exog = exog.loc[new.index] if exog is not None else None
+    model = SARIMAX(new, exog=new_exog, order=order, seasonal_order=seasonal_order, **MODEL_OPTIONS)
+    if list(model.param_names) != meta['param_names']:
+        return _full_fit(series, path, order, seasonal_order, region, "model changed", cache, exog), "refit: model"
+    model.ssm.initialize_known(state['state'], state['state_cov'])
+    results = model.filter(state['params'])
+
+    new_rmse = _rmse(results.forecasts_error[0, 1:])
+    if np.isfinite(meta['baseline_rmse']) and new_rmse > drift_ratio * meta['baseline_rmse']:
+        print(f"Drift detected for {region}: one-step RMSE {new_rmse:.1f} vs {meta['baseline_rmse']:.1f}.")
+        return _full_fit(series, path, order, seasonal_order, region, "drift", cache, exog), "refit: drift"
+
+    if len(new) == 1:
+        return results, "unchanged"
+    save_state(path, results, series, meta)
+    print(f"Model for {region} updated with {len(new) - 1} new hour(s) in {time.perf_counter() - started:.2f} s "
+          f"(one-step RMSE {new_rmse:.1f}).")
+    return results, "update"
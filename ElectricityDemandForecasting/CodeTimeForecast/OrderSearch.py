@@ -0,0 +1,274 @@
+##
+# @file OrderSearch.py
+# @brief Parallel AIC-based search of SARIMA orders with a persistent result cache.
+#
+# Candidate (p,d,q)x(P,D,Q,s) orders are fitted on a process pool in two rounds:
+# 1. Every new candidate gets a short partial fit (PARTIAL_ITERATIONS optimizer steps).
+#    Candidates whose partial AIC is worse than the best partial AIC by more than the
+#    pruning margin are dropped: a few more iterations will not close such a gap.
+# 2. The surviving candidates are fitted fully, warm-started from their partial fit.
+#
+# The training series is copied once into a shared memory block that every worker
+# attaches to when it starts, so tasks only carry the orders, not the data. Each fit
+# has a wall-time cap enforced from the optimizer callback.
+#
+# The AIC/BIC of every candidate whose full fit succeeded is cached per training series
+# in ModelCache/, together with the AIC of its partial fit, so repeating a search only
+# evaluates grid points without a successful fit. Pruned, timed-out and failed candidates
+# are not cached: they depend on the time cap and pruning margin of the run, and are
+# tried again by the next search. Partial fits are only pruned against partial AICs (of
+# this run and of the cached candidates). The best order is saved per region and used
+# by the forecast.
+#
+# Note: AIC values are only comparable between candidates with the same differencing
+# (d, D), since differencing changes the likelihood's data.
+##
+
+import os
+import json
+import time
+import hashlib
+import itertools
+import traceback
+import warnings
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+from CodeDataPreparation import DataStore
+from CodeTimeForecast.ModelCache import CACHE_FOLDER, series_fingerprint, spec_name
+from General.layout import best_order_path
+from CodeTimeForecast.SarimaFit import SARIMA_ORDER, SEASONAL_ORDER, MODEL_OPTIONS
+
+## @brief Optimizer iterations of the partial fits used for pruning.
+PARTIAL_ITERATIONS = 10
+
+## @brief Optimizer iterations of the full fits.
+FULL_ITERATIONS = 50
+
+## @brief Default wall-time cap per candidate fit in seconds.
+DEFAULT_TIME_CAP = 300
+
+## @brief Default pruning margin, relative to the magnitude of the best partial AIC.
+DEFAULT_PRUNE_MARGIN = 0.02
+
+## @brief Series attached by each worker process from shared memory.
+_WORKER = {}
+
+
+##
+# @class CandidateTimeout
+# @brief Raised from the optimizer callback when a candidate exceeds its time cap.
+class CandidateTimeout(Exception):
+    pass
+
+
+##
+# @brief Builds the candidate grid of (order, seasonal_order) pairs.
+# @param p, d, q Iterables of non-seasonal orders.
+# @param P, D, Q Iterables of seasonal orders.
+# @param s Seasonal period.
+# @return List of ((p, d, q), (P, D, Q, s)) tuples.
+def candidate_grid(p=(0, 1, 2), d=(0,), q=(0, 1, 2), P=(0, 1, 2), D=(0,), Q=(0, 1, 2), s=24):
+    return [((p_, d_, q_), (P_, D_, Q_, s)) for p_, d_, q_, P_, D_, Q_ in itertools.product(p, d, q, P, D, Q)]
+
+
+##
+# @brief Worker initializer: attaches the shared training series.
+def _attach_series(name, length, start_ns, freq):
+    block = shared_memory.SharedMemory(name=name)
+    values = np.ndarray((length,), dtype=np.float64, buffer=block.buf)
+    index = pd.date_range(pd.Timestamp(start_ns, unit='ns'), periods=length, freq=freq)
+    _WORKER['block'] = block  # keeps the mapping alive for the life of the worker
+    _WORKER['series'] = pd.Series(values, index=index)
+
+
+##
+# @brief Fits one candidate on the shared series (runs in a worker process).
+# @return Dictionary with the status, AIC/BIC, parameters, iterations and time of the fit.
+def _fit_candidate(order, seasonal_order, maxiter, time_cap, start_params=None):
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+    started = time.perf_counter()
+
+    def callback(params):
+        if time.perf_counter() - started > time_cap:
+            raise CandidateTimeout()
+
+    record = {'order': list(order), 'seasonal_order': list(seasonal_order)}
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            model = SARIMAX(_WORKER['series'], order=order, seasonal_order=seasonal_order, **MODEL_OPTIONS)
+            results = model.fit(start_params=start_params, maxiter=maxiter, disp=False, callback=callback)
+    except CandidateTimeout:
+        record.update(status='timeout', seconds=round(time.perf_counter() - started, 3))
+        return record
+    except Exception as e:
+        record.update(status='error', error=str(e), seconds=round(time.perf_counter() - started, 3))
+        return record
+
+    retvals = getattr(results, 'mle_retvals', None) or {}
+    record.update(status='ok', aic=float(results.aic), bic=float(results.bic), llf=float(results.llf),
+                  params=[float(v) for v in results.params], iterations=retvals.get('iterations'),
+                  converged=bool(retvals.get('converged', False)),
+                  seconds=round(time.perf_counter() - started, 3))
+    return record
+
+
+##
+# @brief Returns the path of the candidate cache of a training series.
+# @param series Training series.
+# @param folder Cache folder.
+# @return Path of the JSON cache file.
+def search_cache_path(series, folder=CACHE_FOLDER):
+    options = json.dumps({'model': MODEL_OPTIONS, 'partial': PARTIAL_ITERATIONS, 'full': FULL_ITERATIONS},
+                         sort_keys=True)
+    key = hashlib.sha256((series_fingerprint(series) + options).encode()).hexdigest()
+    return os.path.join(folder, f"order_search_{key[:16]}.json")
+
+
+def _load_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_json(path, data):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+##
+# @brief Runs one round of candidate fits on the pool.
+def _run_round(pool, candidates, maxiter, time_cap, start_params=None):
+    start_params = start_params or {}
+    futures = {spec_name(*candidate): pool.submit(_fit_candidate, *candidate, maxiter, time_cap,
+                                                   start_params.get(spec_name(*candidate)))
+               for candidate in candidates}
+    return {name: future.result() for name, future in futures.items()}
+
+
+##
+# @brief Searches the grid for the order with the lowest AIC.
+#
+# @param series Hourly training series with a regular DatetimeIndex.
+# @param grid List of (order, seasonal_order) candidates (defaults to candidate_grid()).
+# @param workers Number of worker processes (defaults to the number of CPU cores).
+# @param time_cap Wall-time cap per candidate fit in seconds.
+# @param prune_margin Relative AIC margin beyond which partial fits are pruned.
+# @param folder Folder of the candidate cache.
+# @return DataFrame with one row per candidate, sorted by AIC (best first), with a
+#         'cached' column telling which candidates were not evaluated in this run.
+def search_orders(series, grid=None, workers=None, time_cap=DEFAULT_TIME_CAP,
+                  prune_margin=DEFAULT_PRUNE_MARGIN, folder=CACHE_FOLDER):
+    grid = candidate_grid() if grid is None else grid
+    series = series.asfreq(series.index.freq or pd.infer_freq(series.index) or 'h')
+    cache_path = search_cache_path(series, folder)
+    # Caches written by older versions may still hold pruned or timed-out candidates
+    cache = {name: record for name, record in _load_json(cache_path).items() if record.get('status') == 'ok'}
+    new = [candidate for candidate in grid if spec_name(*candidate) not in cache]
+    print(f"Order search: {len(grid)} candidates, {len(grid) - len(new)} cached, {len(new)} to evaluate.")
+
+    evaluated = {}
+    if new:
+        values = series.to_numpy(dtype=np.float64)
+        block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        try:
+            np.ndarray(values.shape, dtype=np.float64, buffer=block.buf)[:] = values
+            workers = workers or min(len(new), os.cpu_count() or 1)
+            initargs = (block.name, len(values), series.index[0].value, series.index.freqstr)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach_series, initargs=initargs) as pool:
+                started = time.perf_counter()
+                partial = _run_round(pool, new, PARTIAL_ITERATIONS, time_cap)
+                # Partial AICs are only compared with partial AICs: a full fit has a lower AIC
+                scores = [r['aic'] for r in partial.values() if r['status'] == 'ok']
+                scores += [r['partial_aic'] for r in cache.values() if r.get('partial_aic') is not None]
+                best = min(scores) if scores else None
+                survivors, start_params = [], {}
+                for candidate in new:
+                    name = spec_name(*candidate)
+                    record = partial[name]
+                    if record['status'] != 'ok':
+                        evaluated[name] = record
+                    elif best is not None and record['aic'] > best + prune_margin * abs(best):
+                        evaluated[name] = dict(record, status='pruned', params=None)
+                    else:
+                        survivors.append(candidate)
+                        start_params[name] = record['params']
+                print(f"Partial fits done in {time.perf_counter() - started:.1f} s: "
+                      f"{len(survivors)} of {len(new)} candidates kept for full fits.")
+                for name, record in _run_round(pool, survivors, FULL_ITERATIONS, time_cap, start_params).items():
+                    evaluated[name] = dict(record, partial_aic=partial[name]['aic'])
+                    if record['status'] == 'ok':
+                        cache[name] = evaluated[name]
+        finally:
+            block.close()
+            block.unlink()
+        _save_json(cache_path, cache)
+
+    rows = []
+    for candidate in grid:
+        record = evaluated.get(spec_name(*candidate)) or cache[spec_name(*candidate)]
+        rows.append({'order': tuple(candidate[0]), 'seasonal_order': tuple(candidate[1]),
+                     'status': record['status'], 'aic': record.get('aic', np.nan), 'bic': record.get('bic', np.nan),
+                     'iterations': record.get('iterations'), 'seconds': record.get('seconds'),
+                     'cached': candidate not in new})
+    table = pd.DataFrame(rows)
+    ranked = table['status'] == 'ok'
+    return pd.concat([table[ranked].sort_values('aic'), table[~ranked]], ignore_index=True)
+
+
+##
+# @brief Saves the best order of a search for a region.
+# @param region Region code.
+# @param table DataFrame returned by search_orders().
+# @param folder Cache folder.
+# @return Tuple (order, seasonal_order), or None when no candidate succeeded.
+def save_best_order(region, table, folder=CACHE_FOLDER):
+    ranked = table[table['status'] == 'ok']
+    if ranked.empty:
+        return None
+    best = ranked.iloc[0]
+    _save_json(best_order_path(region, folder), {'order': list(best['order']),
+                                                 'seasonal_order': list(best['seasonal_order']),
+                                                 'aic': float(best['aic']), 'bic': float(best['bic'])})
+    return tuple(best['order']), tuple(best['seasonal_order'])
+
+
+##
+# @brief Returns the searched order of a region, or the default model order.
+# @param region Region code.
+# @param folder Cache folder.
+# @return Tuple (order, seasonal_order).
+def load_best_order(region, folder=CACHE_FOLDER):
+    saved = _load_json(best_order_path(region, folder))
+    if 'order' in saved and 'seasonal_order' in saved:
+        return tuple(saved['order']), tuple(saved['seasonal_order'])
+    return SARIMA_ORDER, SEASONAL_ORDER
+
+
+##
+# @brief Runs the order search on a region's hourly data from the store and saves the best order.
+# @param region Region code.
+# @return Ranked DataFrame of candidates, or None if an error occurs.
+def run_order_search(region="NSW1"):
+    try:
+        series = DataStore.read_dataset("hourly", region, columns=['TOTALDEMAND'])['TOTALDEMAND'].asfreq('h')
+        table = search_orders(series)
+        print(table.head(10).to_string(index=False))
+        best = save_best_order(region, table)
+        print(f"Best order for {region}: {best}")
+        return table
+    except Exception:
+        print(f"ERROR: Order search failed for {region}.")
+        traceback.print_exc()
+        return None
+
+
+if __name__ == "__main__":
+    import sys
+    run_order_search(sys.argv[1] if len(sys.argv) > 1 else "NSW1")
@@ -0,0 +1,86 @@
+##
+# @file RegionModel.py
+# @brief Loads the hourly demand of a region and builds its fitted forecast model.
+#
+# Shared by the forecast script (Sarimamodel5) and the forecast service, so both use the
+# same model: the order found by OrderSearch (or the default order), optional Fourier
+# regressors in DHR mode, and a cached fit or an incremental update in update mode.
+##
+
+import os
+from CodeDataPreparation import DataStore
+from CodeTimeForecast.SarimaFit import fit_sarima
+from CodeTimeForecast.ModelUpdate import is_update_mode, update_sarima
+from CodeTimeForecast.OrderSearch import load_best_order, best_order_path
+from CodeTimeForecast.FourierTerms import is_dhr_mode, get_harmonics, usable_harmonics, fourier_terms, horizon_index
+
+
+##
+# @brief Reads the hourly demand series of a region from the columnar store.
+# @param region Region code.
+# @param df Optional hourly DataFrame handed over by the filter stage; the store is only
+#           read when it is None.
+# @return Series of TOTALDEMAND with an hourly DatetimeIndex.
+def read_hourly_series(region, df=None):
+    if df is None:
+        df = DataStore.read_dataset("hourly", region, columns=['TOTALDEMAND'])
+    return df['TOTALDEMAND'].asfreq('h')
+
+
+##
+# @brief Fits (or rebuilds from the cache, or updates) the forecast model of a region.
+# @param series Hourly demand series.
+# @param region Region code.
+# @return Tuple (results, harmonics); harmonics is empty unless DHR mode is active.
+def fit_region_model(series, region):
+    # Order chosen by the last order search of the region, or the default (2,0,2)x(2,0,2,24)
+    order, seasonal_order = load_best_order(region)
+    print(f"Model order: {order} x {seasonal_order}")
+    exog, harmonics = None, {}
+    if is_dhr_mode():
+        # MODEL_MODE=dhr: weekly/yearly cycles as Fourier regressors on top of the daily SARIMA
+        harmonics = usable_harmonics(get_harmonics(), len(series))
+        exog = fourier_terms(series.index, harmonics) if harmonics else None
+        print(f"Dynamic harmonic regression with harmonics {harmonics}.")
+    if is_update_mode():
+        # MODEL_UPDATE=1: filter only the new hours with the saved parameters and state
+        results, action = update_sarima(series, region, order, seasonal_order, exog=exog)
+        print(f"Model {action}.")
+    else:
+        results = fit_sarima(series, order, seasonal_order, region=region, exog=exog)
+    return results, harmonics
+
+
+##
+# @brief Returns the regressors of a forecast horizon (None outside DHR mode).
+# @param index DatetimeIndex of the training data.
+# @param steps Forecast horizon in hours.
+# @param harmonics Harmonics returned by fit_region_model().
+# @return DataFrame of Fourier terms, or None.
+def horizon_exog(index, steps, harmonics):
+    return fourier_terms(horizon_index(index, steps), harmonics) if harmonics else None
+
+
+##
+# @brief Returns a stamp that changes whenever the model of a region has to be rebuilt.
+#
+# The stamp covers the hourly store files of the region (new or revised hours) and the
+# saved best order (a new order search). It only needs a few stat() calls.
+#
+# @param region Region code.
+# @return Tuple of (path, modification time, size) entries.
+def model_stamp(region):
+    paths = [best_order_path(region)]
+    folder = DataStore.region_folder("hourly", region)
+    if os.path.isdir(folder):
+        for month in DataStore.list_months("hourly", region):
+            month_folder = os.path.join(folder, f"month={month}")
+            paths += [os.path.join(month_folder, name) for name in sorted(os.listdir(month_folder))]
+    stamp = []
+    for path in paths:
+        try:
+            info = os.stat(path)
+            stamp.append((path, info.st_mtime_ns, info.st_size))
+        except OSError:
+            continue
+    return tuple(stamp)
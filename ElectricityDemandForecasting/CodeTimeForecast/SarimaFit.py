@@ -0,0 +1,162 @@
+##
+# @file SarimaFit.py
+# @brief SARIMA model specification and cached fitting shared by the forecasting scripts.
+#
+# fit_sarima() builds the SARIMAX model of the pipeline and returns its results. When
+# the parameters of the same series and specification are in the model cache, the
+# model is only filtered with them instead of being fitted again.
+#
+# When a fit is needed, the optimizer is warm-started from the last converged parameter
+# vector of the same region and model (MODEL_WARM_START=1). Consecutive fits differ by
+# a few days of data, so the previous optimum is a far better starting point than the
+# statsmodels defaults. A fit that stops at its iteration limit without converging does
+# not replace the saved vector, so one failed fit cannot spoil the following starts.
+# The vectors are not cache entries, so the model cache never evicts them. Every fit
+# appends its start type, iteration and function-call counts and fit time to
+# ModelCache/fit_log.csv, so warm and cold starts can be compared.
+##
+
+import os
+import csv
+import json
+import time
+import numpy as np
+from datetime import datetime
+from dotenv import load_dotenv
+from General.regions import ENV_PATH
+from CodeTimeForecast.ModelCache import CACHE_FOLDER, ModelCache, cache_key, series_fingerprint, spec_name
+
+## @brief Non-seasonal (p, d, q) order of the demand model.
+SARIMA_ORDER = (2, 0, 2)
+
+## @brief Seasonal (P, D, Q, s) order of the demand model (daily season of hourly data).
+SEASONAL_ORDER = (2, 0, 2, 24)
+
+## @brief Options of the SARIMAX model.
+MODEL_OPTIONS = {'enforce_stationarity': False, 'enforce_invertibility': False}
+
+## @brief Options of SARIMAX.fit().
+FIT_OPTIONS = {'disp': False}
+
+## @brief CSV log of every fit (start type, iterations, function calls, time).
+FIT_LOG = "fit_log.csv"
+
+
+##
+# @brief Tells whether the model cache is enabled through MODEL_CACHE.
+# @return False if MODEL_CACHE is set to 0/false/no.
+def is_cache_enabled():
+    load_dotenv(ENV_PATH)
+    return os.getenv('MODEL_CACHE', '1').strip().lower() not in ('0', 'false', 'no')
+
+
+##
+# @brief Tells whether fits are warm-started through MODEL_WARM_START.
+# @return False if MODEL_WARM_START is set to 0/false/no.
+def is_warm_start_enabled():
+    load_dotenv(ENV_PATH)
+    return os.getenv('MODEL_WARM_START', '1').strip().lower() not in ('0', 'false', 'no')
+
+
+##
+# @brief Returns the path of the saved start parameters of a region and model.
+# @param region Region code (None for fits that are not tied to a region).
+# @param order Non-seasonal order.
+# @param seasonal_order Seasonal order.
+# @param folder Folder holding the parameter files.
+# @return Path of the JSON file.
+def start_params_path(region, order=SARIMA_ORDER, seasonal_order=SEASONAL_ORDER, folder=CACHE_FOLDER):
+    return os.path.join(folder, f"start_{region or 'any'}_{spec_name(order, seasonal_order)}.json")
+
+
+##
+# @brief Loads saved start parameters if they belong to the same parameter layout.
+# @param path Path returned by start_params_path().
+# @param param_names Parameter names of the model to fit.
+# @return List of floats, or None.
+def load_start_params(path, param_names):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if saved.get('param_names') != list(param_names):
+        return None
+    return saved['params']
+
+
+##
+# @brief Saves a converged parameter vector as the start of the next fit.
+# @param path Path returned by start_params_path().
+# @param params pandas Series of estimated parameters.
+def save_start_params(path, params):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump({'param_names': list(params.index), 'params': [float(v) for v in params.values]}, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+##
+# @brief Appends one fit to the fit log.
+def _log_fit(folder, row):
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, FIT_LOG)
+    new_file = not os.path.exists(path)
+    with open(path, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(row))
+        if new_file:
+            writer.writeheader()
+        writer.writerow(row)
+
+
+##
+# @brief Fits a SARIMA model, or rebuilds it from cached parameters.
+#
+# @param series Hourly training series with a DatetimeIndex.
+# @param order Non-seasonal (p, d, q) order.
+# @param seasonal_order Seasonal (P, D, Q, s) order.
+# @param fit_options Options passed to SARIMAX.fit() (defaults to FIT_OPTIONS).
+# @param cache ModelCache to use; None uses the default cache unless MODEL_CACHE=0, False disables it.
+# @param region Optional region code stored with the cache entry and used for warm starts.
+# @param folder Folder of the start parameters and the fit log.
+# @param exog Optional DataFrame of exogenous regressors aligned with the series
+#             (e.g. Fourier terms in DHR mode).
+# @return statsmodels SARIMAXResults.
+def fit_sarima(series, order=SARIMA_ORDER, seasonal_order=SEASONAL_ORDER, fit_options=None,
+               cache=None, region=None, folder=CACHE_FOLDER, exog=None):
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+    fit_options = dict(FIT_OPTIONS if fit_options is None else fit_options)
+    model = SARIMAX(series, exog=exog, order=order, seasonal_order=seasonal_order, **MODEL_OPTIONS)
+
+    if cache is None:
+        cache = ModelCache() if is_cache_enabled() else False
+    options = {'model': MODEL_OPTIONS, 'fit': fit_options}
+    if exog is not None:
+        options['exog'] = {name: series_fingerprint(exog[name]) for name in exog.columns}
+    key = cache_key(series, order, seasonal_order, options)
+    entry = cache.get(key) if cache else None
+    if entry is not None and entry.get('param_names') == list(model.param_names):
+        print(f"Model cache hit ({key[:12]}): reusing fitted parameters, fit() skipped.")
+        return model.filter(entry['params'])
+
+    start_path = start_params_path(region, order, seasonal_order, folder)
+    start_params = load_start_params(start_path, model.param_names) if is_warm_start_enabled() else None
+    started = time.perf_counter()
+    results = model.fit(start_params=start_params, **fit_options)
+    elapsed = time.perf_counter() - started
+
+    retvals = getattr(results, 'mle_retvals', None) or {}
+    converged = bool(retvals.get('converged', False))
+    start = "warm" if start_params is not None else "cold"
+    print(f"Model fitted in {elapsed:.1f} s ({start} start, {retvals.get('iterations')} iterations, "
+          f"{retvals.get('fcalls')} function calls, converged={converged}).")
+    _log_fit(folder, {'time': datetime.now().isoformat(timespec='seconds'), 'region': region,
+                      'order': order, 'seasonal_order': seasonal_order, 'nobs': int(results.nobs), 'start': start,
+                      'iterations': retvals.get('iterations'), 'fcalls': retvals.get('fcalls'),
+                      'seconds': round(elapsed, 3), 'converged': converged, 'llf': float(results.llf)})
+    if converged and np.isfinite(results.llf):
+        save_start_params(start_path, results.params)
+    if cache:
+        cache.put(key, results.params, {'region': region, 'order': list(order),
+                                        'seasonal_order': list(seasonal_order), 'fit_seconds': elapsed})
+    return results
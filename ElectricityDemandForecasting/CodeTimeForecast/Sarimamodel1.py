@@ -5,7 +5,7 @@ from statsmodels.tsa.stattools import adfuller
 import os
 
 # === Step 1: Load hourly demand data ===
-df = pd.read_csv("../FiltredDataset/PRICE_AND_DEMAND_2024_HOURLY_NSW1.csv", parse_dates=True, index_col='SETTLEMENTDATE')
+df = pd.read_csv("../FiltredDataset/PRICE_AND_DEMAND_HOURLY_NSW1.csv", parse_dates=True, index_col='SETTLEMENTDATE')
 
 # === Step 2: Keep TOTALDEMAND series and set frequency explicitly ===
 demand_series = df['TOTALDEMAND']
@@ -37,7 +37,7 @@ import os
 def run_sarima_forecast(df):
     # Re-load data from the filtered dataset to ensure consistency
     print("Loading dataset...")
-    df = pd.read_csv("FiltredDataset/PRICE_AND_DEMAND_2024_HOURLY_NSW1.csv", parse_dates=True,
+    df = pd.read_csv("FiltredDataset/PRICE_AND_DEMAND_HOURLY_NSW1.csv", parse_dates=True,
                      index_col='SETTLEMENTDATE')
 
     # Extract and re-sample demand series to ensure hourly frequency
@@ -53,7 +53,7 @@ import os
 def run_sarima_forecast(df):
     # Load the dataset
     print("Loading dataset...")
-    df = pd.read_csv("FiltredDataset/PRICE_AND_DEMAND_2024_HOURLY_NSW1.csv", parse_dates=True,
+    df = pd.read_csv("FiltredDataset/PRICE_AND_DEMAND_HOURLY_NSW1.csv", parse_dates=True,
                      index_col='SETTLEMENTDATE')
 
     # Extract the demand series with hourly frequency
@@ -9,23 +9,27 @@
 #  @date 2025-04-20
 
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
-from statsmodels.tsa.statespace.sarimax import SARIMAX
-from statsmodels.tsa.stattools import adfuller
 import os
 import sys
-import tkinter as tk
 import traceback
+from General.batch import is_headless, get_horizon
+from General.layout import forecast_plot_path, forecast_excel_path
+from CodeTimeForecast.RegionModel import read_hourly_series, fit_region_model, horizon_exog
+from CodeTimeForecast.ForecastSimulation import get_simulation_settings, simulate_bands
+from CodeTimeForecast.ForecastBundle import MAX_HORIZON, is_precompute_mode, load_or_build_bundle
 
 ##
 # @brief Launches a Tkinter GUI to request forecast duration from the user.
 #
 # Allows the user to select a duration in weeks or months via an interactive slider.
-# Falls back to a default of 1 week if the GUI fails.
+# Falls back to a default of 1 week if the GUI fails. tkinter is only imported here,
+# so headless runs never load it.
 #
 # @return int Number of hours to forecast (e.g., 168 for 1 week)
 def get_forecast_steps():
+    import tkinter as tk
+
     def update_scale(*args):
         unit = unit_var.get()
         if unit == "Weeks":
@@ -74,20 +78,39 @@ def get_forecast_steps():
 # @brief Executes SARIMA-based forecasting on electricity demand data.
 #
 # Performs the following steps:
-# - Loads the preprocessed dataset
+# - Uses the hourly dataset handed over by the filter stage, or loads it from the
+#   columnar store (memory-mapped) when none is given
 # - Checks for stationarity using the Augmented Dickey-Fuller test
-# - Fits a SARIMA model with pre-selected parameters
-# - Gets forecast length via GUI
-# - Simulates forecasts and plots results
-# - Saves output to both Excel and PNG
+# - Fits a SARIMA model with the order found by OrderSearch (or the pre-selected default
+#   order); parameters are reused from the model cache when the hourly data and the model
+#   are unchanged, or updated incrementally with the new hours only in update mode
+# - In DHR mode (MODEL_MODE=dhr), adds Fourier terms of the weekly and yearly cycles
+#   as regressors for the training data and the forecast horizon
+# - Gets forecast length via GUI, or from FORECAST_HORIZON in headless mode
+# - In precompute mode (FORECAST_PRECOMPUTE=1), slices the forecast from the 12-month
+#   bundle of the fitted model, which is computed only once per model
+# - Simulates forecasts and plots results; with FORECAST_SIMULATIONS > 0, many paths are
+#   simulated and reduced to quantile bands (P10/P50/P90 by default) and to the
+#   probabilities that the daily peak exceeds PEAK_THRESHOLDS_MW (default: observed peak)
+# - Saves output to both Excel and PNG (under OUTPUT_DIR when set)
+#
+# Several regions can be forecast in parallel worker processes; in that case the
+# horizon is chosen once up front and passed in, and the plot window is not shown.
 #
-# @param df Unused placeholder to maintain compatibility (can be extended)
-# @return None
-def run_sarima_forecast(df):
+# @param df Hourly DataFrame returned by filter_data_by_hour(); None (or the row count of
+#           the streaming filter) reads the hourly store
+# @param region Region code whose hourly dataset is forecast, e.g., "NSW1"
+# @param forecast_steps Optional forecast horizon in hours; asks via the GUI when None
+#        (uses FORECAST_HORIZON in headless mode)
+# @param show_plot Whether to open the plot window after saving it (never in headless mode)
+# @return Path of the Excel forecast, or None if an error occurs
+def run_sarima_forecast(df, region="NSW1", forecast_steps=None, show_plot=True):
+    # Plotting and statistics libraries take about a second to import; only this stage needs them
+    import matplotlib.pyplot as plt
+    from statsmodels.tsa.stattools import adfuller
     try:
-        print("Step 1: Loading dataset...")
-        df = pd.read_csv("FiltredDataset/PRICE_AND_DEMAND_2024_HOURLY_NSW1.csv", parse_dates=True, index_col='SETTLEMENTDATE')
-        demand_series = df['TOTALDEMAND'].asfreq('h')
+        print(f"Step 1: Loading dataset for {region}...")
+        demand_series = read_hourly_series(region, df if isinstance(df, pd.DataFrame) else None)
 
         print("Step 2: Running ADF stationarity test...")
         adf_result = adfuller(demand_series.dropna())
@@ -97,39 +120,68 @@ def run_sarima_forecast(df):
             print("Note: The series may be non-stationary. Differencing may be needed.")
 
         print("Step 3: Fitting SARIMA model...")
-        model = SARIMAX(demand_series,
-                        order=(2, 0, 2),
-                        seasonal_order=(2, 0, 2, 24),
-                        enforce_stationarity=False,
-                        enforce_invertibility=False)
-        results = model.fit(disp=False)
+        results, harmonics = fit_region_model(demand_series, region)
         print("Model fitting complete.")
-        print(results.summary())
+        if results.nobs < len(demand_series):
+            # Incremental update (MODEL_UPDATE=1): the results only filter the newest hours,
+            # so their statistics would describe those hours and not the fitted history
+            print(f"Saved parameters applied to the {int(results.nobs)} newest hour(s); "
+                  f"the model was fitted on up to {len(demand_series)} hours.")
+        else:
+            print(results.summary())
 
-        print("Step 4: Getting forecast range from user...")
-        forecast_steps = get_forecast_steps()
+        if forecast_steps is None and is_headless():
+            forecast_steps = get_horizon()
+        elif forecast_steps is None:
+            print("Step 4: Getting forecast range from user...")
+            forecast_steps = get_forecast_steps()
         print(f"Forecasting {forecast_steps} hours ahead ({forecast_steps // 24} days).")
 
-        forecast_mean = results.get_forecast(steps=forecast_steps).predicted_mean
-        forecast_simulated = results.simulate(nsimulations=forecast_steps, anchor='end')
+        if is_precompute_mode() and forecast_steps <= MAX_HORIZON:
+            # FORECAST_PRECOMPUTE=1: views of the 12-month bundle, computed once per fitted model
+            view = load_or_build_bundle(results, demand_series, region, harmonics).slice(forecast_steps)
+            forecast_mean, forecast_simulated, simulation = view['mean'], view['simulated'], view['simulation']
+        else:
+            future_exog = horizon_exog(demand_series.index, forecast_steps, harmonics)
+            forecast_mean = results.get_forecast(steps=forecast_steps, exog=future_exog).predicted_mean
+            forecast_simulated = results.simulate(nsimulations=forecast_steps, anchor='end', exog=future_exog)
+
+            simulation = None
+            settings = get_simulation_settings()
+            if settings['paths'] > 0:
+                thresholds = settings['thresholds'] or [round(float(demand_series.max()))]
+                print(f"Simulating {settings['paths']} forecast paths for quantile bands...")
+                simulation = simulate_bands(results, forecast_steps, settings['paths'], settings['quantiles'],
+                                            thresholds, exog=future_exog, memory_mb=settings['memory_mb'])
+        if simulation is not None:
+            print(simulation['peak_exceedance'].to_string())
 
         print("Step 5: Plotting forecast results...")
         plt.figure(figsize=(15, 5))
         plt.plot(demand_series[-24 * 7:], label='Observed (last 7 days)', color='blue')
         plt.plot(forecast_mean, label='Forecast Trend', color='orange')
         plt.plot(forecast_simulated, label='Forecast Fluctuations', color='green', alpha=0.7)
-        plt.title('SARIMA Forecast of Electricity Demand')
+        if simulation is not None:
+            bands = simulation['bands']
+            plt.fill_between(bands.index, bands.iloc[:, 0], bands.iloc[:, -1], color='orange', alpha=0.2,
+                             label=f'Forecast Band ({bands.columns[0]}–{bands.columns[-1]})')
+        plt.title(f'SARIMA Forecast of Electricity Demand ({region})')
         plt.xlabel('Date')
         plt.ylabel('Demand (MW)')
         plt.legend()
         plt.grid(True)
         plt.tight_layout()
 
-        plot_path = "CodeDataVisualisation/FORECAST_PLOT_2025_DYNAMIC.png"
+        plot_path = forecast_plot_path(region)
         os.makedirs(os.path.dirname(plot_path), exist_ok=True)
-        plt.savefig(plot_path)
+        # Written under a temporary name and renamed, so readers of a republished
+        # forecast never see a partial file
+        plt.savefig(plot_path + ".tmp", format='png')
+        os.replace(plot_path + ".tmp", plot_path)
         print(f"Plot saved to: {plot_path}")
-        plt.show()
+        if show_plot and not is_headless():
+            plt.show()
+        plt.close()
 
         print("Step 6: Saving forecast data to Excel...")
         forecast_df = pd.DataFrame({
@@ -137,24 +189,37 @@ def run_sarima_forecast(df):
             'forecast_demand_trend': forecast_mean.values,
             'forecast_demand_fluctuations': forecast_simulated.values
         })
-
-        excel_path = "CodeDataVisualisation/FORECAST_DEMAND_2025_DYNAMIC.xlsx"
+        sheets = {'Forecast': forecast_df}
+        if simulation is not None:
+            for name, values in simulation['bands'].items():
+                forecast_df[f'forecast_demand_{name.lower()}'] = values.values
+            exceedance = simulation['daily_exceedance'].rename_axis('date').reset_index()
+            exceedance['date'] = exceedance['date'].dt.date
+            horizon = pd.DataFrame([['whole horizon', *simulation['peak_exceedance'].values]],
+                                   columns=exceedance.columns)
+            sheets['Peak Exceedance'] = pd.concat([exceedance, horizon], ignore_index=True)
+
+        excel_path = forecast_excel_path(region)
         os.makedirs(os.path.dirname(excel_path), exist_ok=True)
 
-        with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
-            forecast_df.to_excel(writer, index=False, sheet_name='Forecast')
-            worksheet = writer.sheets['Forecast']
-            for column_cells in worksheet.columns:
-                max_length = max(len(str(cell.value)) for cell in column_cells)
-                worksheet.column_dimensions[column_cells[0].column_letter].width = max_length + 2
+        tmp_path = excel_path[:-len(".xlsx")] + ".tmp.xlsx"
+        with pd.ExcelWriter(tmp_path, engine='openpyxl') as writer:
+            for sheet_name, sheet_df in sheets.items():
+                sheet_df.to_excel(writer, index=False, sheet_name=sheet_name)
+                worksheet = writer.sheets[sheet_name]
+                for column_cells in worksheet.columns:
+                    max_length = max(len(str(cell.value)) for cell in column_cells)
+                    worksheet.column_dimensions[column_cells[0].column_letter].width = max_length + 2
 
+        os.replace(tmp_path, excel_path)
         print(f"Forecast data saved to: {excel_path}")
+        return excel_path
 
     except FileNotFoundError:
         print("ERROR: Dataset file not found. Check the input path.")
         traceback.print_exc()
     except Exception:
-        print("ERROR: An unexpected error occurred during the SARIMA forecast process.")
+        print(f"ERROR: An unexpected error occurred during the SARIMA forecast process for {region}.")
         traceback.print_exc()
 
 ##
@@ -0,0 +1,145 @@
+##
+# @file batch.py
+# @brief Non-interactive (headless) batch mode: command line options, Agg rendering, output folder.
+#
+# The interactive pipeline blocks on a Tk window for the forecast horizon and on
+# plt.show() for every plot. In headless mode the horizon, regions and output folder come
+# from the command line or the .env file, plots are rendered with the Agg backend
+# straight to PNG files, and tkinter is never imported, so scheduled runs (cron,
+# containers) finish without waiting for a user.
+#
+# Headless mode is on with --headless, with HEADLESS=1, or automatically on Linux when
+# no display is available (DISPLAY / WAYLAND_DISPLAY unset).
+#
+#   python MainStart.py --headless --horizon 2w --regions NSW1,VIC1 --output-dir /data/out
+#
+# --daemon keeps the pipeline running headless on a schedule (see General/scheduler.py).
+#
+# Options are passed on through environment variables, so worker processes of the
+# pipeline see the same settings.
+##
+
+import os
+import sys
+import argparse
+from dotenv import load_dotenv
+from General.regions import ENV_PATH
+
+## @brief Hours per horizon unit: hours, days, weeks and months of 30 days (as in the GUI).
+HORIZON_UNITS = {'h': 1, 'd': 24, 'w': 7 * 24, 'm': 30 * 24}
+
+## @brief Default forecast horizon in hours when no GUI is shown (1 week, as the GUI fallback).
+DEFAULT_HORIZON = 7 * 24
+
+## @brief Seconds per interval unit of the scheduler cadence.
+INTERVAL_UNITS = {'s': 1, 'm': 60, 'h': 3600}
+
+
+##
+# @brief Tells whether the pipeline runs without user interaction.
+# @return True with HEADLESS=1, or on Linux without a display.
+def is_headless():
+    load_dotenv(ENV_PATH)
+    value = os.getenv('HEADLESS', '').strip().lower()
+    if value:
+        return value in ('1', 'true', 'yes')
+    no_display = not (os.getenv('DISPLAY') or os.getenv('WAYLAND_DISPLAY'))
+    return sys.platform.startswith('linux') and no_display
+
+
+##
+# @brief Parses a forecast horizon such as "168", "36h", "5d", "2w" or "3m" into hours.
+# @param value Horizon string or number.
+# @return Number of hours.
+# @throws ValueError If the value is not a positive horizon.
+def parse_horizon(value):
+    text = str(value).strip().lower()
+    unit = text[-1] if text and text[-1] in HORIZON_UNITS else 'h'
+    number = text[:-1] if text and text[-1] in HORIZON_UNITS else text
+    if not number.isdigit() or int(number) < 1:
+        raise ValueError(f"Invalid forecast horizon '{value}'; use e.g. 168, 36h, 5d, 2w or 3m.")
+    return int(number) * HORIZON_UNITS[unit]
+
+
+##
+# @brief Parses a time interval such as "300", "90s", "5m" or "1h" into seconds.
+# @param value Interval string or number.
+# @return Number of seconds.
+# @throws ValueError If the value is not a positive interval.
+def parse_interval(value):
+    text = str(value).strip().lower()
+    unit = text[-1] if text and text[-1] in INTERVAL_UNITS else 's'
+    number = text[:-1] if text and text[-1] in INTERVAL_UNITS else text
+    if not number.isdigit() or int(number) < 1:
+        raise ValueError(f"Invalid interval '{value}'; use e.g. 300, 90s, 5m or 1h.")
+    return int(number) * INTERVAL_UNITS[unit]
+
+
+##
+# @brief Returns the forecast horizon of a headless run (FORECAST_HORIZON, default 1 week).
+# @return Number of hours.
+def get_horizon():
+    load_dotenv(ENV_PATH)
+    return parse_horizon(os.getenv('FORECAST_HORIZON', DEFAULT_HORIZON))
+
+
+##
+# @brief Places an output file under the configured output folder (OUTPUT_DIR).
+# @param relative Path relative to the output folder, e.g. "CodeDataVisualisation/plot.png".
+# @return Path of the file; unchanged when no output folder is configured.
+def output_path(relative):
+    load_dotenv(ENV_PATH)
+    root = os.getenv('OUTPUT_DIR', '').strip()
+    return os.path.join(root, relative) if root else relative
+
+
+##
+# @brief Parses the command line options of the pipeline.
+# @param argv Argument list (defaults to sys.argv[1:]).
+# @return argparse.Namespace with headless, horizon, regions, output_dir, force, daemon and every.
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Electricity demand forecasting pipeline.")
+    parser.add_argument('--headless', action='store_true',
+                        help="run without GUI or plot windows; plots are written to files")
+    parser.add_argument('--horizon', type=parse_horizon,
+                        help="forecast horizon, e.g. 168, 5d, 2w or 3m (default: FORECAST_HORIZON or 1 week)")
+    parser.add_argument('--regions', help="comma-separated regions, e.g. NSW1,VIC1 (default: REGIONS / REGION)")
+    parser.add_argument('--output-dir', help="folder for plots, Excel and CSV outputs (default: OUTPUT_DIR)")
+    parser.add_argument('--force', action='store_true',
+                        help="run every stage, even when its inputs and outputs are unchanged (PIPELINE_CACHE=0)")
+    parser.add_argument('--daemon', action='store_true',
+                        help="keep running headless and refresh data and forecasts on a schedule")
+    parser.add_argument('--every', type=parse_interval,
+                        help="cadence of the data refresh in daemon mode, e.g. 5m (default: SCHEDULE_EVERY)")
+    return parser.parse_args(argv)
+
+
+##
+# @brief Applies the command line options and selects the Agg backend in headless mode.
+#
+# The options are stored as environment variables, which take precedence over the .env
+# file and are inherited by worker processes.
+#
+# @param args Namespace returned by parse_args().
+# @return True if the run is headless.
+def configure(args):
+    if args.headless or args.daemon:
+        os.environ['HEADLESS'] = '1'
+    if args.horizon:
+        os.environ['FORECAST_HORIZON'] = str(args.horizon)
+    if args.regions:
+        os.environ['REGIONS'] = args.regions
+    if args.output_dir:
+        os.environ['OUTPUT_DIR'] = args.output_dir
+    if args.force:
+        os.environ['PIPELINE_CACHE'] = '0'
+    if args.every:
+        os.environ['SCHEDULE_EVERY'] = str(args.every)
+    headless = is_headless()
+    if headless:
+        # matplotlib reads MPLBACKEND when it is first imported (workers inherit it); a
+        # process that already imported it switches before any figure exists
+        os.environ['MPLBACKEND'] = 'Agg'
+        if 'matplotlib' in sys.modules:
+            sys.modules['matplotlib'].use('Agg')
+    return headless
@@ -0,0 +1,91 @@
+##
+# @file layout.py
+# @brief File layout of the pipeline: where the stages read and write their data.
+#
+# The pipeline declares the inputs and outputs of every stage before any of them runs
+# (see MainStart.build_stages), so these path helpers are kept apart from the modules
+# that do the work: importing them loads neither pandas nor pyarrow, and a run whose
+# stages are all up to date never imports the data libraries.
+##
+
+import os
+from dotenv import load_dotenv
+from General.regions import ENV_PATH
+from General.batch import output_path
+
+## @brief Root folder of the columnar store.
+STORE_FOLDER = "DataStore"
+
+## @brief Folder holding the combined and hourly CSV exports.
+OUTPUT_FOLDER = "FiltredDataSet"
+
+## @brief Default model cache folder.
+CACHE_FOLDER = "ModelCache"
+
+
+##
+# @brief Returns the folder of one region of a dataset.
+# @param dataset Dataset name, e.g. "combined" or "hourly".
+# @param region Region code, e.g. "NSW1".
+# @param root Store root folder.
+# @return Folder path.
+def region_folder(dataset, region, root=STORE_FOLDER):
+    return os.path.join(root, dataset, f"region={region}")
+
+
+##
+# @brief Returns the store dataset name of a rollup resolution.
+# @param resolution One of DataRollup.RESOLUTIONS, or "*" for a glob over all of them.
+# @return Dataset name, e.g. "rollup_D".
+def rollup_dataset(resolution):
+    return f"rollup_{resolution}"
+
+
+##
+# @brief Returns the glob pattern of the raw monthly files of a region.
+#
+# The files are read from DOWNLOAD_FOLDER (default DataSetOrigin). COMBINE_MONTHS is the
+# month prefix of the files that are combined: "2024" (default) takes every month of 2024,
+# an empty value takes every downloaded month (used by the scheduler).
+#
+# @param region Region code, e.g., "NSW1".
+# @return Glob pattern, e.g. "DataSetOrigin/PRICE_AND_DEMAND_2024*_NSW1.csv".
+def raw_pattern(region="NSW1"):
+    load_dotenv(ENV_PATH)
+    folder = os.path.normpath(os.getenv('DOWNLOAD_FOLDER', 'DataSetOrigin'))
+    months = os.getenv('COMBINE_MONTHS', '2024').strip()
+    return os.path.join(folder, f"PRICE_AND_DEMAND_{months}*_{region}.csv")
+
+
+##
+# @brief Returns the folder of the combined 5-minute CSV export of a region.
+# @param region Region code, e.g., "NSW1".
+# @return Relative path of the folder holding one CSV file per month.
+def combined_folder(region="NSW1"):
+    return os.path.join(OUTPUT_FOLDER, f"PRICE_AND_DEMAND_ALL_{region}")
+
+
+##
+# @brief Returns the path of the hourly dataset of a region.
+# @param region Region code, e.g., "NSW1".
+# @return Relative path of the hourly CSV file (the whole history, whatever years it covers).
+def hourly_path(region="NSW1"):
+    return os.path.join(OUTPUT_FOLDER, f"PRICE_AND_DEMAND_HOURLY_{region}.csv")
+
+
+##
+# @brief Returns the path of the best order saved for a region.
+def best_order_path(region, folder=CACHE_FOLDER):
+    return os.path.join(folder, f"best_order_{region}.json")
+
+
+##
+# @brief Returns the path of the forecast plot of a region (under OUTPUT_DIR when set).
+def forecast_plot_path(region="NSW1"):
+    return output_path(f"CodeDataVisualisation/FORECAST_PLOT_2025_DYNAMIC_{region}.png")
+
+
+##
+# @brief Returns the path of the Excel forecast of a region (under OUTPUT_DIR when set).
+def forecast_excel_path(region="NSW1"):
+    return output_path(f"CodeDataVisualisation/FORECAST_DEMAND_2025_DYNAMIC_{region}.xlsx")
@@ -0,0 +1,43 @@
+##
+# @file memory.py
+# @brief Memory footprint report printed after each pipeline stage.
+#
+# Reports the deep memory usage of the DataFrames produced by a stage together with
+# the peak resident set size of the process, so the effect of compact mode can be
+# confirmed on large histories.
+##
+
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows has no resource module
+    resource = None
+
+
+##
+# @brief Returns the peak resident set size of the current process in MB.
+# @return Peak RSS in MB, or None when the platform does not expose it.
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak / (1024 ** 2) if sys.platform == "darwin" else peak / 1024
+
+
+##
+# @brief Prints the memory used by a stage's DataFrames and the process peak RSS.
+# @param stage Name of the pipeline stage.
+# @param frames A DataFrame, or a dictionary of DataFrames (e.g. one per region);
+#               entries that are not DataFrames (streamed stages) are ignored.
+# @return Total deep size of the frames in MB.
+def memory_report(stage, frames):
+    if not isinstance(frames, dict):
+        frames = {"": frames}
+    total = sum(int(df.memory_usage(deep=True).sum()) for df in frames.values() if hasattr(df, 'memory_usage'))
+    total_mb = total / (1024 ** 2)
+    peak = peak_rss_mb()
+    peak_text = f", process peak RSS {peak:.1f} MB" if peak is not None else ""
+    print(f"[memory] {stage}: data {total_mb:.1f} MB{peak_text}")
+    return total_mb
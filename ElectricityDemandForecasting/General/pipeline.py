@@ -0,0 +1,347 @@
+##
+# @file pipeline.py
+# @brief Make-style stage runner: content fingerprints, skipped up-to-date stages, concurrent branches.
+#
+# Every stage declares the files it reads (inputs), the files it writes (outputs), the
+# settings that change its result (params) and the stages it depends on (after). Before
+# a stage runs, the SHA-256 of its input files and its params are combined into an input
+# fingerprint. The stage is skipped when this fingerprint equals the one of its last
+# successful run and its outputs are still exactly as that run left them.
+#
+# File hashes are cached by path, size and modification time, so an unchanged file is
+# only stat()ed. Stages whose dependencies are done run concurrently: on a thread pool,
+# in worker processes (where="process", e.g. SARIMA fits), or on the main thread
+# (where="main", e.g. plots that may open a window). A stage that fails (raises or returns
+# None) is not recorded, and the stages after it do not run.
+#
+# The fingerprints are kept in DataStore/_pipeline.json (PIPELINE_CACHE=0 runs every stage).
+# A run can be given a deadline: stages not started by then are deferred to the next run.
+# PipelineLock keeps two runs (a scheduled tick and a manual run) from working on the
+# same store at the same time.
+##
+
+import os
+import glob
+import json
+import time
+import hashlib
+import traceback
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from dotenv import load_dotenv
+from General.regions import ENV_PATH
+from General.layout import STORE_FOLDER
+from CodeDataPreparation.DownloadManifest import file_checksum
+
+## @brief File holding the fingerprints of the last successful run of every stage.
+STATE_PATH = os.path.join(STORE_FOLDER, "_pipeline.json")
+
+## @brief Lock file held while a run works on the store.
+LOCK_PATH = os.path.join(STORE_FOLDER, "_pipeline.lock")
+
+## @brief Age in seconds after which a lock left by a crashed run is broken.
+LOCK_STALE_SECONDS = 6 * 3600
+
+
+##
+# @brief Tells whether up-to-date stages are skipped (PIPELINE_CACHE).
+# @return False if PIPELINE_CACHE is set to 0/false/no.
+def is_pipeline_cache_enabled():
+    load_dotenv(ENV_PATH)
+    return os.getenv('PIPELINE_CACHE', '1').strip().lower() not in ('0', 'false', 'no')
+
+
+##
+# @brief Returns the current values of settings, for the params of a stage.
+# @param names Environment variable names.
+# @return Dictionary name -> value (None when unset).
+def env_params(*names):
+    load_dotenv(ENV_PATH)
+    return {name: os.getenv(name) for name in names}
+
+
+##
+# @class PipelineLock
+# @brief Exclusive lock file of a pipeline run, usable as a context manager.
+#
+# The file is created atomically and holds the owner's process id and start time. A
+# lock older than stale_seconds, or (on POSIX) held by a process that no longer exists,
+# is broken, so a crashed run does not block the pipeline forever.
+class PipelineLock:
+    ##
+    # @param path Path of the lock file.
+    # @param stale_seconds Age after which an existing lock is considered abandoned.
+    def __init__(self, path=LOCK_PATH, stale_seconds=LOCK_STALE_SECONDS):
+        self.path = path
+        self.stale_seconds = stale_seconds
+        self.held = False
+
+    def _is_stale(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                owner = json.load(f)
+            if time.time() - owner['started'] > self.stale_seconds:
+                return True
+            if os.name == 'posix':
+                os.kill(owner['pid'], 0)  # signal 0 only checks that the process exists
+            return False
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            return False  # the process exists, owned by another user
+        except (OSError, ValueError, KeyError, TypeError):
+            # Unreadable lock: a run is still writing it, or it was left corrupt
+            try:
+                return time.time() - os.path.getmtime(self.path) > self.stale_seconds
+            except OSError:
+                return False
+
+    ##
+    # @brief Takes the lock without waiting.
+    # @return True if the lock is now held, False if another run holds it.
+    def acquire(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        for _ in range(2):
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if not self._is_stale():
+                    return False
+                print(f"Breaking the stale pipeline lock {self.path}.")
+                try:
+                    os.remove(self.path)
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'pid': os.getpid(), 'started': time.time()}, f)
+            self.held = True
+            return True
+        return False
+
+    ##
+    # @brief Releases the lock if this object holds it.
+    def release(self):
+        if self.held:
+            self.held = False
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+##
+# @class Stage
+# @brief One step of the pipeline.
+class Stage:
+    ##
+    # @param name Unique stage name, e.g. "combine:NSW1".
+    # @param func Callable run as func(**kwargs, **fed results); module-level for where="process".
+    # @param kwargs Keyword arguments of the call.
+    # @param after Names of the stages that must finish first.
+    # @param feed Dictionary keyword -> stage name; the result of that stage is passed in,
+    #        or None when it was skipped (the stage then reads the stored data).
+    # @param inputs Files, folders or glob patterns the stage reads.
+    # @param outputs Files, folders or glob patterns the stage writes.
+    # @param params JSON-serializable settings that change the result.
+    # @param always Run even when the fingerprints match (e.g. remote downloads).
+    # @param where "thread", "process" or "main".
+    def __init__(self, name, func, kwargs=None, after=(), feed=None, inputs=(), outputs=(), params=None,
+                 always=False, where="thread"):
+        self.name = name
+        self.func = func
+        self.kwargs = kwargs or {}
+        self.feed = feed or {}
+        self.after = list(after) + [dep for dep in self.feed.values() if dep not in after]
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = params or {}
+        self.always = always
+        self.where = where
+
+
+##
+# @brief Expands files, folders and glob patterns into a sorted list of files.
+def _expand(paths):
+    files = set()
+    for pattern in paths:
+        for path in glob.glob(pattern) if glob.has_magic(pattern) else [pattern]:
+            if os.path.isdir(path):
+                for folder, _, names in os.walk(path):
+                    files.update(os.path.join(folder, name) for name in names if not name.endswith(".tmp"))
+            elif os.path.isfile(path):
+                files.add(path)
+    return sorted(files)
+
+
+##
+# @class StageRunner
+# @brief Runs a list of stages in dependency order and skips the up-to-date ones.
+class StageRunner:
+    ##
+    # @param stages List of Stage objects.
+    # @param state_path Path of the fingerprint file.
+    # @param force Run every stage, ignoring the recorded fingerprints.
+    # @param workers Threads available to concurrent stages (processes: one per CPU core).
+    def __init__(self, stages, state_path=STATE_PATH, force=False, workers=None):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            missing = [dep for dep in stage.after if dep not in self.stages]
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on unknown stage(s) {missing}.")
+        ordered, remaining = set(), dict(self.stages)
+        while remaining:
+            ready = [name for name, stage in remaining.items() if ordered.issuperset(stage.after)]
+            if not ready:
+                raise ValueError(f"Stage dependencies contain a cycle among {sorted(remaining)}.")
+            for name in ready:
+                ordered.add(name)
+                del remaining[name]
+        self.state_path = state_path
+        self.force = force or not is_pipeline_cache_enabled()
+        self.workers = workers or max(2, os.cpu_count() or 1)
+        self.state = self._load_state()
+        self.results = {}
+        self.status = {}
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        state.setdefault('stages', {})
+        state.setdefault('hashes', {})
+        return state
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        with open(self.state_path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=1, sort_keys=True)
+        os.replace(self.state_path + ".tmp", self.state_path)
+
+    ##
+    # @brief Returns the SHA-256 of a file, hashing it only when its size or mtime changed.
+    def file_hash(self, path):
+        info = os.stat(path)
+        cached = self.state['hashes'].get(path)
+        if cached and cached[0] == info.st_size and cached[1] == info.st_mtime_ns:
+            return cached[2]
+        digest = file_checksum(path)
+        self.state['hashes'][path] = [info.st_size, info.st_mtime_ns, digest]
+        return digest
+
+    ##
+    # @brief Combines the contents of a set of files (and optional params) into one fingerprint.
+    def fingerprint(self, paths, params=None):
+        digest = hashlib.sha256(json.dumps(params or {}, sort_keys=True, default=str).encode())
+        for path in _expand(paths):
+            try:
+                digest.update(f"{path}\0{self.file_hash(path)}\0".encode())
+            except OSError:
+                continue  # removed while fingerprinting
+        return digest.hexdigest()
+
+    ##
+    # @brief Tells whether a stage can be skipped, given its current input fingerprint.
+    def is_up_to_date(self, stage, inputs):
+        record = self.state['stages'].get(stage.name)
+        if self.force or stage.always or not record or record['inputs'] != inputs:
+            return False
+        return record['outputs'] == self.fingerprint(stage.outputs)
+
+    def _start(self, stage, executors):
+        kwargs = dict(stage.kwargs, **{key: self.results.get(dep) for key, dep in stage.feed.items()})
+        if stage.where == "process":
+            if 'process' not in executors:
+                executors['process'] = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+            return executors['process'].submit(stage.func, **kwargs)
+        return executors['thread'].submit(stage.func, **kwargs)
+
+    def _finish(self, stage, inputs, call):
+        try:
+            result = call()
+        except Exception:
+            print(f"ERROR: Stage {stage.name} failed.")
+            traceback.print_exc()
+            result = None
+        if result is None:
+            self.status[stage.name] = 'failed'
+            self.state['stages'].pop(stage.name, None)
+            return
+        self.results[stage.name] = result
+        self.status[stage.name] = 'ran'
+        self.state['stages'][stage.name] = {'inputs': inputs, 'outputs': None}
+
+    ##
+    # @brief Runs the stages.
+    # @param on_finish Optional callable run after the last stage and before the output
+    #        fingerprints are recorded (e.g. waiting for background exports).
+    # @param budget Optional time budget in seconds; stages not started within it are
+    #        "deferred" (running stages finish, and the deferred ones run next time).
+    # @return Dictionary stage name -> "ran", "skipped", "failed", "blocked" or "deferred".
+    def run(self, on_finish=None, budget=None):
+        started = time.perf_counter()
+        pending = dict(self.stages)
+        running, main_queue = {}, []
+        executors = {'thread': ThreadPoolExecutor(max_workers=self.workers)}
+        try:
+            while pending or running or main_queue:
+                if budget is not None and time.perf_counter() - started > budget and (pending or main_queue):
+                    deferred = list(pending) + [stage.name for stage, _ in main_queue]
+                    print(f"Time budget of {budget:.0f} s used, deferring {len(deferred)} stage(s) to the next run.")
+                    self.status.update({name: 'deferred' for name in deferred})
+                    pending.clear()
+                    main_queue.clear()
+                    continue
+                for name in list(pending):
+                    stage = pending[name]
+                    states = [self.status.get(dep) for dep in stage.after]
+                    if any(state in ('failed', 'blocked') for state in states):
+                        self.status[name] = 'blocked'
+                        print(f"Stage {name} not run: a stage it depends on failed.")
+                        del pending[name]
+                    elif all(state in ('ran', 'skipped') for state in states):
+                        del pending[name]
+                        inputs = self.fingerprint(stage.inputs, stage.params)
+                        if self.is_up_to_date(stage, inputs):
+                            self.status[name] = 'skipped'
+                            print(f"Stage {name} is up to date, skipped.")
+                        elif stage.where == "main":
+                            main_queue.append((stage, inputs))
+                        else:
+                            print(f"Stage {name} started.")
+                            running[self._start(stage, executors)] = (stage, inputs)
+                if main_queue:
+                    # Main-thread stages run while the pool works on the others
+                    stage, inputs = main_queue.pop(0)
+                    print(f"Stage {stage.name} started.")
+                    kwargs = dict(stage.kwargs, **{key: self.results.get(dep) for key, dep in stage.feed.items()})
+                    self._finish(stage, inputs, lambda: stage.func(**kwargs))
+                    continue
+                if running:
+                    done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        stage, inputs = running.pop(future)
+                        self._finish(stage, inputs, future.result)
+        finally:
+            for executor in executors.values():
+                executor.shutdown(wait=True)
+
+        if on_finish is not None:
+            on_finish()
+        for name, record in self.state['stages'].items():
+            if self.status.get(name) == 'ran':
+                record['outputs'] = self.fingerprint(self.stages[name].outputs)
+        self.state['hashes'] = {path: entry for path, entry in self.state['hashes'].items() if os.path.exists(path)}
+        self._save_state()
+        counts = {state: list(self.status.values()).count(state)
+                  for state in ('ran', 'skipped', 'failed', 'blocked', 'deferred')}
+        print(f"Pipeline stages: {', '.join(f'{count} {state}' for state, count in counts.items() if count)} "
+              f"in {time.perf_counter() - started:.1f} s.")
+        return dict(self.status)
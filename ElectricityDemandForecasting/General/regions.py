@@ -0,0 +1,39 @@
+##
+# @file regions.py
+# @brief Region configuration for the forecasting pipeline.
+#
+# The pipeline can process several NEM regions in one run. Regions are read from the
+# REGIONS variable (comma-separated) of the project .env file, falling back to the
+# single REGION variable. The stage runner (General/pipeline.py) fans the stages of the
+# regions out: I/O bound stages (download, combine, resample) over threads, CPU bound
+# SARIMA fits over a process pool.
+##
+
+import os
+from dotenv import load_dotenv
+
+## @brief All regions of the National Electricity Market.
+NEM_REGIONS = ("NSW1", "QLD1", "VIC1", "SA1", "TAS1")
+
+## @brief Location of the shared pipeline configuration file.
+ENV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        "CodeDataPreparation", ".env")
+
+
+##
+# @brief Returns the list of regions the pipeline should process.
+#
+# @param value Optional comma-separated region list; defaults to REGIONS, then REGION.
+# @return List of upper-case region codes, without duplicates, in the given order.
+def get_regions(value=None):
+    load_dotenv(ENV_PATH)
+    value = value or os.getenv('REGIONS') or os.getenv('REGION', 'NSW1')
+    regions = []
+    for region in value.split(','):
+        region = region.strip().upper()
+        if region and region not in regions:
+            if region not in NEM_REGIONS:
+                print(f"Warning: '{region}' is not a known NEM region {NEM_REGIONS}.")
+            regions.append(region)
+    return regions
+
@@ -20,26 +20,79 @@
 # @brief Installs required Python packages from a requirements.txt file.
 #
 # This script ensures all necessary dependencies are installed automatically before the
-# forecasting application is executed. It reads the `requirements.txt` file and uses
-# `pip` to install packages.
+# forecasting application is executed. It reads the `requirements.txt` file and checks
+# the installed distributions through importlib.metadata, which only reads package
+# metadata and takes milliseconds. `pip` is started only for the requirements that are
+# missing or do not satisfy their version specifier.
 
 import subprocess  # Used to run shell commands
 import sys         # Provides access to Python runtime
 import os          # Handles file system operations
+import re          # Splits requirement lines into name and version specifier
+from importlib import metadata
+
+## @brief Default requirements file, next to this script.
+REQUIREMENTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "requirements.txt")
+
+##
+# @brief Tells whether an installed version satisfies a version specifier.
+#
+# Uses `packaging` when available (it ships with pip and most installs); otherwise
+# any installed version is accepted.
+#
+# @param version Installed version string.
+# @param specifier Specifier such as ">=2.0,<3" (empty for any version).
+# @return True if the version is acceptable.
+def _satisfies(version, specifier):
+    if not specifier:
+        return True
+    try:
+        from packaging.specifiers import SpecifierSet
+    except ImportError:
+        return True
+    return SpecifierSet(specifier).contains(version, prereleases=True)
 
 ##
-# @brief Installs Python packages listed in a given requirements file.
+# @brief Lists the requirements of a file that are not installed or have the wrong version.
 #
-# @param file_path Path to the requirements file (default is "requirements.txt").
+# @param file_path Path to the requirements file.
+# @return List of requirement lines to install (empty when everything is satisfied).
+def missing_requirements(file_path=REQUIREMENTS_PATH):
+    missing = []
+    with open(file_path, encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if not line or line.startswith('-'):
+                continue
+            match = re.match(r"([A-Za-z0-9._-]+)(\[[^\]]*\])?\s*([^;]*)", line)
+            name, specifier = match.group(1), match.group(3).strip()
+            try:
+                installed = metadata.version(name)
+            except metadata.PackageNotFoundError:
+                missing.append(line)
+                continue
+            if not _satisfies(installed, specifier):
+                missing.append(line)
+    return missing
+
+##
+# @brief Installs the Python packages of a requirements file that are missing.
+#
+# @param file_path Path to the requirements file (default is the requirements.txt next to this script).
 # @return None. Prints status messages during installation.
-def install_requirements(file_path="General/requirements.txt"):
+def install_requirements(file_path=REQUIREMENTS_PATH):
     if not os.path.exists(file_path):
         print(f"❌ File not found: {file_path}")
         return
 
-    print(f"📦 Installing packages from {file_path}...\n")
+    missing = missing_requirements(file_path)
+    if not missing:
+        print("✅ All required packages are already installed.")
+        return
+
+    print(f"📦 Installing missing packages from {file_path}: {', '.join(missing)}\n")
     try:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "-r", file_path])
+        subprocess.check_call([sys.executable, "-m", "pip", "install", *missing])
         print("\n✅ All required packages installed successfully.")
     except subprocess.CalledProcessError as e:
         print("\n❌ Error occurred during installation.")
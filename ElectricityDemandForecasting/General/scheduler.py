@@ -0,0 +1,187 @@
+##
+# @file scheduler.py
+# @brief Daemon mode: refreshes the data every few minutes and the forecasts every hour.
+#
+# AEMO publishes a new dispatch interval every 5 minutes. Instead of re-running the
+# whole batch, the scheduler wakes on a fixed cadence (SCHEDULE_EVERY, default 5m) and
+# runs the pipeline stages as one tick:
+#
+# - only the recent months (SCHEDULE_MONTHS, default 2: the previous and the current
+#   month) are requested; closed months are skipped and the open month is revalidated
+#   with a conditional request, so only new data is transferred;
+# - the combine stage replaces only the changed month partitions of the store, and the
+#   stages whose inputs did not change are skipped (General/pipeline.py);
+# - the forecast stages run at most every SCHEDULE_FORECAST_EVERY (default 1h), with
+#   MODEL_UPDATE=1 (set for the tick only, like the month window), so new hours are filtered with the saved model and a full refit only
+#   happens on the refit schedule or on drift; the forecast files are republished and
+#   the forecast service picks up the new hourly data by itself;
+# - a tick has a time budget (SCHEDULE_TICK_BUDGET, default 4m): stages not started
+#   within it are deferred to the next tick.
+#
+# Ticks never overlap: they run one after the other, a tick that takes longer than the
+# cadence makes the scheduler skip the missed ticks instead of queueing them, and the
+# pipeline lock keeps a tick from starting while another run (a second daemon or a
+# manual batch) works on the store.
+#
+#   python MainStart.py --daemon --every 5m
+#
+# CodeDataPreparation/LocalSource.py replays recorded files as a local stand-in for the
+# AEMO portal, to run the daemon without the network.
+##
+
+import os
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+from dotenv import load_dotenv
+from General.regions import ENV_PATH
+from General.batch import parse_interval
+from General.pipeline import StageRunner, PipelineLock, STATE_PATH, LOCK_PATH
+from CodeDataPreparation.CsvExport import wait_for_exports
+
+## @brief Default schedule: data cadence, forecast cadence and tick budget in seconds, months per tick.
+DEFAULT_SCHEDULE = {'every': 300, 'forecast_every': 3600, 'budget': 240, 'months': 2}
+
+
+##
+# @brief Returns the configured schedule.
+# @return Dictionary with 'every', 'forecast_every' and 'budget' in seconds and 'months'.
+def get_schedule():
+    load_dotenv(ENV_PATH)
+    return {'every': parse_interval(os.getenv('SCHEDULE_EVERY', DEFAULT_SCHEDULE['every'])),
+            'forecast_every': parse_interval(os.getenv('SCHEDULE_FORECAST_EVERY', DEFAULT_SCHEDULE['forecast_every'])),
+            'budget': parse_interval(os.getenv('SCHEDULE_TICK_BUDGET', DEFAULT_SCHEDULE['budget'])),
+            'months': max(1, int(os.getenv('SCHEDULE_MONTHS', DEFAULT_SCHEDULE['months'])))}
+
+
+##
+# @brief Returns the first and last month of the recent months requested by a tick.
+# @param months Number of months, ending with the current month.
+# @param now Current time.
+# @return Tuple (start, end) in YYYYMM format.
+def month_window(months, now):
+    return (now - relativedelta(months=months - 1)).strftime("%Y%m"), now.strftime("%Y%m")
+
+
+##
+# @brief Sets environment variables for the duration of a block and restores them afterwards.
+#
+# The stages read their settings from the environment, and worker processes inherit it,
+# so a tick's settings are applied this way without leaking into the rest of the process.
+#
+# @param values Dictionary name -> value.
+@contextmanager
+def scoped_environ(values):
+    saved = {name: os.environ.get(name) for name in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+##
+# @class Scheduler
+# @brief Runs the pipeline stages of the configured regions on a fixed cadence.
+class Scheduler:
+    ##
+    # @param build_stages Callable build_stages(regions, forecast_steps) returning the stages.
+    # @param regions List of region codes.
+    # @param forecast_steps Forecast horizon in hours.
+    # @param schedule Optional schedule dictionary (defaults to get_schedule()).
+    # @param clock Callable returning the current time as a naive datetime (market time).
+    # @param state_path Fingerprint file of the stage runner.
+    # @param lock_path Lock file shared with the other pipeline runs.
+    def __init__(self, build_stages, regions, forecast_steps, schedule=None, clock=datetime.now,
+                 state_path=STATE_PATH, lock_path=LOCK_PATH):
+        self.build_stages = build_stages
+        self.regions = regions
+        self.forecast_steps = forecast_steps
+        self.schedule = schedule or get_schedule()
+        self.clock = clock
+        self.state_path = state_path
+        self.lock_path = lock_path
+        self.last_forecast = None
+
+    ##
+    # @brief Runs one tick: pulls the recent months and refreshes what changed.
+    #
+    # During the tick, the month window replaces START_MONTH/END_MONTH, models are updated
+    # incrementally (MODEL_UPDATE=1) and, unless COMBINE_MONTHS is configured, every
+    # downloaded month is combined (not only those of its default year). The previous
+    # values are restored when the tick ends.
+    #
+    # @return Status dictionary of the stage runner, or None if another run holds the lock.
+    def tick(self):
+        load_dotenv(ENV_PATH)
+        now = self.clock()
+        start, end = month_window(self.schedule['months'], now)
+        settings = {'START_MONTH': start, 'END_MONTH': end, 'MODE': 'H', 'MODEL_UPDATE': '1',
+                    'COMBINE_MONTHS': os.environ.get('COMBINE_MONTHS', '')}
+        with scoped_environ(settings):
+            return self._run_tick(now, start, end)
+
+    ##
+    # @brief Runs the stages of a tick with its settings applied.
+    def _run_tick(self, now, start, end):
+        forecast_due = (self.last_forecast is None
+                        or (now - self.last_forecast).total_seconds() >= self.schedule['forecast_every'])
+        stages = [stage for stage in self.build_stages(self.regions, self.forecast_steps)
+                  if forecast_due or not stage.name.startswith("forecast:")]
+
+        lock = PipelineLock(self.lock_path)
+        if not lock.acquire():
+            print(f"Tick at {now:%Y-%m-%d %H:%M:%S} skipped: another pipeline run holds {self.lock_path}.")
+            return None
+        try:
+            print(f"Tick at {now:%Y-%m-%d %H:%M:%S}: months {start}-{end}"
+                  f"{', forecasts due' if forecast_due else ''}.")
+            status = StageRunner(stages, self.state_path).run(on_finish=wait_for_exports,
+                                                              budget=self.schedule['budget'])
+        finally:
+            lock.release()
+        forecasts = [state for name, state in status.items() if name.startswith("forecast:")]
+        if forecast_due and forecasts and all(state in ('ran', 'skipped') for state in forecasts):
+            self.last_forecast = now
+        return status
+
+    ##
+    # @brief Runs ticks on the cadence until interrupted.
+    #
+    # The next tick starts one cadence after the previous one started. When a tick takes
+    # longer than the cadence, the missed ticks are skipped, not run back to back.
+    #
+    # @param ticks Optional number of ticks after which to stop.
+    # @param sleep Callable used to wait between ticks.
+    # @return Number of ticks run.
+    def run(self, ticks=None, sleep=time.sleep):
+        every = self.schedule['every']
+        print(f"Scheduler started: data every {every} s, forecasts every {self.schedule['forecast_every']} s, "
+              f"tick budget {self.schedule['budget']} s, regions {', '.join(self.regions)}.")
+        count = 0
+        try:
+            while ticks is None or count < ticks:
+                started = time.monotonic()
+                try:
+                    self.tick()
+                except Exception:
+                    # A failed tick is retried on the next one; the daemon keeps running
+                    print("ERROR: Scheduled tick failed.")
+                    traceback.print_exc()
+                count += 1
+                if ticks is not None and count >= ticks:
+                    break
+                elapsed = time.monotonic() - started
+                if elapsed >= every:
+                    print(f"Tick took {elapsed:.0f} s, longer than the {every} s cadence; "
+                          f"{int(elapsed // every)} tick(s) skipped.")
+                sleep(every - elapsed % every)
+        except KeyboardInterrupt:
+            print("Scheduler stopped.")
+        return count
@@ -0,0 +1,39 @@
+##
+# @file startup.py
+# @brief Cold-start time of the pipeline: printed and appended to a CSV log.
+#
+# The pipeline records how long the module imports and the requirement check take
+# before the first stage starts. Each run appends one row to logs/startup_log.csv
+# (LOG_FOLDER), so changes in cold-start latency can be tracked over time.
+##
+
+import os
+import csv
+from datetime import datetime
+from dotenv import load_dotenv
+from General.regions import ENV_PATH
+
+## @brief CSV log of the startup times, one row per run.
+STARTUP_LOG = "startup_log.csv"
+
+
+##
+# @brief Prints the startup times and appends them to the startup log.
+# @param timings Dictionary of named durations in seconds, e.g. {'imports': 0.4, 'total': 0.5}.
+# @param folder Folder of the log (defaults to LOG_FOLDER or ./logs/).
+# @return Path of the log file.
+def log_startup(timings, folder=None):
+    load_dotenv(ENV_PATH)
+    folder = folder or os.getenv('LOG_FOLDER', './logs/')
+    print("Startup: " + ", ".join(f"{name} {seconds:.2f} s" for name, seconds in timings.items()))
+    row = {'timestamp': datetime.now().isoformat(timespec='seconds'),
+           **{f"{name}_s": round(seconds, 4) for name, seconds in timings.items()}}
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, STARTUP_LOG)
+    new_file = not os.path.exists(path)
+    with open(path, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(row))
+        if new_file:
+            writer.writeheader()
+        writer.writerow(row)
+    return path
@@ -14,40 +14,181 @@
 # @author Fedor, Sudhanshu
 # @date 2025-04-20
 ##
+import os
+import time
+
+## @brief Start of the script, for the cold-start measurement.
+STARTED = time.perf_counter()
+
 from General.requirements import install_requirements
 # === Data Acquisition ===
 
 ## @brief Downloads electricity demand data via AEMO API.
 from CodeDataPreparation.DataDownload import download_energy_data  # ← NEW LINE
 
-# === Data Merging ===
+# === Data Merging, Cleaning and Forecasting ===
+# The stage modules load pandas, pyarrow and statsmodels; they are imported by the stage
+# functions below, and the stages are declared with the paths of General/layout.py.
+
+## @brief Inputs and outputs of the stages: raw files, store folders, exports and model files.
+from General.layout import (raw_pattern, combined_folder, region_folder, rollup_dataset, hourly_path,
+                            best_order_path, forecast_plot_path, forecast_excel_path)
 
-## @brief Combines multiple raw CSV files into a unified DataFrame.
-from CodeDataPreparation.DataCombine import combine_data
+## @brief Writes the CSV exports synchronously, in the background or not at all (CSV_EXPORT).
+from CodeDataPreparation.CsvExport import wait_for_exports, get_export_mode
 
-# === Data Cleaning ===
+# === Regions ===
 
-## @brief Filters combined data to include valid hourly entries only.
-from CodeDataPreparation.DataFilterHour import filter_data_by_hour
+## @brief Resolves the configured regions.
+from General.regions import get_regions
 
-# === Forecasting ===
+## @brief Runs the stages in dependency order and skips the ones whose inputs and outputs are unchanged.
+from General.pipeline import Stage, StageRunner, PipelineLock, env_params
 
-## @brief Runs SARIMA-based forecasting on filtered data.
-from CodeTimeForecast.Sarimamodel5 import run_sarima_forecast
+## @brief Daemon mode: refreshes the data and the forecasts on a schedule.
+from General.scheduler import Scheduler
+
+## @brief Reports the memory footprint after each stage.
+from General.memory import memory_report
+
+## @brief Command line options and the headless (non-interactive) batch mode.
+from General.batch import parse_args, configure, get_horizon
 
 # === Visualization ===
 
 ## @brief Plots historical electricity demand for December as a reference.
-from CodeDataVisualisation.demand_dec import plot_december_demand
+from CodeDataVisualisation.demand_dec import plot_december_demand, december_plot_path, december_csv_path
+
+## @brief Records the cold-start time of each run.
+from General.startup import log_startup
+
+## @brief End of the module imports (pandas, pyarrow, statsmodels and matplotlib are imported later, by their stages).
+IMPORTED = time.perf_counter()
+
 ## \file MainStart.py
 #  \brief Main entry point for the Power Demand Forecasting pipeline.
 #
 #  This script executes the full forecasting process including data
 #  acquisition, preprocessing, visualization, and prediction using SARIMA.
 
-def main():
+##
+# @brief Settings that change what the forecast stage writes.
+FORECAST_SETTINGS = ('MODEL_MODE', 'FOURIER_HARMONICS', 'MODEL_UPDATE', 'MODEL_REFIT_HOURS', 'MODEL_DRIFT_RATIO',
+                     'FORECAST_SIMULATIONS', 'FORECAST_QUANTILES', 'PEAK_THRESHOLDS_MW', 'FORECAST_PRECOMPUTE')
+
+
+##
+# @brief Combine stage: merges the changed monthly files into the columnar store.
+#
+# With STREAM_RESAMPLE=1 only the row count of the replaced months is kept by the
+# runner, so no 5-minute frame outlives the stage; the rollups and the hourly filter
+# stream the history from the store month by month.
+#
+# @return DataFrame of the replaced months, their row count in streaming mode, or None if an error occurs.
+def combine_stage(region):
+    from CodeDataPreparation.DataCombine import combine_data
+    from CodeDataPreparation.StreamResample import is_streaming_mode
+    combined = combine_data(region)
+    if combined is not None and is_streaming_mode():
+        return len(combined)
+    return combined
+
+
+##
+# @brief Rollup stage: 30-minute to monthly aggregates of the replaced months for the views.
+# @param df Result of the combine stage, or None if it was skipped.
+# @return Dictionary of rollup frames, or None if an error occurs.
+def rollups_stage(region, df=None):
+    from CodeDataPreparation.DataRollup import build_rollups
+    return build_rollups(region, df)
+
+
+##
+# @brief December view of the rollup stage's half-hourly frame (or of the stored rollup).
+# @return Path of the plot.
+def plot_december_stage(region, rollups=None):
+    return plot_december_demand(region, rollups['30min'] if rollups else None)
+
+
+##
+# @brief Hourly filter of the months handed over by the combine stage.
+#
+# Only the replaced months are resampled; the hours of the other months come from the
+# hourly store. The combined history is read from the store only when the combine stage
+# was skipped as unchanged (or replaced nothing) and the hourly outputs must be rebuilt.
+#
+# @param combined Result of the combine stage: replaced months, row count, or None if skipped.
+# @return Hourly DataFrame, row count of the streaming filter, or None if an error occurs.
+def filter_stage(region, combined=None):
+    from CodeDataPreparation.DataCombine import load_combined
+    from CodeDataPreparation.DataFilterHour import filter_data_by_hour, filter_data_by_hour_streaming
+    from CodeDataPreparation.StreamResample import is_streaming_mode
+    if is_streaming_mode():
+        # STREAM_RESAMPLE=1: resample the stored history month by month in bounded memory
+        return filter_data_by_hour_streaming(region)
+    if combined is None or combined.empty:
+        combined = load_combined(region)
+    return filter_data_by_hour(combined, region)
+
+
+##
+# @brief Forecast stage: SARIMA forecast of the hourly frame handed over by the filter stage.
+# @param df Result of the filter stage, or None if it was skipped.
+# @return Path of the Excel forecast, or None if an error occurs.
+def forecast_stage(region, forecast_steps, show_plot, df=None):
+    from CodeTimeForecast.Sarimamodel5 import run_sarima_forecast
+    return run_sarima_forecast(df, region=region, forecast_steps=forecast_steps, show_plot=show_plot)
+
+
+##
+# @brief Declares the pipeline stages of the given regions.
+#
+# Each region gets its own chain combine -> rollups -> December view and
+# combine -> hourly filter -> forecast, so the view and the filter (and the chains of
+# different regions) run concurrently. Plots with a window run on the main thread; the
+# SARIMA fits of several regions run in worker processes.
+#
+# @param regions List of region codes.
+# @param forecast_steps Forecast horizon in hours.
+# @return List of Stage objects.
+def build_stages(regions, forecast_steps):
+    exports = get_export_mode() != 'off'
+
+    def csv(path):
+        # CSV exports are only outputs when they are written (CSV_EXPORT != off)
+        return [path] if exports else []
+
+    single = len(regions) == 1
+    stages = [Stage("download", download_energy_data, {'regions': regions}, always=True)]
+    for region in regions:
+        combined = region_folder("combined", region)
+        hourly = region_folder("hourly", region)
+        stages += [
+            Stage(f"combine:{region}", combine_stage, {'region': region}, after=["download"],
+                  inputs=[raw_pattern(region)],
+                  outputs=[combined] + csv(combined_folder(region)), params={'csv': exports}),
+            Stage(f"rollups:{region}", rollups_stage, {'region': region}, feed={'df': f"combine:{region}"},
+                  inputs=[combined], outputs=[region_folder(rollup_dataset('*'), region)]),
+            Stage(f"december:{region}", plot_december_stage, {'region': region}, feed={'rollups': f"rollups:{region}"},
+                  inputs=[os.path.join(region_folder(rollup_dataset('30min'), region), "month=*-12")],
+                  outputs=[december_plot_path(region)] + csv(december_csv_path(region)),
+                  params={'csv': exports}, where="main"),
+            Stage(f"filter:{region}", filter_stage, {'region': region}, feed={'combined': f"combine:{region}"},
+                  inputs=[combined], outputs=[hourly] + csv(hourly_path(region)), params={'csv': exports}),
+            # One region shows its plot window from the main thread; several are fitted in parallel processes
+            Stage(f"forecast:{region}", forecast_stage,
+                  {'region': region, 'forecast_steps': forecast_steps, 'show_plot': single},
+                  feed={'df': f"filter:{region}"}, inputs=[hourly, best_order_path(region)],
+                  outputs=[forecast_plot_path(region), forecast_excel_path(region)],
+                  params={'horizon': forecast_steps, **env_params(*FORECAST_SETTINGS)},
+                  where="main" if single else "process"),
+        ]
+    return stages
+
+
+def main(argv=None):
     """
-    @brief Executes the forecasting pipeline in sequential steps.
+    @brief Executes the forecasting pipeline as a graph of stages.
 
     This function coordinates the entire process:
     - Downloading data from the AEMO portal
@@ -55,33 +196,69 @@ def main():
     - Visualizing historical demand
     - Filtering the time series
     - Running SARIMA forecasting
+
+    Every configured region (REGIONS / REGION in .env) goes through the pipeline.
+    Each stage declares the files it reads and writes (see build_stages); a stage whose
+    inputs and settings are unchanged since its last successful run, and whose outputs
+    are still intact, is skipped (--force or PIPELINE_CACHE=0 runs everything). The
+    December view and the hourly filter, and the stages of different regions, run
+    concurrently, and the SARIMA fits of several regions run in worker processes. Each
+    stage receives the frames of the previous stage in memory, or reads them from the
+    columnar store when that stage was skipped; the combine stage only replaces the
+    changed months, and the rollups and the hourly filter only recompute those months.
+    The CSV exports follow CSV_EXPORT.
+
+    With --headless (or HEADLESS=1, or no display on Linux) nothing waits for a user:
+    the horizon comes from --horizon / FORECAST_HORIZON and plots are only written to
+    files with the Agg backend. --regions and --output-dir override REGIONS and OUTPUT_DIR.
+
+    With --daemon the pipeline keeps running headless: every SCHEDULE_EVERY (or --every)
+    it pulls the recent months, refreshes what changed and republishes the forecasts at
+    most every SCHEDULE_FORECAST_EVERY (see General/scheduler.py).
+
+    @param argv Command line arguments (defaults to sys.argv[1:]).
+    @return Dictionary stage name -> "ran", "skipped", "failed", "blocked" or "deferred";
+            None if another run holds the pipeline lock, or after daemon mode.
     """
+    args = parse_args(argv)
+    headless = configure(args)
 
     print(" Libraries updates...Wait till complete")
-    # @step Downloads the last 12 months of demand data from the AEMO API.
+    # @step Checks the installed packages; pip only runs when a requirement is missing.
+    checked = time.perf_counter()
     install_requirements()
+    log_startup({'imports': IMPORTED - STARTED, 'requirements': time.perf_counter() - checked,
+                 'total': time.perf_counter() - STARTED})
 
-    print("Step 0: Downloading data...")
-    # @step Downloads the last 12 months of demand data from the AEMO API.
-    download_energy_data()
-
-    print("Step 1: Combining data...")
-    # @step Merges all downloaded datasets into a single DataFrame.
-    combined_data = combine_data()
-
-    print("Step 2: Previous month data ...")
-    # @step Displays a graph of electricity demand for the previous month (December).
-    plot_december_demand()
+    regions = get_regions()
+    print(f"Regions: {', '.join(regions)}")
 
-    print("Step 3: Filtering data...")
-    # @step Filters out zero or irrelevant hourly entries from the combined dataset.
-    filtered_data = filter_data_by_hour(combined_data)
+    # @step The horizon is asked once up front (or read from the options when headless),
+    # since it is part of the forecast stages' fingerprints.
+    if headless:
+        forecast_steps = get_horizon()
+    else:
+        from CodeTimeForecast.Sarimamodel5 import get_forecast_steps
+        forecast_steps = get_forecast_steps()
 
-    print("Step 4: Running SARIMA model...")
-    # @step Applies a seasonal SARIMA model to generate a forecast based on user-defined horizon.
-    run_sarima_forecast(filtered_data)
+    if args.daemon:
+        # @step Runs the stages on the schedule until interrupted.
+        Scheduler(build_stages, regions, forecast_steps).run()
+        return None
 
+    # @step Downloads, combines, rolls up, plots, filters and forecasts every region,
+    # skipping the stages that are up to date; CSV exports still in the background are
+    # awaited before the output fingerprints are recorded.
+    runner = StageRunner(build_stages(regions, forecast_steps))
+    with PipelineLock() as locked:
+        if not locked:
+            print("ERROR: Another pipeline run (e.g. the scheduler) is working on the store; try again later.")
+            return None
+        status = runner.run(on_finish=wait_for_exports)
+    memory_report("combine (replaced months)", {region: runner.results.get(f"combine:{region}") for region in regions})
+    memory_report("hourly filter", {region: runner.results.get(f"filter:{region}") for region in regions})
     print("Pipeline complete.")
+    return status
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
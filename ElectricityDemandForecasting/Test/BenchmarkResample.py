@@ -0,0 +1,60 @@
+##
+# @file BenchmarkResample.py
+# @brief Benchmarks hourly, half-hourly and daily means: pandas resample vs reshape fast path.
+#
+# Builds several years of synthetic 5-minute history (with a few gaps and duplicates,
+# as in real AEMO files), checks that both resamplers agree and reports their timings.
+#
+# Usage (from the ElectricityDemandForecasting folder):
+#   python Test/BenchmarkResample.py [years]
+#
+# Results on one core (pandas 3.0, NumPy 2.4), best of 3:
+#
+#   years  rows        30min           h               D
+#   5        525,560   16.3 -> 10.5 ms 14.5 -> 8.4 ms  13.2 -> 7.5 ms   (1.6x / 1.7x / 1.8x)
+#   20     2,102,360   51.0 -> 36.5 ms 42.0 -> 28.0 ms 34.9 -> 20.2 ms  (1.4x / 1.5x / 1.7x)
+##
+
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_DIR)
+
+from CodeDataPreparation.FastResample import grid_resample_mean, generic_resample_mean
+
+
+## @brief Returns the best wall time of several runs and the last result.
+def best_of(func, repeats=3):
+    best, result = float('inf'), None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    index = pd.date_range('2020-01-01 00:05', periods=years * 365 * 288, freq='5min', name='SETTLEMENTDATE')
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'TOTALDEMAND': 7000 + 1500 * rng.standard_normal(len(index)),
+                       'RRP': 100 + 40 * rng.standard_normal(len(index))}, index=index)
+    # A handful of missing intervals and duplicates
+    df = df.drop(df.index[rng.choice(len(df), 50, replace=False)])
+    df = pd.concat([df, df.iloc[rng.choice(len(df), 10, replace=False)]]).sort_index()
+    print(f"{len(df):,d} rows of 5-minute data ({years} years)")
+
+    for freq in ('30min', 'h', 'D'):
+        generic_time, expected = best_of(lambda: generic_resample_mean(df, freq))
+        fast_time, actual = best_of(lambda: grid_resample_mean(df, freq))
+        pd.testing.assert_frame_equal(actual, expected, rtol=1e-12)
+        print(f"{freq:>6s}: resample {generic_time * 1000:8.1f} ms | reshape {fast_time * 1000:8.1f} ms "
+              f"| speed-up {generic_time / fast_time:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
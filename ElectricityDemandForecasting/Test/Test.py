@@ -1,6 +1,13 @@
 import unittest
 import os
 import sys
+import tempfile
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from datetime import datetime, timedelta
+from dateutil.relativedelta import relativedelta
 
 # ==============================================================================
 ## @file Test.py
@@ -14,21 +21,101 @@ CURRENT_DIR = os.path.dirname(__file__)
 ROOT_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
 sys.path.insert(0, ROOT_DIR)
 
+# Stages write their CSV exports before returning, so a test can read them and remove its folder
+os.environ.setdefault('CSV_EXPORT', 'sync')
+
 # ------------------------------------------------------------------------------
 ## @brief Try importing the required modules.
 #  @warning Exits if modules are not found. Ensure directory names and cases match.
 # ------------------------------------------------------------------------------
 try:
     from CodeDataPreparation.DataDownload import download_energy_data
-    from CodeDataPreparation import DataCombine, DataFilterHour
+    from CodeDataPreparation import DataCombine, DataFilterHour, DataStore
+    from CodeDataPreparation.AemoReader import read_aemo_csv
+    from CodeDataPreparation.DataCompact import compact_frame
+    from CodeDataPreparation.FastResample import grid_resample_mean, generic_resample_mean, MAX_RUNS
+    from CodeDataPreparation.StreamResample import stream_resample_mean
+    from CodeDataPreparation import DataRollup
+    from CodeDataPreparation.CsvExport import export_csv, wait_for_exports
     from CodeDataVisualisation import demand_dec
     from CodeTimeForecast import Sarimamodel5
+    from CodeTimeForecast.SarimaFit import fit_sarima
+    from CodeTimeForecast.ModelCache import ModelCache
+    from CodeTimeForecast.ModelUpdate import update_sarima
+    from CodeTimeForecast import OrderSearch
+    from CodeTimeForecast.FourierTerms import fourier_terms, horizon_index, get_harmonics, usable_harmonics
+    from CodeTimeForecast.ForecastSimulation import simulate_bands
+    from CodeTimeForecast import Backtest
+    from CodeTimeForecast.ForecastService import ForecastService, create_server
+    from CodeTimeForecast import ForecastBundle
+    from General.regions import get_regions
+    from General import batch
+    from General import requirements
 except ModuleNotFoundError as e:
     print(f"[IMPORT ERROR] {e}")
     print(" Make sure your folder names are correct and capitalized: e.g., 'CodeDataPreparation', not 'codedatapreparation'.")
     print(" Check that you're running the script from within the 'Test' directory.")
     sys.exit(1)
 
+# ---------------------------- TEST HELPERS ----------------------------
+
+## @class LocalAemoServer
+#  @brief Serves in-memory CSV files over HTTP on localhost, standing in for the AEMO portal.
+class LocalAemoServer:
+    def __init__(self, files):
+        self.files = dict(files)
+        self.requests = []
+        self.truncate = set()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                name = self.path.rsplit('/', 1)[-1]
+                server.requests.append((name, dict(self.headers)))
+                body = server.files.get(name)
+                if body is None:
+                    self.send_error(404)
+                    return
+                etag = '"%s"' % hashlib.md5(body).hexdigest()
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                status, start = 200, 0
+                byte_range = self.headers.get('Range')
+                if byte_range and self.headers.get('If-Range') in (None, etag):
+                    status, start = 206, int(byte_range.split('=')[1].rstrip('-'))
+                self.send_response(status)
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', 'Mon, 01 Jan 2024 00:00:00 GMT')
+                self.send_header('Content-Length', str(len(body) - start))
+                if status == 206:
+                    self.send_header('Content-Range', f"bytes {start}-{len(body) - 1}/{len(body)}")
+                self.end_headers()
+                # Simulates a dropped connection by sending only part of the announced body
+                end = start + (len(body) - start) // 2 if name in server.truncate else len(body)
+                self.wfile.write(body[start:end])
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}/"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+## @brief Builds a small AEMO-format CSV body for one month.
+def make_month_csv(year_month, region='NSW1', rows=24):
+    lines = ["REGION,SETTLEMENTDATE,TOTALDEMAND,RRP,PERIODTYPE"]
+    start = datetime.strptime(year_month, "%Y%m")
+    for i in range(1, rows + 1):
+        stamp = (start + timedelta(minutes=5 * i)).strftime("%Y/%m/%d %H:%M:%S")
+        lines.append(f"{region},{stamp},{7000 + i:.2f},{100 + i / 10:.2f},TRADE")
+    return ("\n".join(lines) + "\n").encode()
+
 # ---------------------------- TEST CLASSES ----------------------------
 
 ## @class TestSystemFunctions
@@ -46,6 +133,76 @@ class TestSystemFunctions(unittest.TestCase):
             print(" Check your .env file for missing variables like BASE_URL, REGION, START_MONTH.")
             self.fail(f"Exception: {e}")
 
+    ## @brief Tests concurrent downloads of several months against a local server.
+    def test_concurrent_download(self):
+        """System Function: Concurrent Data Download"""
+        months = ['202401', '202402', '202403', '202404']
+        server = LocalAemoServer({f"PRICE_AND_DEMAND_{m}_NSW1.csv": make_month_csv(m) for m in months})
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                env = {'REGION': 'NSW1', 'START_MONTH': months[0], 'END_MONTH': months[-1], 'MODE': 'H',
+                       'BASE_URL': server.base_url, 'DOWNLOAD_FOLDER': tmp, 'LOG_FOLDER': tmp,
+                       'DOWNLOAD_WORKERS': '3'}
+                with mock.patch.dict(os.environ, env):
+                    paths = download_energy_data()
+                self.assertEqual(len(paths), len(months))
+                for m in months:
+                    with open(os.path.join(tmp, f"PRICE_AND_DEMAND_{m}_NSW1.csv"), 'rb') as f:
+                        self.assertEqual(f.read(), make_month_csv(m))
+            print("[PASSED]  Concurrent download fetched every month.")
+        finally:
+            server.close()
+
+    ## @brief Tests that a warm manifest skips closed months and revalidates only the open month.
+    def test_incremental_download(self):
+        """System Function: Incremental Data Download"""
+        current = datetime.now().strftime("%Y%m")
+        months = [(datetime.now().replace(day=1) - relativedelta(months=n)).strftime("%Y%m") for n in (2, 1, 0)]
+        server = LocalAemoServer({f"PRICE_AND_DEMAND_{m}_NSW1.csv": make_month_csv(m) for m in months})
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                env = {'REGION': 'NSW1', 'START_MONTH': months[0], 'END_MONTH': months[-1], 'MODE': 'H',
+                       'BASE_URL': server.base_url, 'DOWNLOAD_FOLDER': tmp, 'LOG_FOLDER': tmp}
+                with mock.patch.dict(os.environ, env):
+                    download_energy_data()
+                    server.requests.clear()
+                    paths = download_energy_data()
+                self.assertEqual(len(paths), len(months))
+                self.assertEqual([name for name, _ in server.requests], [f"PRICE_AND_DEMAND_{current}_NSW1.csv"])
+                self.assertIn('If-None-Match', server.requests[0][1])
+            print("[PASSED]  Warm download issued a single conditional request.")
+        finally:
+            server.close()
+
+    ## @brief Tests that an interrupted transfer leaves no CSV behind and is resumed with Range.
+    def test_resumable_download(self):
+        """System Function: Resumable Data Download"""
+        name = "PRICE_AND_DEMAND_202401_NSW1.csv"
+        body = make_month_csv('202401', rows=500)
+        server = LocalAemoServer({name: body})
+        server.truncate.add(name)
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                env = {'REGION': 'NSW1', 'START_MONTH': '202401', 'END_MONTH': '202401', 'MODE': 'H',
+                       'BASE_URL': server.base_url, 'DOWNLOAD_FOLDER': tmp, 'LOG_FOLDER': tmp,
+                       'DOWNLOAD_RETRIES': '1'}
+                with mock.patch.dict(os.environ, env):
+                    self.assertEqual(download_energy_data(), [])
+                    self.assertFalse(os.path.exists(os.path.join(tmp, name)))
+                    partial = os.path.getsize(os.path.join(tmp, name + '.part'))
+                    self.assertGreater(partial, 0)
+
+                    server.truncate.clear()
+                    server.requests.clear()
+                    download_energy_data()
+                self.assertEqual(server.requests[0][1].get('Range'), f"bytes={partial}-")
+                with open(os.path.join(tmp, name), 'rb') as f:
+                    self.assertEqual(f.read(), body)
+                self.assertFalse(os.path.exists(os.path.join(tmp, name + '.part')))
+            print("[PASSED]  Interrupted download resumed with a Range request.")
+        finally:
+            server.close()
+
 ## @class TestParts
 #  @brief Placeholder tests for intermediate script functionality.
 class TestParts(unittest.TestCase):
@@ -71,6 +228,500 @@ class TestParts(unittest.TestCase):
             print(" Verify the DataFilterHour.py script for importable functions.")
             self.fail()
 
+    ## @brief Tests region list parsing and the per-region combine fan-out.
+    def test_region_fanout(self):
+        """Part: Multi-Region Fan-Out"""
+        from General.pipeline import Stage, StageRunner
+        self.assertEqual(get_regions(" nsw1, QLD1 ,nsw1,VIC1"), ['NSW1', 'QLD1', 'VIC1'])
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, 'DataSetOrigin'))
+            for region in ('NSW1', 'QLD1'):
+                for month in ('202410', '202411'):
+                    with open(os.path.join(tmp, 'DataSetOrigin', f"PRICE_AND_DEMAND_{month}_{region}.csv"), 'wb') as f:
+                        f.write(make_month_csv(month, region))
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            try:
+                # SA1 has no files: its combine stage fails without stopping the other regions
+                stages = [Stage(f"combine:{region}", DataCombine.combine_data, {'region': region})
+                          for region in ('NSW1', 'QLD1', 'SA1')]
+                runner = StageRunner(stages, os.path.join(tmp, 'state.json'))
+                status = runner.run()
+            finally:
+                os.chdir(cwd)
+        self.assertEqual(status, {'combine:NSW1': 'ran', 'combine:QLD1': 'ran', 'combine:SA1': 'failed'})
+        for region in ('NSW1', 'QLD1'):
+            combined = runner.results[f"combine:{region}"]
+            self.assertEqual(len(combined), 48)
+            self.assertEqual(set(combined['REGION']), {region})
+        print("[PASSED]  Regions combined independently in parallel.")
+
+    ## @brief Tests the columnar store round trip with projection and partition pruning.
+    def test_data_store(self):
+        """Part: Columnar Data Store"""
+        import pandas as pd
+        index = pd.date_range('2024-10-01 00:05', '2024-12-31 23:55', freq='5min', name='SETTLEMENTDATE')
+        df = pd.DataFrame({'REGION': 'NSW1', 'TOTALDEMAND': range(len(index)), 'RRP': 1.5}, index=index)
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual(DataStore.write_dataset(df, 'combined', 'NSW1', root=tmp),
+                             ['2024-10', '2024-11', '2024-12'])
+            december = DataStore.read_dataset('combined', 'NSW1', columns=['TOTALDEMAND'],
+                                              months=['2024-12'], root=tmp)
+            self.assertEqual(list(december.columns), ['TOTALDEMAND'])
+            self.assertTrue((december.index.month == 12).all())
+            pd.testing.assert_series_equal(december['TOTALDEMAND'], df.loc['2024-12', 'TOTALDEMAND'],
+                                           check_freq=False)
+            window = DataStore.read_dataset('combined', 'NSW1', start='2024-11-15', end='2024-11-16', root=tmp)
+            self.assertEqual(len(window), 288)
+            self.assertIsInstance(window.index, pd.DatetimeIndex)
+        print("[PASSED]  Data store round trip with pruning.")
+
+    ## @brief Tests that a second combine only parses the modified month and its neighbour.
+    def test_incremental_combine(self):
+        """Part: Incremental Data Combination"""
+        import pandas as pd
+        months = ['202410', '202411', '202412']
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, 'DataSetOrigin'))
+            for month in months:
+                with open(os.path.join(tmp, 'DataSetOrigin', f"PRICE_AND_DEMAND_{month}_NSW1.csv"), 'wb') as f:
+                    f.write(make_month_csv(month, rows=300))
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            try:
+                first = DataCombine.combine_data('NSW1')
+                with mock.patch.object(DataCombine, 'load_month_file', wraps=DataCombine.load_month_file) as loader:
+                    unchanged = DataCombine.combine_data('NSW1')
+                    self.assertEqual(loader.call_count, 0)
+
+                    with open(os.path.join('DataSetOrigin', 'PRICE_AND_DEMAND_202412_NSW1.csv'), 'wb') as f:
+                        f.write(make_month_csv('202412', rows=400))
+                    november = os.stat(DataCombine.combined_path('NSW1', '2024-11')).st_mtime_ns
+                    second = DataCombine.combine_data('NSW1')
+                    self.assertEqual(loader.call_count, 1)
+                # Only the replaced month is returned and re-exported; the store holds the whole history
+                self.assertEqual(os.stat(DataCombine.combined_path('NSW1', '2024-11')).st_mtime_ns, november)
+                self.assertEqual(len(pd.read_csv(DataCombine.combined_path('NSW1', '2024-12'))), 400)
+                history = DataCombine.load_combined('NSW1')
+            finally:
+                os.chdir(cwd)
+        self.assertEqual(len(first), 900)
+        self.assertEqual(len(unchanged), 0)
+        self.assertEqual(len(second), 400)
+        self.assertTrue(second['SETTLEMENTDATE'].is_monotonic_increasing)
+        self.assertEqual(len(history), 1000)
+        self.assertTrue(history['SETTLEMENTDATE'].is_monotonic_increasing)
+        print("[PASSED]  Combine re-parsed only the modified month.")
+
+    ## @brief Tests the typed AEMO reader, including the tolerant fallback for bad dates.
+    def test_typed_reader(self):
+        """Part: Typed AEMO Reader"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'PRICE_AND_DEMAND_202410_NSW1.csv')
+            with open(path, 'wb') as f:
+                f.write(make_month_csv('202410', rows=12))
+            df = read_aemo_csv(path)
+            self.assertEqual(str(df['SETTLEMENTDATE'].dtype).split('[')[0], 'datetime64')
+            self.assertEqual(str(df['REGION'].dtype), 'category')
+            self.assertEqual(df['SETTLEMENTDATE'].iloc[0], datetime(2024, 10, 1, 0, 5))
+
+            with open(path, 'ab') as f:
+                f.write(b"NSW1,not a date,1.0,2.0,TRADE\n")
+            df = read_aemo_csv(path)
+            self.assertEqual(len(df), 13)
+            self.assertEqual(int(df['SETTLEMENTDATE'].isnull().sum()), 1)
+        print("[PASSED]  Typed reader parsed the fixed AEMO schema.")
+
+    ## @brief Tests the compact layout: smaller footprint and identical hourly means.
+    def test_compact_mode(self):
+        """Part: Compact Memory Layout"""
+        import numpy as np
+        import pandas as pd
+        index = pd.date_range('2024-10-01 00:05', periods=5000, freq='5min')
+        rng = np.random.default_rng(1)
+        df = pd.DataFrame({'REGION': 'NSW1', 'SETTLEMENTDATE': index,
+                           'TOTALDEMAND': np.round(7000 + 900 * rng.random(len(index)), 2),
+                           'RRP': np.round(17000 * rng.random(len(index)) - 1000, 2), 'PERIODTYPE': 'TRADE'})
+        compact = compact_frame(df)
+        self.assertIsInstance(compact.index, pd.DatetimeIndex)
+        self.assertEqual(str(compact['TOTALDEMAND'].dtype), 'float32')
+        self.assertEqual(str(compact['REGION'].dtype), 'category')
+        self.assertLess(compact.memory_usage(deep=True).sum(), df.memory_usage(deep=True).sum() / 2)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            try:
+                reference = DataFilterHour.filter_data_by_hour(df.copy())
+                hourly = DataFilterHour.filter_data_by_hour(compact)
+            finally:
+                os.chdir(cwd)
+        np.testing.assert_allclose(hourly.to_numpy(), reference.to_numpy(), atol=0.005)
+        print("[PASSED]  Compact layout reduced memory with matching hourly means.")
+
+    ## @brief Tests that the reshape resampler matches pandas on regular and irregular data.
+    def test_fast_resample(self):
+        """Part: Reshape Resampler"""
+        import numpy as np
+        import pandas as pd
+        index = pd.date_range('2024-10-01 00:05', periods=6000, freq='5min', name='SETTLEMENTDATE')
+        rng = np.random.default_rng(2)
+        df = pd.DataFrame({'TOTALDEMAND': 7000 + 900 * rng.random(len(index)), 'RRP': 100 * rng.random(len(index))},
+                          index=index)
+        irregular = pd.concat([df.drop(df.index[[40, 41, 2500]]), df.iloc[[700]]]).sort_index()
+        irregular.iloc[1200, 1] = np.nan
+        gap = df.drop(df.index[3000:4000])
+        # One missing interval every hour splits the complete half-hours into more runs than MAX_RUNS
+        scattered = df.drop(df.index[::12])
+        for frame in (df, irregular, gap, scattered):
+            for freq in ('30min', 'h', 'D'):
+                pd.testing.assert_frame_equal(grid_resample_mean(frame, freq), generic_resample_mean(frame, freq),
+                                              rtol=1e-12)
+        self.assertGreater(len(df) // 12, MAX_RUNS)
+        # Compact float32 values are averaged in float64
+        pd.testing.assert_frame_equal(grid_resample_mean(df.astype('float32'), 'h'),
+                                      generic_resample_mean(df.astype('float32').astype('float64'), 'h'), rtol=1e-12)
+        print("[PASSED]  Reshape resampler matches the generic resampler.")
+
+    ## @brief Tests that streaming month by month gives the same hours as the in-memory resampler.
+    def test_streaming_resample(self):
+        """Part: Streaming Resampler"""
+        import pandas as pd
+        index = pd.date_range('2024-10-01 00:05', periods=5000, freq='5min', name='SETTLEMENTDATE')
+        df = pd.DataFrame({'TOTALDEMAND': range(5000), 'RRP': 1.0}, index=index).drop(index[1000:1300])
+        chunks = (df.iloc[i:i + 777] for i in range(0, len(df), 777))
+        streamed = pd.concat(list(stream_resample_mean(chunks, 'h')))
+        pd.testing.assert_frame_equal(streamed, generic_resample_mean(df, 'h'), check_freq=False)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, 'DataSetOrigin'))
+            for month, days in (('202410', 31), ('202411', 30)):
+                with open(os.path.join(tmp, 'DataSetOrigin', f"PRICE_AND_DEMAND_{month}_NSW1.csv"), 'wb') as f:
+                    f.write(make_month_csv(month, rows=days * 288))
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            try:
+                combined = DataCombine.combine_data('NSW1')
+                before = combined.copy()
+                reference = DataFilterHour.filter_data_by_hour(combined)
+                pd.testing.assert_frame_equal(combined, before)
+                self.assertEqual(DataFilterHour.filter_data_by_hour_streaming('NSW1'), len(reference))
+                stored = DataStore.read_dataset('hourly', 'NSW1')
+                exported = pd.read_csv(DataFilterHour.hourly_path('NSW1'), index_col=0, parse_dates=True)
+                raw = os.listdir('DataSetOrigin')
+                self.assertEqual(DataFilterHour.filter_data_by_hour_streaming(
+                    'NSW1', [os.path.join('DataSetOrigin', name) for name in raw]), len(reference))
+
+                # In streaming mode the combine stage hands over a row count, not the 5-minute frame
+                import MainStart
+                with open(os.path.join('DataSetOrigin', 'PRICE_AND_DEMAND_202411_NSW1.csv'), 'wb') as f:
+                    f.write(make_month_csv('202411', rows=30 * 288 - 12))
+                with mock.patch.dict(os.environ, {'STREAM_RESAMPLE': '1'}):
+                    count = MainStart.combine_stage('NSW1')
+                self.assertEqual(count, len(DataStore.read_dataset('combined', 'NSW1', months=['2024-11'])))
+            finally:
+                os.chdir(cwd)
+        pd.testing.assert_frame_equal(stored, reference, check_freq=False)
+        self.assertEqual(list(pd.to_datetime(exported.index, format='ISO8601')), list(reference.index))
+        pd.testing.assert_frame_equal(exported.reset_index(drop=True), reference.reset_index(drop=True))
+        print("[PASSED]  Streaming resampler matched the in-memory hourly data.")
+
+    ## @brief Tests that the hierarchical rollups match aggregates computed from the 5-minute rows.
+    def test_rollups(self):
+        """Part: Multi-Resolution Rollups"""
+        import pandas as pd
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, 'DataSetOrigin'))
+            for month, days in (('202411', 30), ('202412', 31)):
+                with open(os.path.join(tmp, 'DataSetOrigin', f"PRICE_AND_DEMAND_{month}_NSW1.csv"), 'wb') as f:
+                    f.write(make_month_csv(month, rows=days * 288))
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            try:
+                combined = DataCombine.combine_data('NSW1').set_index('SETTLEMENTDATE')
+                counts = DataRollup.build_rollups('NSW1')
+                daily = DataRollup.read_rollup('NSW1', 'D')
+                monthly = DataRollup.read_rollup('NSW1', 'MS', columns=['ENERGY_MWH', 'TOTALDEMAND_PEAK'])
+            finally:
+                os.chdir(cwd)
+        self.assertEqual(set(counts), set(DataRollup.RESOLUTIONS))
+        self.assertEqual([DataRollup.coarsest_resolution(step) for step in ('30min', '2h', '7D', 'W', 'QS')],
+                         ['30min', 'h', 'D', 'W', 'MS'])
+        by_day = combined['TOTALDEMAND'].resample('D')
+        pd.testing.assert_series_equal(daily['TOTALDEMAND_MEAN'], by_day.mean(), check_names=False, check_freq=False)
+        pd.testing.assert_series_equal(daily['TOTALDEMAND_MAX'], by_day.max(), check_names=False, check_freq=False)
+        by_month = combined['TOTALDEMAND'].resample('MS')
+        pd.testing.assert_series_equal(monthly['ENERGY_MWH'], by_month.sum() * 5 / 60, check_names=False,
+                                       check_freq=False)
+        self.assertEqual(list(monthly['TOTALDEMAND_PEAK']), list(by_month.apply(lambda s: s.idxmax())))
+        print("[PASSED]  Rollups matched the 5-minute aggregates.")
+
+    ## @brief Tests that a headless run parses its options, uses Agg and writes plots without showing them.
+    def test_headless_mode(self):
+        """Part: Headless Batch Mode"""
+        import subprocess
+        self.assertEqual([batch.parse_horizon(value) for value in ('168', '36h', '5d', '2w', '3m')],
+                         [168, 36, 120, 336, 2160])
+        for value in ('', '0', '2y', 'week'):
+            with self.assertRaises(ValueError):
+                batch.parse_horizon(value)
+
+        # A fresh interpreter shows whether the pipeline modules pull in tkinter or a GUI backend
+        script = ("import sys, matplotlib; sys.path.insert(0, sys.argv[1])\n"
+                  "from General.batch import parse_args, configure, get_horizon, output_path\n"
+                  "headless = configure(parse_args(['--headless', '--horizon', '2w', '--output-dir', sys.argv[2]]))\n"
+                  "from CodeTimeForecast import Sarimamodel5\n"
+                  "from CodeDataVisualisation import demand_dec\n"
+                  "print(headless, get_horizon(), output_path('a.png'), 'tkinter' in sys.modules, "
+                  "matplotlib.get_backend().lower())\n")
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, DISPLAY=':0')
+            env.pop('HEADLESS', None)
+            env.pop('MPLBACKEND', None)
+            output = subprocess.run([sys.executable, '-c', script, ROOT_DIR, tmp], env=env, capture_output=True,
+                                    text=True, check=True).stdout.split()
+            self.assertEqual(output, ['True', '336', os.path.join(tmp, 'a.png'), 'False', 'agg'])
+
+            os.makedirs(os.path.join(tmp, 'DataSetOrigin'))
+            with open(os.path.join(tmp, 'DataSetOrigin', "PRICE_AND_DEMAND_202412_NSW1.csv"), 'wb') as f:
+                f.write(make_month_csv('202412', rows=2 * 288))
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            try:
+                DataCombine.combine_data('NSW1')
+                DataRollup.build_rollups('NSW1')
+                with mock.patch.dict(os.environ, {'HEADLESS': '1', 'OUTPUT_DIR': 'out'}), \
+                        mock.patch('matplotlib.pyplot.show') as show:
+                    demand_dec.plot_december_demand('NSW1')
+            finally:
+                os.chdir(cwd)
+            show.assert_not_called()
+            self.assertTrue(os.path.exists(os.path.join(tmp, 'out', 'CodeDataVisualisation',
+                                                        'DECEMBER_DEMAND_2024_NSW1.png')))
+            self.assertTrue(os.path.exists(os.path.join(tmp, 'out', 'CSVs', 'DECEMBER_DEMAND_2024_NSW1.csv')))
+        print("[PASSED]  Headless run used Agg, skipped tkinter and wrote its plots to the output folder.")
+
+    ## @brief Tests that pip only runs for unmet requirements and that startup skips the heavy libraries.
+    def test_fast_startup(self):
+        """Part: Fast Startup"""
+        import subprocess
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'requirements.txt')
+            with open(path, 'w') as f:
+                f.write("# comment\npandas\npython-dotenv>=0.1  # inline comment\n\n")
+            with mock.patch.object(requirements.subprocess, 'check_call') as pip:
+                requirements.install_requirements(path)
+            pip.assert_not_called()
+
+            with open(path, 'a') as f:
+                f.write("pandas>=999\nno-such-package-for-the-test\n")
+            self.assertEqual(requirements.missing_requirements(path), ['pandas>=999', 'no-such-package-for-the-test'])
+            with mock.patch.object(requirements.subprocess, 'check_call') as pip:
+                requirements.install_requirements(path)
+            self.assertEqual(pip.call_args[0][0][-2:], ['pandas>=999', 'no-such-package-for-the-test'])
+
+        script = ("import sys; sys.path.insert(0, sys.argv[1])\n"
+                  "import MainStart\n"
+                  "print(*[name in sys.modules for name in ('statsmodels', 'matplotlib', 'tkinter', 'pandas', 'pyarrow')])\n")
+        output = subprocess.run([sys.executable, '-c', script, ROOT_DIR], capture_output=True, text=True,
+                                check=True).stdout.split()
+        self.assertEqual(output, ['False'] * 5)
+        print("[PASSED]  Satisfied requirements skipped pip and the heavy libraries were not imported at startup.")
+
+    ## @brief Tests that the stages use the frames handed over in memory and that CSV exports can run in the background.
+    def test_stage_handoff(self):
+        """Part: In-Memory Stage Handoff"""
+        import pandas as pd
+        from CodeTimeForecast.RegionModel import read_hourly_series
+        from CodeTimeForecast.ModelCache import series_fingerprint
+        with tempfile.TemporaryDirectory() as tmp:
+            import MainStart
+            os.makedirs(os.path.join(tmp, 'DataSetOrigin'))
+            for month, days in (('202410', 31), ('202411', 30), ('202412', 31)):
+                with open(os.path.join(tmp, 'DataSetOrigin', f"PRICE_AND_DEMAND_{month}_NSW1.csv"), 'wb') as f:
+                    f.write(make_month_csv(month, rows=days * 288))
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            read_dataset = DataStore.read_dataset
+            try:
+                combined = DataCombine.combine_data('NSW1')
+                stored = DataRollup.build_rollups('NSW1')
+                with mock.patch.object(DataStore, 'read_dataset', side_effect=AssertionError("store read")):
+                    hourly = MainStart.filter_stage('NSW1', combined)
+                    rollups = DataRollup.build_rollups('NSW1', combined)
+                    series = read_hourly_series('NSW1', hourly)
+                    with mock.patch('matplotlib.pyplot.show'):
+                        demand_dec.plot_december_demand('NSW1', rollups['30min'])
+                self.assertTrue(os.path.exists(os.path.join('CSVs', 'DECEMBER_DEMAND_2024_NSW1.csv')))
+                self.assertEqual(series_fingerprint(series), series_fingerprint(read_hourly_series('NSW1')))
+                for resolution in DataRollup.RESOLUTIONS:
+                    pd.testing.assert_frame_equal(rollups[resolution], stored[resolution])
+
+                # A changed month: only its rows are handed over, and neither the filter nor the
+                # rollups read the 5-minute store; the results match a rebuild of the whole history
+                with open(os.path.join('DataSetOrigin', "PRICE_AND_DEMAND_202412_NSW1.csv"), 'wb') as f:
+                    f.write(make_month_csv('202412', rows=20 * 288))
+                combined = DataCombine.combine_data('NSW1')
+                self.assertNotIn('2024-10', set(DataStore.month_keys(combined['SETTLEMENTDATE'])))
+                datasets = []
+                with mock.patch.object(DataStore, 'read_dataset',
+                                       side_effect=lambda dataset, *args, **kwargs: datasets.append(dataset)
+                                       or read_dataset(dataset, *args, **kwargs)):
+                    hourly = MainStart.filter_stage('NSW1', combined)
+                    rollups = DataRollup.build_rollups('NSW1', combined)
+                self.assertNotIn('combined', datasets)
+                self.assertIn('hourly', datasets)
+                full = DataFilterHour.filter_data_by_hour(DataCombine.load_combined('NSW1'), 'NSW1')
+                pd.testing.assert_frame_equal(hourly, full, check_freq=False)
+                stored = DataRollup.build_rollups('NSW1')
+                for resolution in DataRollup.RESOLUTIONS:
+                    pd.testing.assert_frame_equal(rollups[resolution], stored[resolution].loc[rollups[resolution].index])
+                self.assertEqual(len(rollups['MS']), 3)
+
+                # Background export of a snapshot: later in-place changes do not reach the file
+                frame = pd.DataFrame({'value': [1.0, 2.0, 3.0]})
+                path = export_csv(frame, 'async.csv', mode='async', index=False)
+                frame.loc[0, 'value'] = 99.0
+                self.assertEqual(wait_for_exports(), [])
+                self.assertEqual(list(pd.read_csv(path)['value']), [1.0, 2.0, 3.0])
+                self.assertIsNone(export_csv(frame, 'off.csv', mode='off'))
+                self.assertFalse(os.path.exists('off.csv'))
+            finally:
+                os.chdir(cwd)
+        print("[PASSED]  Stages used the handed-over frames and the background export wrote its snapshot.")
+
+    ## @brief Tests that the stage runner skips up-to-date stages and runs independent ones concurrently.
+    def test_stage_runner(self):
+        """Part: Stage Runner"""
+        from General.pipeline import Stage, StageRunner
+        with tempfile.TemporaryDirectory() as tmp:
+            source, state = os.path.join(tmp, 'source.txt'), os.path.join(tmp, 'state.json')
+            paths = {name: os.path.join(tmp, f"{name}.txt") for name in ('combine', 'view', 'filter', 'forecast')}
+            calls = []
+            meeting = threading.Barrier(2, timeout=10)
+
+            def step(name, text=None, wait=False):
+                calls.append(name)
+                if wait:
+                    meeting.wait()  # only returns when the other branch runs at the same time
+                text = name if text is None else text
+                with open(paths[name], 'w') as f:
+                    f.write(text)
+                return text
+
+            def combine():
+                with open(source) as f:
+                    return step('combine', f.read())
+
+            def stages():
+                return [Stage("combine", combine, inputs=[source], outputs=[paths['combine']]),
+                        Stage("view", step, {'name': 'view', 'wait': True}, after=["combine"],
+                              inputs=[paths['combine']], outputs=[paths['view']]),
+                        Stage("filter", step, {'name': 'filter', 'wait': True}, feed={'text': "combine"},
+                              inputs=[paths['combine']], outputs=[paths['filter']]),
+                        Stage("forecast", step, {'name': 'forecast'}, after=["filter"], inputs=[paths['filter']],
+                              outputs=[paths['forecast']], params={'horizon': 168}, where="main")]
+
+            with open(source, 'w') as f:
+                f.write("v1")
+            self.assertEqual(set(StageRunner(stages(), state).run().values()), {'ran'})
+            self.assertEqual(calls.count('view') + calls.count('filter'), 2)
+            with open(paths['filter']) as f:
+                self.assertEqual(f.read(), "v1")
+
+            # Nothing changed: every stage is skipped; a new mtime alone only rehashes
+            calls.clear()
+            os.utime(source)
+            self.assertEqual(set(StageRunner(stages(), state).run().values()), {'skipped'})
+            self.assertEqual(calls, [])
+
+            # A missing output reruns only its stage
+            os.remove(paths['forecast'])
+            status = StageRunner(stages(), state).run()
+            self.assertEqual(calls, ['forecast'])
+            self.assertEqual(status['filter'], 'skipped')
+
+            # New input content reruns the stages downstream of it
+            calls.clear()
+            with open(source, 'w') as f:
+                f.write("v2")
+            status = StageRunner(stages(), state).run()
+            self.assertEqual(sorted(calls), ['combine', 'filter', 'forecast', 'view'])
+
+            # A failed stage blocks its dependants and is not recorded as up to date
+            runner_stages = stages()
+            runner_stages[0].func = lambda: None
+            with open(source, 'w') as f:
+                f.write("v3")
+            status = StageRunner(runner_stages, state).run()
+            self.assertEqual(status, {'combine': 'failed', 'view': 'blocked', 'filter': 'blocked', 'forecast': 'blocked'})
+            with self.assertRaises(ValueError):
+                StageRunner([Stage("a", step, after=["b"]), Stage("b", step, after=["a"])], state)
+        print("[PASSED]  Up-to-date stages were skipped, changes reran their dependants, branches ran concurrently.")
+
+    ## @brief Tests the scheduler ticks against the local stand-in source with a simulated clock.
+    def test_scheduler(self):
+        """Part: Scheduler Daemon"""
+        import time
+        import MainStart
+        from CodeDataPreparation.LocalSource import ReplaySource, create_source_server
+        from General.scheduler import Scheduler
+        from General.pipeline import PipelineLock
+        clock = {'now': datetime.now()}
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, 'recorded'))
+            with open(os.path.join(tmp, 'recorded', 'PRICE_AND_DEMAND_202410_NSW1.csv'), 'wb') as f:
+                f.write(make_month_csv('202410', rows=21 * 288))
+            source = ReplaySource(os.path.join(tmp, 'recorded'), lead_days=3, clock=lambda: clock['now'])
+            server = create_source_server(source, port=0)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            env = {'BASE_URL': f"http://127.0.0.1:{server.server_address[1]}/", 'LOG_FOLDER': tmp,
+                   'REGIONS': 'NSW1', 'HEADLESS': '1', 'MPLBACKEND': 'Agg'}
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            try:
+                with mock.patch.dict(os.environ, env), \
+                        mock.patch.object(MainStart, 'forecast_stage', return_value='forecast.xlsx') as forecast:
+                    schedule = {'every': 300, 'forecast_every': 3600, 'budget': 240, 'months': 2}
+                    scheduler = Scheduler(MainStart.build_stages, ['NSW1'], 48, schedule, clock=lambda: clock['now'])
+                    before = {name: os.environ.get(name) for name in ('START_MONTH', 'MODEL_UPDATE', 'COMBINE_MONTHS')}
+                    first = scheduler.tick()
+                    self.assertTrue(all(state == 'ran' for state in first.values()))
+                    # The tick's month window and update mode do not outlive the tick
+                    self.assertEqual({name: os.environ.get(name) for name in before}, before)
+                    rows = len(DataStore.read_dataset('combined', 'NSW1'))
+
+                    # No new interval: nothing is recombined, and the forecast is not due yet
+                    second = scheduler.tick()
+                    self.assertEqual(second['combine:NSW1'], 'skipped')
+                    self.assertNotIn('forecast:NSW1', second)
+
+                    # Five minutes later one new interval is appended; an hour later the forecast is republished
+                    clock['now'] += timedelta(minutes=5)
+                    self.assertEqual(scheduler.tick()['combine:NSW1'], 'ran')
+                    self.assertEqual(len(DataStore.read_dataset('combined', 'NSW1')), rows + 1)
+                    clock['now'] += timedelta(hours=1)
+                    self.assertEqual(scheduler.tick()['forecast:NSW1'], 'ran')
+                    self.assertEqual(forecast.call_count, 2)
+
+                    # A tick never overlaps another run holding the pipeline lock
+                    with PipelineLock() as locked:
+                        self.assertTrue(locked)
+                        self.assertIsNone(scheduler.tick())
+
+                    # A tick longer than the cadence skips the missed ticks instead of stacking them
+                    waits = []
+                    scheduler.schedule['every'] = 0.2
+                    with mock.patch.object(scheduler, 'tick', side_effect=lambda: time.sleep(0.25)):
+                        self.assertEqual(scheduler.run(ticks=3, sleep=waits.append), 3)
+                    self.assertEqual(len(waits), 2)
+                    self.assertTrue(all(0 < wait < 0.2 for wait in waits))
+            finally:
+                os.chdir(cwd)
+                server.shutdown()
+                server.server_close()
+        print("[PASSED]  Scheduler appended only new intervals, republished forecasts hourly and never overlapped.")
+
 ## @class TestModules
 #  @brief Ensures all core modules are importable and not None.
 class TestModules(unittest.TestCase):
@@ -104,15 +755,346 @@ class TestClasses(unittest.TestCase):
 ## @class TestFunctions
 #  @brief Placeholder for function-level SARIMA model testing.
 class TestFunctions(unittest.TestCase):
-    ## @brief Dummy test to simulate SARIMA logic testing.
-    def test_sarima_placeholder(self):
+    ## @brief Tests that a cache hit skips fit() and reproduces the forecast, and that eviction works.
+    def test_model_cache(self):
+        """SW Function: Fitted Model Cache"""
+        import numpy as np
+        import pandas as pd
+        from statsmodels.tsa.statespace.sarimax import SARIMAX
+        index = pd.date_range('2024-10-01', periods=24 * 14, freq='h')
+        hours = np.arange(len(index))
+        series = pd.Series(7000 + 800 * np.sin(hours * 2 * np.pi / 24)
+                           + np.random.default_rng(3).normal(0, 50, len(index)), index=index)
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ModelCache(os.path.join(tmp, 'cache'), max_age_days=30, max_mb=50)
+            first = fit_sarima(series, (1, 0, 0), (1, 0, 0, 24), cache=cache, folder=tmp)
+            with mock.patch.object(SARIMAX, 'fit') as fit:
+                second = fit_sarima(series, (1, 0, 0), (1, 0, 0, 24), cache=cache, folder=tmp)
+                fit.assert_not_called()
+            np.testing.assert_allclose(second.forecast(24), first.forecast(24))
+            with open(os.path.join(tmp, 'fit_log.csv')) as f:
+                self.assertEqual(len(f.readlines()), 2)
+
+            # A refit on slightly more data starts from the previous optimum
+            with mock.patch.object(SARIMAX, 'fit', autospec=True, side_effect=SARIMAX.fit) as fit:
+                fit_sarima(series[:-24], (1, 0, 0), (1, 0, 0, 24), cache=cache, folder=tmp)
+                self.assertIsNotNone(fit.call_args.kwargs['start_params'])
+
+            # A fit stopped before convergence keeps the last converged start vector
+            from CodeTimeForecast.SarimaFit import start_params_path
+            start_path = start_params_path(None, (1, 0, 0), (1, 0, 0, 24), tmp)
+            with open(start_path) as f:
+                converged = f.read()
+            fit_sarima(series[:-48], (1, 0, 0), (1, 0, 0, 24), fit_options={'disp': False, 'maxiter': 1},
+                       cache=False, folder=tmp)
+            with open(start_path) as f:
+                self.assertEqual(f.read(), converged)
+
+            changed = series.copy()
+            changed.iloc[-1] += 1
+            fit_sarima(changed, (1, 0, 0), (1, 0, 0, 24), cache=cache, folder=tmp)
+            entries = sorted(os.listdir(cache.folder))
+            self.assertEqual(len(entries), 3)
+
+            # Other state in the cache folder is never evicted, however old
+            best = OrderSearch.best_order_path('NSW1', cache.folder)
+            with open(best, 'w') as f:
+                f.write('{"order": [1, 0, 0], "seasonal_order": [1, 0, 0, 24]}')
+            os.utime(best, (0, 0))
+            warm = start_params_path('NSW1', (1, 0, 0), (1, 0, 0, 24), cache.folder)
+            with open(warm, 'w') as f:
+                f.write(converged)
+            os.utime(warm, (0, 0))
+
+            old = os.path.join(cache.folder, entries[0])
+            os.utime(old, (0, 0))
+            self.assertEqual(cache.evict(), 1)
+            cache.max_bytes = 0
+            self.assertEqual(cache.evict(), 2)
+            self.assertEqual(sorted(os.listdir(cache.folder)), sorted([os.path.basename(best), os.path.basename(warm)]))
+            self.assertEqual(OrderSearch.load_best_order('NSW1', cache.folder), ((1, 0, 0), (1, 0, 0, 24)))
+        print("[PASSED]  Cached parameters skipped the fit and reproduced the forecast.")
+
+    ## @brief Tests incremental updates against full filtering, and the drift and schedule refits.
+    def test_model_update(self):
+        """SW Function: Incremental Model Update"""
+        import numpy as np
+        import pandas as pd
+        from statsmodels.tsa.statespace.sarimax import SARIMAX
+        index = pd.date_range('2024-10-01', periods=24 * 16, freq='h')
+        hours = np.arange(len(index))
+        series = pd.Series(7000 + 800 * np.sin(hours * 2 * np.pi / 24)
+                           + np.random.default_rng(4).normal(0, 50, len(index)), index=index)
+        spec = ((1, 0, 0), (1, 0, 0, 24))
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.dict(os.environ, {'MODEL_REFIT_HOURS': '168',
+                                                                               'MODEL_DRIFT_RATIO': '2.0'}):
+            cache = ModelCache(os.path.join(tmp, 'cache'))
+            fitted, action = update_sarima(series[:24 * 14], 'NSW1', *spec, folder=tmp, cache=cache)
+            self.assertEqual(action, 'initial fit')
+            with mock.patch.object(SARIMAX, 'fit') as fit:
+                updated, action = update_sarima(series, 'NSW1', *spec, folder=tmp, cache=cache)
+                self.assertEqual(action, 'update')
+                # The update only filters the last training hour and the new hours
+                self.assertEqual(updated.nobs, len(series) - 24 * 14 + 1)
+                _, action = update_sarima(series, 'NSW1', *spec, folder=tmp, cache=cache)
+                self.assertEqual(action, 'unchanged')
+                # A revised last hour (a live partial hour) is filtered again, not refitted
+                revised = series.copy()
+                revised.iloc[-1] += 100.0
+                self.assertEqual(update_sarima(revised, 'NSW1', *spec, folder=tmp, cache=cache)[1], 'unchanged')
+                fit.assert_not_called()
+            reference = SARIMAX(series, order=spec[0], seasonal_order=spec[1],
+                                enforce_stationarity=False, enforce_invertibility=False).filter(fitted.params)
+            np.testing.assert_allclose(updated.forecast(48), reference.forecast(48), rtol=1e-8)
+
+            extended = pd.concat([series, pd.Series(20000.0, index=pd.date_range(index[-1] + pd.Timedelta('1h'),
+                                                                                 periods=24, freq='h'))])
+            self.assertEqual(update_sarima(extended, 'NSW1', *spec, folder=tmp, cache=cache)[1], 'refit: drift')
+            os.environ['MODEL_REFIT_HOURS'] = '1'
+            extended = pd.concat([extended, pd.Series(20000.0, index=[extended.index[-1] + pd.Timedelta('1h')])])
+            self.assertEqual(update_sarima(extended.asfreq('h'), 'NSW1', *spec, folder=tmp, cache=cache)[1],
+                             'refit: schedule')
+        print("[PASSED]  Incremental update matched full filtering; drift and schedule refits triggered.")
+
+    ## @brief Tests the parallel order search, its candidate cache, the time cap and the saved best order.
+    def test_order_search(self):
+        """SW Function: Order Search"""
+        import numpy as np
+        import pandas as pd
+        index = pd.date_range('2024-10-01', periods=24 * 10, freq='h')
+        hours = np.arange(len(index))
+        series = pd.Series(7000 + 800 * np.sin(hours * 2 * np.pi / 24)
+                           + np.random.default_rng(5).normal(0, 50, len(index)), index=index)
+        grid = OrderSearch.candidate_grid(p=(0, 1), q=(0,), P=(0, 1), Q=(0,))
+        with tempfile.TemporaryDirectory() as tmp:
+            table = OrderSearch.search_orders(series, grid, workers=2, folder=tmp)
+            self.assertEqual(len(table), 4)
+            self.assertFalse(table['cached'].any())
+            self.assertEqual(table.iloc[0]['status'], 'ok')
+            self.assertTrue(table[table['status'] == 'ok']['aic'].is_monotonic_increasing)
+            self.assertEqual(set(table['status']) - {'ok', 'pruned'}, set())
+
+            larger = OrderSearch.candidate_grid(p=(0, 1, 2), q=(0,), P=(0, 1), Q=(0,))
+            again = OrderSearch.search_orders(series, larger, workers=2, folder=tmp)
+            # New grid points and the pruned candidates (not cached) are evaluated again
+            self.assertEqual(int((~again['cached']).sum()), 2 + int((table['status'] != 'ok').sum()))
+
+            capped = OrderSearch.search_orders(series, [((1, 0, 1), (0, 0, 0, 24))], time_cap=0, folder=tmp)
+            self.assertEqual(capped.iloc[0]['status'], 'timeout')
+            # A timeout belongs to its time cap: a later search with a larger cap (and no pruning) retries it
+            retried = OrderSearch.search_orders(series, [((1, 0, 1), (0, 0, 0, 24))], prune_margin=float('inf'),
+                                                folder=tmp)
+            self.assertEqual(retried.iloc[0]['status'], 'ok')
+            self.assertFalse(retried.iloc[0]['cached'])
+
+            best = OrderSearch.save_best_order('NSW1', again, folder=tmp)
+            self.assertEqual(OrderSearch.load_best_order('NSW1', folder=tmp), best)
+            self.assertEqual(OrderSearch.load_best_order('QLD1', folder=tmp), ((2, 0, 2), (2, 0, 2, 24)))
+        print("[PASSED]  Order search ranked, cached and capped the candidates.")
+
+    ## @brief Tests the Fourier regressors and a DHR fit that captures a weekly cycle.
+    def test_fourier_terms(self):
+        """SW Function: Dynamic Harmonic Regression"""
+        import numpy as np
+        import pandas as pd
+        self.assertEqual(get_harmonics("168:3, 8766:1"), {168: 3, 8766: 1})
+        self.assertEqual(usable_harmonics({168: 3, 8766: 1}, 24 * 28), {168: 3})
+
+        index = pd.date_range('2024-10-01', periods=24 * 28, freq='h')
+        terms = fourier_terms(index, {168: 3})
+        self.assertEqual(terms.shape, (len(index), 6))
+        future = fourier_terms(horizon_index(index[:-48], 48), {168: 3})
+        np.testing.assert_allclose(future.to_numpy(), terms.iloc[-48:].to_numpy(), atol=1e-9)
+
+        hours = np.arange(len(index))
+        series = pd.Series(7000 + 800 * np.sin(hours * 2 * np.pi / 24) + 500 * np.sin(hours * 2 * np.pi / 168)
+                           + np.random.default_rng(6).normal(0, 30, len(index)), index=index)
+        with tempfile.TemporaryDirectory() as tmp:
+            plain = fit_sarima(series, (1, 0, 0), (1, 0, 0, 24), cache=False, folder=tmp)
+            dhr = fit_sarima(series, (1, 0, 0), (1, 0, 0, 24), cache=False, folder=tmp, exog=terms)
+        self.assertEqual(dhr.model.k_states, plain.model.k_states)
+        self.assertLess(dhr.aic, plain.aic)
+        forecast = dhr.get_forecast(48, exog=fourier_terms(horizon_index(index, 48), {168: 3})).predicted_mean
+        self.assertEqual(len(forecast), 48)
+        print("[PASSED]  Fourier regressors aligned across the horizon and improved the fit.")
+
+    ## @brief Tests the simulated quantile bands and peak exceedance, with and without blocking.
+    def test_forecast_bands(self):
+        """SW Function: Forecast Quantile Bands"""
+        import numpy as np
+        import pandas as pd
+        index = pd.date_range('2024-10-01', periods=24 * 14, freq='h')
+        hours = np.arange(len(index))
+        series = pd.Series(7000 + 800 * np.sin(hours * 2 * np.pi / 24)
+                           + np.random.default_rng(7).normal(0, 50, len(index)), index=index)
+        with tempfile.TemporaryDirectory() as tmp:
+            results = fit_sarima(series, (1, 0, 0), (1, 0, 0, 24), cache=False, folder=tmp)
+
+        out = simulate_bands(results, 60, repetitions=400, thresholds=[7500, 8500, 20000])
+        bands = out['bands']
+        self.assertEqual(list(bands.columns), ['P10', 'P50', 'P90'])
+        self.assertEqual(bands.index[0], index[-1] + pd.Timedelta('1h'))
+        self.assertTrue((bands['P10'] <= bands['P50']).all() and (bands['P50'] <= bands['P90']).all())
+        mean = results.get_forecast(60).predicted_mean
+        self.assertLess(float((bands['P50'] - mean).abs().max()), 60)
+        self.assertEqual(out['daily_exceedance'].shape, (3, 3))
+        self.assertTrue(out['peak_exceedance'].is_monotonic_decreasing)
+        self.assertEqual(out['peak_exceedance'].iloc[-1], 0.0)
+
+        # A budget too small for all paths: one path per batch, simulated again for each day block
+        small = simulate_bands(results, 60, repetitions=20, thresholds=[8500], memory_mb=0.0005, seed=3)
+        paths = np.column_stack([np.asarray(results.simulate(60, anchor='end', rng=np.random.default_rng(3 + b)))
+                                 for b in range(20)]).astype(np.float32)
+        np.testing.assert_allclose(small['bands'].to_numpy(), np.quantile(paths, [0.1, 0.5, 0.9], axis=1).T,
+                                   rtol=1e-6)
+        self.assertAlmostEqual(small['peak_exceedance'].iloc[0], float((paths.max(axis=0) > 8500).mean()))
+        print("[PASSED]  Quantile bands and peak exceedance matched the simulated paths.")
+
+    ## @brief Tests the local forecast service: JSON forecasts, the LRU cache and reloads on model updates.
+    def test_forecast_service(self):
+        """SW Function: Forecast Service"""
+        import json
+        import urllib.request
+        import urllib.error
+        import numpy as np
+        import pandas as pd
+        index = pd.date_range('2024-10-01', periods=24 * 14, freq='h')
+        hours = np.arange(len(index))
+        series = pd.Series(7000 + 800 * np.sin(hours * 2 * np.pi / 24)
+                           + np.random.default_rng(9).normal(0, 50, len(index)), index=index)
+        with tempfile.TemporaryDirectory() as tmp:
+            results = fit_sarima(series, (1, 0, 0), (1, 0, 0, 24), cache=False, folder=tmp)
+        loads, version = [], [1]
+
+        def loader(region):
+            loads.append(region)
+            return {'results': results, 'harmonics': {}, 'index': series.index}
+
+        server = create_server(ForecastService(loader, lambda region: version[0], cache_size=2), port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+
+        def get(path):
+            with urllib.request.urlopen(base + path, timeout=30) as response:
+                return json.loads(response.read()), response.headers.get('X-Forecast-Cache')
+
+        try:
+            body, cache = get("/forecast?region=nsw1&horizon=48")
+            self.assertEqual(cache, 'miss')
+            self.assertEqual(len(body['forecast']), 48)
+            self.assertEqual(body['forecast'][0]['datetime'], (index[-1] + pd.Timedelta('1h')).isoformat())
+            expected = results.get_forecast(48).predicted_mean
+            self.assertAlmostEqual(body['forecast'][-1]['mean'], float(expected.iloc[-1]), places=2)
+            self.assertTrue(all(row['lower'] < row['mean'] < row['upper'] for row in body['forecast']))
+            self.assertEqual(get("/forecast?region=NSW1&horizon=48")[1], 'hit')
+
+            get("/forecast?region=NSW1&horizon=24")
+            get("/forecast?region=NSW1&horizon=12")  # evicts the least recently used horizon 48
+            self.assertEqual(get("/forecast?region=NSW1&horizon=48")[1], 'miss')
+            self.assertEqual(loads, ['NSW1'])
+
+            version[0] = 2  # model updated: reloaded once and cached forecasts dropped
+            self.assertEqual(get("/forecast?region=NSW1&horizon=48")[1], 'miss')
+            self.assertEqual(loads, ['NSW1', 'NSW1'])
+            self.assertEqual(get("/health")[0]['cache']['entries'], 1)
+
+            for path, status in (("/forecast?region=XX1", 400), ("/forecast?horizon=0", 400), ("/other", 404)):
+                with self.assertRaises(urllib.error.HTTPError) as error:
+                    get(path)
+                self.assertEqual(error.exception.code, status)
+        finally:
+            server.shutdown()
+            server.server_close()
+        print("[PASSED]  Forecast service answered from memory and refreshed on model updates.")
+
+    ## @brief Tests the precomputed forecast bundle: zero-copy slices, persistence and use by the service.
+    def test_forecast_bundle(self):
+        """SW Function: Forecast Bundle"""
+        import json
+        import numpy as np
+        import pandas as pd
+        index = pd.date_range('2024-10-01', periods=24 * 14, freq='h')
+        hours = np.arange(len(index))
+        series = pd.Series(7000 + 800 * np.sin(hours * 2 * np.pi / 24)
+                           + np.random.default_rng(10).normal(0, 50, len(index)), index=index)
+        settings = {'paths': 100, 'quantiles': (0.1, 0.5, 0.9), 'memory_mb': 64, 'thresholds': [8000]}
+        with tempfile.TemporaryDirectory() as tmp:
+            results = fit_sarima(series, (1, 0, 0), (1, 0, 0, 24), cache=False, folder=tmp)
+            bundle = ForecastBundle.build_bundle(results, series, steps=240, settings=settings)
+            self.assertEqual(bundle.columns, ['mean', 'lower', 'upper', 'simulated', 'P10', 'P50', 'P90'])
+
+            view = bundle.slice(72)
+            self.assertTrue(np.shares_memory(view['mean'].to_numpy(), bundle.values))
+            self.assertTrue(np.shares_memory(view['bands'].to_numpy(), bundle.values))
+            np.testing.assert_allclose(view['mean'], results.get_forecast(72).predicted_mean)
+            self.assertEqual(len(view['simulation']['daily_exceedance']), 3)
+            with self.assertRaises(ValueError):
+                bundle.slice(241)
+
+            with mock.patch.object(ForecastBundle, 'get_simulation_settings', return_value=settings):
+                first = ForecastBundle.load_or_build_bundle(results, series, 'NSW1', steps=240, folder=tmp)
+                with mock.patch.object(ForecastBundle, 'build_bundle') as build:
+                    again = ForecastBundle.load_or_build_bundle(results, series, 'NSW1', steps=240, folder=tmp)
+                    build.assert_not_called()
+            np.testing.assert_array_equal(again.values, first.values)
+            self.assertTrue(again.index.equals(first.index))
+            np.testing.assert_array_equal(again.daily_peaks, first.daily_peaks)
+
+        service = ForecastService(lambda region: {'results': results, 'harmonics': {}, 'index': index,
+                                                  'bundle': bundle}, lambda region: 1)
+        with mock.patch.object(results, 'get_forecast', side_effect=AssertionError("model used")):
+            rows = json.loads(service.forecast('NSW1', 48)[0])['forecast']
+        self.assertEqual(len(rows), 48)
+        self.assertEqual(set(rows[0]), {'datetime', 'mean', 'lower', 'upper', 'P10', 'P50', 'P90'})
+        print("[PASSED]  Forecast bundle sliced without copies, reloaded from disk and served.")
+
+    ## @brief Tests the rolling-origin backtest against forecasts refiltered directly at each origin.
+    def test_sarima_backtest(self):
         """SW Function: SARIMA Forecast"""
         try:
-            print("[PASSED]  SARIMA forecast logic placeholder test.")
-            self.assertTrue(True)
+            import numpy as np
+            import pandas as pd
+            from statsmodels.tsa.statespace.sarimax import SARIMAX
+            index = pd.date_range('2024-10-01', periods=24 * 30, freq='h')
+            hours = np.arange(len(index))
+            series = pd.Series(7000 + 800 * np.sin(hours * 2 * np.pi / 24)
+                               + np.random.default_rng(8).normal(0, 50, len(index)), index=index)
+            with tempfile.TemporaryDirectory() as tmp:
+                scores = Backtest.backtest(series, horizon=48, train_hours=24 * 14, refit_hours=24 * 7,
+                                           order=(1, 0, 0), seasonal_order=(1, 0, 0, 24), workers=2,
+                                           cache=False, region='NSW1', folder=tmp)
+                # The backtest fits keep their start parameters under the region they belong to
+                from CodeTimeForecast.SarimaFit import start_params_path
+                self.assertTrue(os.path.exists(start_params_path('NSW1', (1, 0, 0), (1, 0, 0, 24), tmp)))
+            origins = Backtest.origin_positions(len(series), 48, 24, 24 * 14)
+            self.assertEqual(len(scores['origins']), len(origins))
+            self.assertEqual(list(scores['origins']['WINDOW'].unique()), [0, 1, 2])
+            self.assertEqual(len(scores['params']), 3)
+            self.assertEqual(scores['horizon'].shape, (48, 3))
+            self.assertEqual(list(scores['peaks'].index), [1, 2])
+            self.assertLess(scores['horizon']['MAPE'].max(), 5)
+
+            for i in (0, len(origins) - 1):
+                window = scores['origins']['WINDOW'].iloc[i]
+                direct = SARIMAX(series.iloc[:origins[i]].to_numpy(), order=(1, 0, 0), seasonal_order=(1, 0, 0, 24),
+                                 enforce_stationarity=False, enforce_invertibility=False)
+                expected = direct.filter(scores['params'][window]).forecast(48)
+                np.testing.assert_allclose(scores['forecasts'][i], expected, rtol=1e-8)
+
+            # The DHR regressors only keep the periods that fit in the requested training window
+            with mock.patch.object(DataStore, 'read_dataset', return_value=series.to_frame('TOTALDEMAND')), \
+                    mock.patch.object(Backtest, 'load_best_order', return_value=((1, 0, 0), (0, 0, 0, 0))), \
+                    mock.patch.object(Backtest, 'is_dhr_mode', return_value=True), \
+                    mock.patch.object(Backtest, 'get_harmonics', return_value={24: 2, 24 * 21: 2}), \
+                    mock.patch.object(Backtest, 'backtest', side_effect=RuntimeError("stop")) as run:
+                self.assertIsNone(Backtest.run_backtest('NSW1', train_hours=24 * 14))
+            self.assertEqual(run.call_args.kwargs['train_hours'], 24 * 14)
+            self.assertEqual(sorted(run.call_args.kwargs['exog'].columns),
+                             ['cos_24_1', 'cos_24_2', 'sin_24_1', 'sin_24_2'])
+            print("[PASSED]  SARIMA backtest matched direct forecasts at the origins.")
         except Exception as e:
             print(f"[FAILED]  SARIMA forecast test failed: {e}")
-            print(" Review Sarimamodel5.py for broken function calls.")
+            print(" Review Backtest.py and SarimaFit.py for broken function calls.")
             self.fail()
 
 # ---------------------------- MAIN ----------------------------
@@ -45,35 +45,95 @@ logger.addHandler(file_handler)
 logger.addHandler(console_handler)
 
 # --- Functions for downloading files ---
-def download_file(year_month):
+class IncompleteDownloadError(requests.exceptions.RequestException):
+    """Raised when a transfer ends before the size announced by the server."""
+
+
+def read_validator(path):
+    """Return the ETag or Last-Modified value saved for a partial file, or None."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def download_file(year_month, retries=3):
+    """Download one month into a .part file, resuming with Range and renaming atomically when complete.
+
+    The ETag (or Last-Modified) of the response that started the .part file is saved next to it
+    and sent as If-Range when resuming, so a file that changed on the server is sent again in full
+    (200) instead of having mismatched bytes appended. A partial file without a saved validator is
+    not resumed.
+    """
     filename = f"PRICE_AND_DEMAND_{year_month}_{region}.csv"
     file_path = os.path.join(download_folder, filename)
+    part_path = file_path + ".part"
+    validator_path = part_path + ".validator"
     url = f"{base_url}{filename}"
 
-    try:
-        with requests.get(url, stream=True, headers={"User-Agent": "Mozilla/5.0"}) as r:
-            r.raise_for_status()
-            total_size = int(r.headers.get('Content-Length', 0))
-            downloaded = 0
-            chunk_size = 8192  # 8 KB
-
-            logger.info(f"Starting download: {filename} ({total_size / (1024**2):.2f} MB)")
-
-            with open(file_path, 'wb') as f:
-                for chunk in r.iter_content(chunk_size=chunk_size):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        if total_size:
-                            percent = (downloaded / total_size) * 100
-                            logger.info(f"Progress: {downloaded / (1024**2):.2f} MB ({percent:.2f}%)")
-
+    for attempt in range(1, retries + 1):
+        try:
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            validator = read_validator(validator_path)
+            headers = {"User-Agent": "Mozilla/5.0"}
+            if offset and validator:
+                headers["Range"] = f"bytes={offset}-"
+                headers["If-Range"] = validator
+                logger.info(f"Resuming {filename} from {offset / (1024**2):.2f} MB")
+            else:
+                offset = 0
+
+            with requests.get(url, stream=True, headers=headers, timeout=(10, 120)) as r:
+                if r.status_code == 416:
+                    # Partial file does not match the remote file any more; start over
+                    os.remove(part_path)
+                    raise IncompleteDownloadError(f"Range not satisfiable for {filename}")
+                r.raise_for_status()
+
+                if r.status_code == 206:
+                    content_range = r.headers.get('Content-Range', '')
+                    start, _, total = content_range.replace('bytes ', '').partition('/')
+                    if not start.startswith(f"{offset}-"):
+                        os.remove(part_path)
+                        raise IncompleteDownloadError(f"Unexpected Content-Range '{content_range}' for {filename}")
+                    total_size = int(total) if total.isdigit() else 0
+                    mode = 'ab'
+                else:
+                    # A full response (the file changed, or no resume): start over and remember its validator
+                    total_size = int(r.headers.get('Content-Length', 0))
+                    offset, mode = 0, 'wb'
+                    with open(validator_path, 'w', encoding='utf-8') as f:
+                        f.write(r.headers.get('ETag') or r.headers.get('Last-Modified') or '')
+
+                downloaded = offset
+                chunk_size = 8192  # 8 KB
+
+                logger.info(f"Starting download: {filename} ({total_size / (1024**2):.2f} MB)")
+
+                with open(part_path, mode) as f:
+                    for chunk in r.iter_content(chunk_size=chunk_size):
+                        if chunk:
+                            f.write(chunk)
+                            downloaded += len(chunk)
+                            if total_size:
+                                percent = (downloaded / total_size) * 100
+                                logger.info(f"Progress: {downloaded / (1024**2):.2f} MB ({percent:.2f}%)")
+
+            if total_size and downloaded != total_size:
+                raise IncompleteDownloadError(f"Received {downloaded} of {total_size} bytes for {filename}")
+
+            # Only a complete file replaces the final CSV
+            os.replace(part_path, file_path)
+            if os.path.exists(validator_path):
+                os.remove(validator_path)
             logger.info(f"Download completed: {filename}")
             print(f"Downloaded successfully: {filename}")
+            return
 
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Download failed for {year_month}: {e}")
-        print(f"Error downloading {year_month}: {e}")
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Download failed for {year_month} (attempt {attempt}/{retries}): {e}")
+            print(f"Error downloading {year_month}: {e}")
 
 # --- Main logic ---
 def month_range(start, end):